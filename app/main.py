@@ -1,9 +1,20 @@
+import json
+import threading
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from utils.data_loader import fetch_stock_data, fetch_macro_data
-from utils.processor import calculate_indicators
+from utils import charts
+from utils.data_loader import get_universe
+from utils.cache import (get_stock_data, get_macro_data, get_features, get_contributions, get_snapshot,
+                         load_model, memoize_frame, cache_stats)
+from utils.processor import (prepare_features_for_prediction, predict_probabilities,
+                             rolling_importance, run_backtest, run_risk_simulation, run_strategy_sweep)
+from src import risk, telemetry
+
+# Chart downsampling (to the chart resolution), memoized across reruns
+downsample = memoize_frame(charts.downsample_series)
+resample_ohlc = memoize_frame(charts.resample_ohlc)
 
 # Page Configuration
 st.set_page_config(
@@ -85,23 +96,70 @@ st.markdown("""
 # Sidebar
 st.sidebar.title("Finance | AI Stock Predictor")
 st.sidebar.markdown("---")
-ticker = st.sidebar.selectbox("Select Asset", ["AAPL", "MSFT", "TSLA"])
+ticker = st.sidebar.selectbox("Select Asset", get_universe())
 time_period = st.sidebar.selectbox("Time Period", ["1mo", "3mo", "6mo", "1y", "2y", "5y", "max"], index=4)
 
+# Per session: the flag lives in the session state and only applies to this
+# session's script thread (new sessions start from the process default)
+telemetry.enable_thread(None)
+debug = st.sidebar.checkbox("Debug panel (stage timings)", value=telemetry.is_enabled(), key='debug_panel')
+telemetry.enable_thread(debug)
+# Spans of this rerun only (other sessions run in other threads)
+run_start, run_thread = telemetry.now(), threading.get_ident()
+
+# Point budget of the charts (per session): histories are downsampled to
+# what a chart this wide can show
+chart_width = st.sidebar.select_slider("Chart resolution (px)", options=[800, 1400, 1920, 2560, 3840],
+                                       value=charts.CHART_WIDTH_PX, key='chart_width')
+
 st.sidebar.markdown("---")
 st.sidebar.info("This app uses a hybrid XGBoost + LSTM model to predict market direction.")
 
 # Main Header
 st.title(f"Market Explorer: {ticker}")
 
-# Load Data
-with st.spinner("Fetching market data..."):
-    data = fetch_stock_data(ticker, period=time_period)
-    macro_data = fetch_macro_data(period=time_period)
+# Precomputed snapshot (python -m src.snapshots build) when fresh: the page
+# is then a read-only lookup; otherwise everything is computed live
+with telemetry.span('snapshot.read', ticker=ticker, period=time_period):
+    snapshot = get_snapshot(ticker, time_period)
+
+if snapshot is not None:
+    data = snapshot.indicators
+    st.sidebar.caption(f"Precomputed snapshot of {snapshot.created:%Y-%m-%d %H:%M} UTC "
+                       f"(model v{snapshot.model_version}).")
+else:
+    # Load Data
+    with st.spinner("Fetching market data..."):
+        with telemetry.span('fetch.stock', ticker=ticker, period=time_period):
+            data = get_stock_data(ticker, period=time_period)
+        with telemetry.span('fetch.macro', period=time_period):
+            macro_data = get_macro_data(period=time_period)
 
 if data is not None and not data.empty:
-    # Process Indicators
-    df = calculate_indicators(data)
+    # Latest registered model, shared by the prediction and backtesting tabs;
+    # the feature order comes from its manifest
+    with telemetry.span('model.load'):
+        model = load_model()
+    feature_names = model.features if model is not None else []
+
+    if snapshot is not None:
+        df = data
+        full_df = snapshot.signals if snapshot.signals is not None else pd.DataFrame()
+        missing_features = snapshot.missing_features
+        probabilities = snapshot.probabilities
+    else:
+        # Process Indicators (feature store, memoized on the content of the input data)
+        with telemetry.span('indicators', rows=len(data)):
+            df = memoize_frame(get_features)(ticker, data)
+        with telemetry.span('macro_join'):
+            full_df = memoize_frame(prepare_features_for_prediction)(df, macro_data)
+        missing_features = [f for f in feature_names if f not in full_df.columns]
+        probabilities = None
+        if model is not None and not full_df.empty and not missing_features:
+            # Every row is scored once, then reused by both tabs
+            with telemetry.span('predict', rows=len(full_df)):
+                probabilities = memoize_frame(predict_probabilities)(full_df, model, feature_names)
+    telemetry.count('rows_processed', len(df))
     
     # Metrics Row
     col1, col2, col3, col4 = st.columns(4)
@@ -146,36 +204,44 @@ if data is not None and not data.empty:
             """, unsafe_allow_html=True)
 
         # Create Plotly Chart with more spacing
-        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
-                           vertical_spacing=0.15, # Increased spacing
-                           subplot_titles=(f'{ticker} Price & Volatility', 'Momentum (RSI)'), 
-                           row_width=[0.4, 0.6])
-
-        # Candlestick or Line Chart depending on available data
-        if all(col in df.columns for col in ['Open', 'High', 'Low', 'Close']):
-            fig.add_trace(go.Candlestick(x=df.index,
-                            open=df['Open'],
-                            high=df['High'],
-                            low=df['Low'],
-                            close=df['Close'],
-                            name="Price"), row=1, col=1)
-        elif 'Close' in df.columns:
-            fig.add_trace(go.Scatter(x=df.index, y=df['Close'], name="Price (Close Only)", line=dict(color='white')), row=1, col=1)
-            st.warning("⚠️ Local data is missing OHLC values. Displaying Close price only.")
-
-        # Bollinger Bands
-        fig.add_trace(go.Scatter(x=df.index, y=df['BB_Upper'], name='Upper Band', line=dict(color='rgba(173, 216, 230, 0.4)')), row=1, col=1)
-        fig.add_trace(go.Scatter(x=df.index, y=df['BB_Lower'], name='Lower Band', line=dict(color='rgba(173, 216, 230, 0.4)'), fill='tonexty'), row=1, col=1)
-
-        # RSI
-        fig.add_trace(go.Scatter(x=df.index, y=df['RSI'], name='RSI', line=dict(color='orange')), row=2, col=1)
-        fig.add_hline(y=70, line_dash="dash", line_color="red", row=2, col=1)
-        fig.add_hline(y=30, line_dash="dash", line_color="green", row=2, col=1)
-
-        fig.update_layout(height=800, template="plotly_dark", showlegend=False,
-                          xaxis_rangeslider_visible=False)
-        
-        st.plotly_chart(fig)
+        with telemetry.span('chart.technical'):
+            fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
+                               vertical_spacing=0.15, # Increased spacing
+                               subplot_titles=(f'{ticker} Price & Volatility', 'Momentum (RSI)'), 
+                               row_width=[0.4, 0.6])
+
+            # Candlestick or Line Chart depending on available data
+            # (long histories are downsampled to the chart resolution)
+            if all(col in df.columns for col in ['Open', 'High', 'Low', 'Close']):
+                candles = resample_ohlc(df[['Open', 'High', 'Low', 'Close']], width_px=chart_width)
+                fig.add_trace(go.Candlestick(x=candles.index,
+                                open=candles['Open'],
+                                high=candles['High'],
+                                low=candles['Low'],
+                                close=candles['Close'],
+                                name="Price"), row=1, col=1)
+                if len(candles) < len(df):
+                    st.caption(f"{len(df):,} bars shown as {len(candles):,} candles ({-(-len(df) // len(candles))} bars each).")
+            elif 'Close' in df.columns:
+                close = downsample(df['Close'], width_px=chart_width)
+                fig.add_trace(go.Scattergl(x=close.index, y=close, name="Price (Close Only)", line=dict(color='white')), row=1, col=1)
+                st.warning("⚠️ Local data is missing OHLC values. Displaying Close price only.")
+
+            # Bollinger Bands
+            upper, lower = downsample(df['BB_Upper'], width_px=chart_width), downsample(df['BB_Lower'], width_px=chart_width)
+            fig.add_trace(go.Scattergl(x=upper.index, y=upper, name='Upper Band', line=dict(color='rgba(173, 216, 230, 0.4)')), row=1, col=1)
+            fig.add_trace(go.Scattergl(x=lower.index, y=lower, name='Lower Band', line=dict(color='rgba(173, 216, 230, 0.4)'), fill='tonexty'), row=1, col=1)
+
+            # RSI
+            rsi = downsample(df['RSI'], width_px=chart_width)
+            fig.add_trace(go.Scattergl(x=rsi.index, y=rsi, name='RSI', line=dict(color='orange')), row=2, col=1)
+            fig.add_hline(y=70, line_dash="dash", line_color="red", row=2, col=1)
+            fig.add_hline(y=30, line_dash="dash", line_color="green", row=2, col=1)
+
+            fig.update_layout(height=800, template="plotly_dark", showlegend=False,
+                              xaxis_rangeslider_visible=False)
+
+            st.plotly_chart(fig)
 
     with tab2:
         st.markdown("""
@@ -192,36 +258,14 @@ if data is not None and not data.empty:
             </div>
         """, unsafe_allow_html=True)
         
-        # Load Model
-        import joblib
-        import os
-        
-        model_path = "app/models/xgboost_model.joblib"
-        if os.path.exists(model_path):
-            model = joblib.load(model_path)
-            
-            # Prepare features for the latest date
-            from utils.processor import prepare_features_for_prediction
-            
-            # We need macro data for prediction
-            full_df = prepare_features_for_prediction(df, macro_data)
-            
+        if model is not None:
             if not full_df.empty:
-                latest_features = full_df.tail(1).drop(columns=['Open', 'High', 'Low', 'Close', 'Volume', 'Log_Return', 'BB_Upper', 'BB_Lower'], errors='ignore')
-                # Ensure feature order matches training
-                feature_names = ['RSI', 'MACD', 'MACD_Signal', 'Log_Return_lag_1', 
-                                'Log_Return_lag_2', 'Log_Return_lag_3', 'Log_Return_lag_4', 
-                                'Log_Return_lag_5', 'VIX', 'TNX']
-                
                 # Check if all features are present
-                missing_features = [f for f in feature_names if f not in latest_features.columns]
                 if not missing_features:
-                    X_pred = latest_features[feature_names]
-                    
-                    # Prediction
-                    prediction = model.predict(X_pred)[0]
-                    prob = model.predict_proba(X_pred)[0]
-                    confidence = prob[1] if prediction == 1 else prob[0]
+                    # Prediction for the latest date (direction and probability from one pass)
+                    prob_up = float(probabilities.iloc[-1])
+                    prediction = int(prob_up > 0.5)
+                    confidence = prob_up if prediction == 1 else 1 - prob_up
                     
                     # Display Signal
                     col1, col2 = st.columns(2)
@@ -233,10 +277,38 @@ if data is not None and not data.empty:
                             st.error("SIGNAL: SELL / BEARISH")
                         st.metric("Confidence Score", f"{confidence:.2%}")
                     
+                    # Contributions of every feature to every prediction, from one batched call
+                    with telemetry.span('explain', rows=len(full_df)):
+                        if snapshot is not None:
+                            contributions = snapshot.contributions
+                        else:
+                            contributions = get_contributions(model, ticker, full_df, feature_names)
+
                     with col2:
                         st.write("### Model Interpretation")
                         st.write("The model analyzes technical indicators and macro volatility to determine the most likely direction for the next period.")
                         st.progress(float(confidence))
+                        latest = contributions[feature_names].iloc[-1].sort_values()
+                        fig_latest = go.Figure(go.Bar(x=latest.values, y=latest.index, orientation='h',
+                                                      marker_color=['#2ecc71' if v > 0 else '#e74c3c' for v in latest.values]))
+                        fig_latest.update_layout(height=320, template="plotly_dark", margin=dict(l=0, r=0, t=30, b=0),
+                                                 title="Contributions to the latest prediction (log-odds)")
+                        st.plotly_chart(fig_latest)
+
+                    st.write("### Feature Importance Over Time")
+                    st.caption("Share of each feature in the mean absolute contribution over a rolling 21-bar window, "
+                               "computed for every prediction of the period.")
+                    with telemetry.span('chart.importance'):
+                        importance = memoize_frame(rolling_importance)(contributions)
+                        fig_importance = go.Figure()
+                        for name in importance.columns:
+                            share = downsample(importance[name], width_px=chart_width)
+                            fig_importance.add_trace(go.Scattergl(x=share.index, y=share, name=name, mode='lines'))
+                        fig_importance.update_layout(height=420, template="plotly_dark", yaxis_tickformat='.0%',
+                                                     margin=dict(l=0, r=0, t=10, b=0))
+                        st.plotly_chart(fig_importance)
+                    overall = contributions[feature_names].abs().mean().sort_values(ascending=False)
+                    st.dataframe(overall.rename('Mean |contribution|').to_frame())
                 else:
                     st.error(f"Missing features for prediction: {missing_features}")
             else:
@@ -259,18 +331,13 @@ if data is not None and not data.empty:
             </div>
         """, unsafe_allow_html=True)
         
-        if os.path.exists(model_path):
-            from utils.processor import run_backtest
-            
-            # We need the full processed data
-            full_df = prepare_features_for_prediction(df, macro_data)
-            
-            if not full_df.empty:
-                feature_names = ['RSI', 'MACD', 'MACD_Signal', 'Log_Return_lag_1', 
-                                'Log_Return_lag_2', 'Log_Return_lag_3', 'Log_Return_lag_4', 
-                                'Log_Return_lag_5', 'VIX', 'TNX']
-                
-                backtest_results = run_backtest(full_df, model, feature_names)
+        if model is not None:
+            if probabilities is not None:
+                with telemetry.span('backtest', rows=len(full_df)):
+                    if snapshot is not None:
+                        backtest_results = snapshot.backtest
+                    else:
+                        backtest_results = memoize_frame(run_backtest)(full_df, model, feature_names, probabilities)
                 
                 # Metrics
                 final_market = backtest_results['Cumulative_Market'].iloc[-2] # -2 because shift(-1)
@@ -282,12 +349,71 @@ if data is not None and not data.empty:
                 col3.metric("Outperformance", f"{(final_strategy - final_market):+.2%}")
                 
                 # Chart
-                fig_backtest = go.Figure()
-                fig_backtest.add_trace(go.Scatter(x=backtest_results.index, y=backtest_results['Cumulative_Market'], name="Buy & Hold", line=dict(color='gray', dash='dash')))
-                fig_backtest.add_trace(go.Scatter(x=backtest_results.index, y=backtest_results['Cumulative_Strategy'], name="AI Strategy", line=dict(color='cyan', width=3)))
-                
-                fig_backtest.update_layout(title="Cumulative Returns Comparison", template="plotly_dark", height=500)
-                st.plotly_chart(fig_backtest)
+                with telemetry.span('chart.backtest'):
+                    market = downsample(backtest_results['Cumulative_Market'], width_px=chart_width)
+                    strategy = downsample(backtest_results['Cumulative_Strategy'], width_px=chart_width)
+                    fig_backtest = go.Figure()
+                    fig_backtest.add_trace(go.Scattergl(x=market.index, y=market, name="Buy & Hold", line=dict(color='gray', dash='dash')))
+                    fig_backtest.add_trace(go.Scattergl(x=strategy.index, y=strategy, name="AI Strategy", line=dict(color='cyan', width=3)))
+
+                    fig_backtest.update_layout(title="Cumulative Returns Comparison", template="plotly_dark", height=500)
+                    st.plotly_chart(fig_backtest)
+
+                st.write("### Risk Analysis")
+                st.caption("Strategy and buy-and-hold daily returns resampled together into alternative paths "
+                           "of the same length: how much the result above could have varied.")
+                col1, col2, col3 = st.columns(3)
+                method = col1.selectbox("Resampling", risk.METHODS,
+                                        format_func={'block': 'Block bootstrap', 'iid': 'IID bootstrap',
+                                                     'normal': 'Monte Carlo (normal)'}.get)
+                # Default: as many paths as fit the budget of 10,000 paths x 5 years (about a second)
+                path_options = [1_000, 5_000, 10_000, 20_000, 50_000]
+                fitting = [p for p in path_options[:3] if p * len(backtest_results) <= 10_000 * 1_260]
+                n_paths = col2.select_slider("Paths", options=path_options, value=fitting[-1] if fitting else path_options[0])
+                block_size = col3.slider("Block size (bars)", 5, 63, 21, disabled=method != 'block')
+                with telemetry.span('risk.simulate', paths=n_paths, method=method):
+                    simulation = memoize_frame(run_risk_simulation)(backtest_results, n_paths, method, block_size)
+                    risk_table = risk.summary(simulation)
+
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("P(beat Buy & Hold)", f"{risk.prob_beat_market(simulation):.1%}")
+                # VaR / CVaR are losses: shown as the corresponding total returns
+                col2.metric("VaR 95% (5% worst return)", f"{-risk_table.loc['strategy', 'var_95%']:+.2%}")
+                col3.metric("CVaR 95% (mean of worst 5%)", f"{-risk_table.loc['strategy', 'cvar_95%']:+.2%}")
+                col4.metric("Median Max Drawdown", f"{risk_table.loc['strategy', 'median_max_drawdown']:.2%}")
+
+                with telemetry.span('chart.risk'):
+                    bands = simulation['bands']['strategy']
+                    fig_risk = go.Figure()
+                    fig_risk.add_trace(go.Scatter(x=bands.index, y=bands[0.95], line=dict(width=0), showlegend=False, hoverinfo='skip'))
+                    fig_risk.add_trace(go.Scatter(x=bands.index, y=bands[0.05], name="5-95%", line=dict(width=0),
+                                                  fill='tonexty', fillcolor='rgba(0, 255, 255, 0.15)'))
+                    fig_risk.add_trace(go.Scatter(x=bands.index, y=bands[0.75], line=dict(width=0), showlegend=False, hoverinfo='skip'))
+                    fig_risk.add_trace(go.Scatter(x=bands.index, y=bands[0.25], name="25-75%", line=dict(width=0),
+                                                  fill='tonexty', fillcolor='rgba(0, 255, 255, 0.3)'))
+                    fig_risk.add_trace(go.Scatter(x=bands.index, y=bands[0.5], name="Median path", line=dict(color='cyan', dash='dot')))
+                    fig_risk.add_trace(go.Scattergl(x=strategy.index, y=strategy, name="AI Strategy", line=dict(color='white')))
+                    fig_risk.update_layout(title="Resampled strategy growth (quantile bands)", template="plotly_dark", height=450)
+                    st.plotly_chart(fig_risk)
+
+                    fig_drawdown = go.Figure()
+                    fig_drawdown.add_trace(go.Histogram(x=simulation['market_drawdown'], name="Buy & Hold",
+                                                        marker_color='gray', opacity=0.6, nbinsx=50))
+                    fig_drawdown.add_trace(go.Histogram(x=simulation['strategy_drawdown'], name="AI Strategy",
+                                                        marker_color='cyan', opacity=0.6, nbinsx=50))
+                    fig_drawdown.update_layout(title="Maximum drawdown distribution", template="plotly_dark", height=350,
+                                               barmode='overlay', xaxis_tickformat='.0%')
+                    st.plotly_chart(fig_drawdown)
+                st.dataframe(risk_table.T.rename(columns={'strategy': 'AI Strategy', 'market': 'Buy & Hold'}))
+
+                with st.expander("Strategy Parameter Sweep"):
+                    st.write("Thresholds, long/short modes, holding periods and transaction costs evaluated in one vectorized pass (top 10 by Sharpe ratio).")
+                    with telemetry.span('backtest.sweep'):
+                        if snapshot is not None:
+                            sweep_results = snapshot.sweep
+                        else:
+                            sweep_results = memoize_frame(run_strategy_sweep)(full_df, probabilities)
+                    st.dataframe(sweep_results.sort_values('sharpe', ascending=False).head(10))
             else:
                 st.warning("Not enough data for backtesting.")
         else:
@@ -298,3 +424,18 @@ else:
     st.info(f"The asset '{ticker}' might not be available in the local fallback data or there is a connectivity issue with Yahoo Finance.")
     if st.button("Retry"):
         st.rerun()
+
+with st.sidebar.expander("Cache statistics"):
+    st.table(pd.DataFrame(cache_stats()).T)
+
+if debug:
+    spans = telemetry.records(since=run_start, thread=run_thread)
+    counts = telemetry.counters(since=run_start, thread=run_thread)
+    with st.sidebar.expander("Debug: stage timings", expanded=True):
+        stages = telemetry.summary(spans)
+        st.caption(f"This run: {sum(s['duration'] for s in spans if s['depth'] == 0) * 1000:.1f} ms in instrumented stages")
+        st.dataframe(stages.round(2), hide_index=True)
+        st.download_button("Chrome trace (JSON)", json.dumps(telemetry.chrome_trace(spans)),
+                           file_name="trace.json", mime="application/json")
+        st.download_button("Prometheus metrics", telemetry.prometheus_text(spans, counts),
+                           file_name="metrics.prom", mime="text/plain")
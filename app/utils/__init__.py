@@ -0,0 +1,8 @@
+import os
+import sys
+
+# `streamlit run app/main.py` only puts `app/` on sys.path: expose the project
+# root so the shared `src` package (indicators, ...) can be imported.
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
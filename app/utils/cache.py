@@ -0,0 +1,230 @@
+import datetime
+import functools
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import registry, snapshots
+from src.feature_store import FeatureStore
+from utils.data_loader import fetch_stock_data, fetch_macro_data
+from utils.processor import explain_predictions
+
+# Module-level state survives Streamlit reruns (the module is imported once
+# per process), so every session of the app shares these caches.
+MARKET_DATA_TTL = 15 * 60  # seconds
+MAX_FRAMES = 64
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _record(namespace, hit):
+    counts = _stats.setdefault(namespace, {"hits": 0, "misses": 0})
+    counts["hits" if hit else "misses"] += 1
+
+
+def cache_stats():
+    """Hit/miss counters per cache namespace."""
+    with _lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
+
+
+def clear_caches():
+    """Empty every cache and reset the counters."""
+    with _lock:
+        _market_cache.clear()
+        _models.clear()
+        registry.clear_loaded()
+        _frames.clear()
+        _snapshots.clear()
+        _stats.clear()
+
+
+class TTLCache:
+    """Small thread-safe dict whose entries expire after `ttl` seconds."""
+
+    def __init__(self, namespace, ttl):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, key, compute):
+        now = time.monotonic()
+        with _lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                _record(self.namespace, True)
+                return entry[1]
+            _record(self.namespace, False)
+        value = compute()
+        # Failed fetches are not cached so that "Retry" really retries.
+        if value is not None and not (isinstance(value, pd.DataFrame) and value.empty):
+            with _lock:
+                self._entries[key] = (now, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+_market_cache = TTLCache("market_data", MARKET_DATA_TTL)
+
+
+def get_stock_data(ticker, period="5y", interval="1d"):
+    """`fetch_stock_data` cached by (ticker, period, interval) with a TTL."""
+    return _market_cache.get(("stock", ticker, period, interval),
+                             lambda: fetch_stock_data(ticker, period=period, interval=interval))
+
+
+def get_macro_data(period="5y"):
+    """`fetch_macro_data` cached by period with a TTL."""
+    return _market_cache.get(("macro", period), lambda: fetch_macro_data(period=period))
+
+
+_models = set()
+
+
+def load_model(version=None):
+    """
+    Latest registered model (or `version`), loaded once per process and
+    shared by every session; a newly registered version is picked up on the
+    next call. Returns None if no model is registered.
+    """
+    resolved = registry.latest_version() if version is None else version
+    if resolved is None:
+        return None
+    with _lock:
+        _record("model", (registry.DEFAULT_NAME, resolved) in _models)
+    model = registry.get_model(version=resolved)
+    with _lock:
+        _models.add((registry.DEFAULT_NAME, resolved))
+    return model
+
+
+def frame_hash(df):
+    """Content hash of a dataframe or series (values, index and labels)."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    labels = list(df.columns) if isinstance(df, pd.DataFrame) else [df.name]
+    digest.update(repr(labels).encode())
+    return digest.hexdigest()
+
+
+_feature_store = None
+
+
+def get_features(ticker, data):
+    """
+    Bars plus indicator columns from the shared on-disk feature store
+    (also used for training): a warm read when the bars are unchanged,
+    only the new rows computed when bars were appended.
+    """
+    global _feature_store
+    if _feature_store is None:
+        _feature_store = FeatureStore()
+    warm = _feature_store.hits['warm']
+    frame = _feature_store.get(ticker, data)
+    with _lock:
+        _record("feature_store", _feature_store.hits['warm'] > warm)
+    return frame
+
+
+_snapshots = {}
+
+
+def get_snapshot(ticker, period):
+    """
+    Precomputed snapshot of (ticker, period) from `python -m src.snapshots
+    build`, or None when it is missing, too old or made with a model other
+    than the latest one (the page then computes live). Each snapshot is
+    read from disk once per process.
+    """
+    path = os.path.join(snapshots.snapshot_dir(ticker, period), snapshots.META_FILE)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        with _lock:
+            _record("snapshots", False)
+        return None
+    with _lock:
+        entry = _snapshots.get((ticker, period))
+    snapshot = entry[1] if entry is not None and entry[0] == mtime else None
+    if snapshot is None:
+        snapshot = snapshots.read_snapshot(ticker, period)
+        if snapshot is not None:
+            with _lock:
+                _snapshots[(ticker, period)] = (mtime, snapshot)
+    fresh = snapshot is not None and snapshot.is_fresh(registry.latest_version())
+    with _lock:
+        _record("snapshots", fresh)
+    return snapshot if fresh else None
+
+
+_frames = {}
+
+
+# Plain values keyed by their repr
+_SCALARS = (str, int, float, bool, type(None), np.generic, pd.Timestamp, pd.Timedelta, datetime.date)
+
+
+def _key_part(value):
+    """
+    Part of a memoization key that identifies `value` by content: frames by
+    hash, registered models by (name, version), scalars and sequences of
+    them by value. Anything else is refused: an identity-based key would be
+    reused by a different object once the first one is garbage collected.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return frame_hash(value)
+    if isinstance(value, (tuple, list)):
+        return (type(value).__name__,) + tuple(_key_part(v) for v in value)
+    if isinstance(value, registry.RegisteredModel):
+        return ('model', value.name, value.version)
+    if isinstance(value, _SCALARS):
+        return repr(value)
+    raise TypeError(f"Cannot build a memoization key from a {type(value).__name__} argument")
+
+
+def _memoized(key, compute):
+    with _lock:
+        if key in _frames:
+            _record("frames", True)
+            return _frames[key]
+        _record("frames", False)
+    result = compute()
+    with _lock:
+        if len(_frames) >= MAX_FRAMES:
+            _frames.pop(next(iter(_frames)))
+        _frames[key] = result
+    return result
+
+
+def memoize_frame(func):
+    """
+    Memoize a function of dataframes: the key is the function name plus the
+    content hash of every dataframe argument (models by name and version,
+    plain values by value; other arguments raise TypeError).
+    Results are shared, so callers must not modify them in place.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__qualname__,
+               tuple(_key_part(value) for value in args),
+               tuple((name, _key_part(value)) for name, value in sorted(kwargs.items())))
+        return _memoized(key, lambda: func(*args, **kwargs))
+    return wrapper
+
+
+def get_contributions(model, ticker, df, feature_names, approximate=True):
+    """
+    Feature contributions of every row of `df` (see `explain_predictions`),
+    cached per (model version, ticker, date range). The feature values are
+    part of the key too, so a revised last bar is explained again.
+    """
+    features = df[feature_names]
+    key = ('contributions', _key_part(model), ticker, features.index[0], features.index[-1],
+           approximate, frame_hash(features))
+    return _memoized(key, lambda: explain_predictions(features, model, feature_names, approximate))
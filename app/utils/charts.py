@@ -0,0 +1,102 @@
+"""
+Downsampling before plotting.
+
+Long histories are reduced to what the chart can actually display: OHLC
+bars are merged into coarser candles (first open, highest high, lowest low,
+last close, so no extreme is lost) and line series are reduced with
+Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape of the
+curve. Targets are derived from the width of the chart in pixels (passed
+by the caller, `CHART_WIDTH_PX` by default), so the payload sent to the
+browser stays the same whatever the length of the history.
+"""
+import numpy as np
+import pandas as pd
+
+# Default width budget (a full-width chart on a typical desktop screen)
+CHART_WIDTH_PX = 1400
+PX_PER_CANDLE = 3
+POINTS_PER_PX = 2
+
+
+def max_candles(width_px=CHART_WIDTH_PX):
+    return max(1, width_px // PX_PER_CANDLE)
+
+
+def max_points(width_px=CHART_WIDTH_PX):
+    return max(3, width_px * POINTS_PER_PX)
+
+
+def _bucket_starts(n, n_buckets):
+    """First row of each of `n_buckets` contiguous buckets covering `n` rows."""
+    return (np.arange(n_buckets) * n) // n_buckets
+
+
+def resample_ohlc(df, max_bars=None, width_px=CHART_WIDTH_PX):
+    """
+    Merge consecutive bars so at most `max_bars` remain (by default what a
+    chart `width_px` pixels wide can show). Each merged candle is stamped
+    with the date of its first bar; Volume (if present) is summed.
+    Frames already short enough are returned unchanged.
+    """
+    max_bars = max_bars or max_candles(width_px)
+    n = len(df)
+    if n <= max_bars:
+        return df
+    starts = _bucket_starts(n, max_bars)
+    lasts = np.append(starts[1:], n) - 1
+    out = pd.DataFrame({
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.fmax.reduceat(df['High'].to_numpy(dtype=float), starts),
+        'Low': np.fmin.reduceat(df['Low'].to_numpy(dtype=float), starts),
+        'Close': df['Close'].to_numpy()[lasts],
+    }, index=df.index[starts])
+    if 'Volume' in df.columns:
+        out['Volume'] = np.add.reduceat(np.nan_to_num(df['Volume'].to_numpy(dtype=float)), starts)
+    return out
+
+
+def lttb(x, y, n_out):
+    """
+    Indices of the `n_out` points kept by Largest-Triangle-Three-Buckets.
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    starts = _bucket_starts(n - 2, n_out - 2) + 1
+    ends = np.append(starts[1:], n - 1)
+    counts = ends - starts
+    avg_x = np.add.reduceat(x[:n - 1], starts) / counts
+    avg_y = np.add.reduceat(y[:n - 1], starts) / counts
+    # Each bucket looks ahead to the next one (the last bucket to the last point)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        s, e = starts[i], ends[i]
+        area = np.abs((x[a] - next_x[i]) * (y[s:e] - y[a]) - (x[a] - x[s:e]) * (next_y[i] - y[a]))
+        a = s + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_series(series, n_out=None, width_px=CHART_WIDTH_PX):
+    """
+    LTTB-reduced copy of a series (missing values are dropped first), to
+    `n_out` points or by default what a chart `width_px` pixels wide can show.
+    """
+    n_out = n_out or max_points(width_px)
+    series = series.dropna()
+    if len(series) <= n_out:
+        return series
+    index = series.index
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x, series.to_numpy(dtype=float), n_out)]
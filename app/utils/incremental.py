@@ -0,0 +1,2 @@
+# The engine lives in the shared `src` package (also used by the replay harness)
+from src.incremental import IncrementalIndicators  # noqa: F401
@@ -0,0 +1,109 @@
+"""
+Vectorized backtesting engine.
+
+Strategies are columns of a position matrix of shape (time, strategies):
+probability thresholds, long/short/flat modes, holding periods and
+transaction costs are all expanded into columns and evaluated in one NumPy
+pass. Conventions match `run_backtest`: the position held at bar t earns
+the log return of bar t+1, and every change of position pays the cost
+proportionally to its size.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+MODES = ('long', 'short', 'long_short')
+PERIODS_PER_YEAR = 252
+
+
+def positions_from_probabilities(probabilities, threshold=0.5, mode='long', holding_period=1):
+    """
+    Turn up-move probabilities into positions (+1 long, -1 short, 0 flat).
+    Long when p > threshold, short when p < 1 - threshold. With a holding
+    period h the position is only revised every h bars.
+    """
+    p = np.asarray(probabilities, dtype=float)
+    long_ = (p > threshold).astype(float)
+    short = (p < 1 - threshold).astype(float)
+    if mode == 'long':
+        pos = long_
+    elif mode == 'short':
+        pos = -short
+    elif mode == 'long_short':
+        pos = long_ - short
+    else:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+    if holding_period > 1:
+        pos = pos[np.arange(len(pos)) // holding_period * holding_period]
+    return pos
+
+
+def strategy_returns(positions, log_returns, costs=0.001):
+    """
+    Log returns of each strategy, shape (time - 1, strategies).
+    `positions` is (time,) or (time, strategies); `costs` a scalar or one
+    value per strategy. The last bar has no next return and is dropped.
+    """
+    pos = np.asarray(positions, dtype=float)
+    if pos.ndim == 1:
+        pos = pos[:, None]
+    market = np.nan_to_num(np.asarray(log_returns, dtype=float))
+    trades = np.abs(np.diff(pos, axis=0, prepend=pos[:1]))
+    return pos[:-1] * market[1:, None] - trades[:-1] * np.asarray(costs, dtype=float)
+
+
+def performance(returns, positions, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Metrics per strategy column of `returns` (as produced by
+    `strategy_returns`): total return, annualized Sharpe ratio, maximum
+    drawdown, average turnover per bar and hit rate of the bars in the market.
+    """
+    pos = np.asarray(positions, dtype=float)
+    if pos.ndim == 1:
+        pos = pos[:, None]
+    held = pos[:-1] != 0
+
+    cum = np.cumsum(returns, axis=0)
+    peak = np.maximum.accumulate(np.maximum(cum, 0.0), axis=0)
+    std = returns.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, returns.mean(axis=0) / std * np.sqrt(periods_per_year), np.nan)
+        hit_rate = ((returns > 0) & held).sum(axis=0) / held.sum(axis=0)
+    turnover = np.abs(np.diff(pos, axis=0)).mean(axis=0) if len(pos) > 1 else np.zeros(pos.shape[1])
+    return {
+        'total_return': np.exp(cum[-1]) - 1,
+        'sharpe': sharpe,
+        'max_drawdown': (np.exp(cum - peak) - 1).min(axis=0),
+        'turnover': np.broadcast_to(turnover, sharpe.shape),
+        'hit_rate': hit_rate,
+    }
+
+
+def sweep(probabilities, log_returns, thresholds=(0.5,), costs=(0.001,), modes=('long',),
+          holding_periods=(1,), periods_per_year=PERIODS_PER_YEAR):
+    """
+    Evaluate every combination of threshold, mode, holding period and cost
+    in one vectorized pass. Returns one row per configuration with its
+    parameters and metrics, plus the buy-and-hold benchmark return in
+    `market_return`.
+    """
+    p = np.asarray(probabilities, dtype=float)
+    signals = list(itertools.product(thresholds, modes, holding_periods))
+    pos = np.empty((len(p), len(signals)))
+    for j, (threshold, mode, h) in enumerate(signals):
+        pos[:, j] = positions_from_probabilities(p, threshold, mode, h)
+
+    # Each signal column is evaluated for every cost level.
+    n_costs = len(costs)
+    pos = np.repeat(pos, n_costs, axis=1)
+    cost_row = np.tile(np.asarray(costs, dtype=float), len(signals))
+    rets = strategy_returns(pos, log_returns, cost_row)
+    metrics = performance(rets, pos, periods_per_year)
+
+    configs = pd.DataFrame(
+        [(t, m, h, c) for (t, m, h) in signals for c in costs],
+        columns=['threshold', 'mode', 'holding_period', 'cost'])
+    result = configs.assign(**metrics)
+    result['market_return'] = np.exp(np.nan_to_num(np.asarray(log_returns, dtype=float))[1:].sum()) - 1
+    return result
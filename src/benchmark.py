@@ -0,0 +1,470 @@
+"""
+Performance benchmark suite.
+
+Times the indicator kernels (`src/features.py`, `src/indicators.py`), the
+local CSV fallback loader, the dashboard processing steps
+(`prepare_features_for_prediction`, `run_backtest`), the strategy sweep,
+`train_and_save_model`, single/batch scoring and sequence batching on
+synthetic OHLCV data, from 1k to 10M rows and 1 to 500 tickers (with
+`--memory`, also the peak allocated memory of one call). Results are written as JSON and
+compared with a saved baseline; a benchmark slower than the baseline by
+more than `--threshold` is flagged as a regression (exit status 1).
+
+    python -m src.benchmark --profile quick --save-baseline
+    python -m src.benchmark --profile quick            # compare with it
+    python -m src.benchmark --profile full --filter 'indicators|features'
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from . import backtest, data_loader, features, indicators, processor, scoring
+from .sequences import SequenceDataset
+from .store import MarketStore
+from .train_model import FEATURES, TARGET, load_dataset, train_and_save_model
+
+RESULTS_PATH = os.path.join('benchmarks', 'results.json')
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+PROFILES = {
+    'quick': {'rows': [1_000, 100_000], 'tickers': [1, 10]},
+    'full': {'rows': [1_000, 10_000, 100_000, 1_000_000, 10_000_000], 'tickers': [1, 10, 100, 500]},
+}
+MIN_ROWS_PER_TICKER = 100
+
+BENCHMARKS = []
+
+
+def benchmark(name, panel=False, max_rows=None):
+    """
+    Register a benchmark. The decorated setup function receives
+    (n_rows, n_tickers) and returns the callable to time. `panel`
+    benchmarks are run for every ticker count, the others on one series.
+    """
+    def register(setup):
+        BENCHMARKS.append({'name': name, 'setup': setup, 'panel': panel, 'max_rows': max_rows})
+        return setup
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=2)
+def synthetic_ohlcv(n_rows, n_tickers=1, seed=0):
+    """
+    Random-walk OHLCV bars: `n_rows` rows in total, spread over `n_tickers`
+    tickers (long layout sorted by date with a `Ticker` column, like
+    features.csv). Minute timestamps keep 10M rows in range.
+    """
+    n_dates = n_rows // n_tickers
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_dates, n_tickers)), axis=0))
+    high = close * (1 + rng.uniform(0, 0.01, close.shape))
+    low = close * (1 - rng.uniform(0, 0.01, close.shape))
+    dates = pd.date_range('2000-01-03', periods=n_dates, freq='min')
+    df = pd.DataFrame({
+        'Open': (close * (1 + rng.normal(0, 0.005, close.shape))).ravel(),
+        'High': high.ravel(),
+        'Low': low.ravel(),
+        'Close': close.ravel(),
+        'Volume': rng.integers(100_000, 1_000_000, close.size).astype(float),
+        'Ticker': np.tile([f'T{i:03d}' for i in range(n_tickers)], n_dates),
+    }, index=pd.Index(np.repeat(dates, n_tickers), name='Date'))
+    return df
+
+
+@functools.lru_cache(maxsize=2)
+def synthetic_features(n_rows, n_tickers=1, seed=0):
+    """Synthetic bars with every indicator, macro columns and the target, like features.csv."""
+    bars = synthetic_ohlcv(n_rows, n_tickers, seed)
+    shape = (len(bars) // n_tickers, n_tickers)
+    field = lambda name: bars[name].to_numpy().reshape(shape)
+    values = indicators.compute_indicators(field('Close'), field('High'), field('Low'))
+    df = bars.copy()
+    for name, v in values.items():
+        df[name] = v.ravel()
+    rng = np.random.default_rng(seed + 1)
+    n_dates = shape[0]
+    df['VIX'] = np.repeat(15 + np.cumsum(rng.normal(0, 0.2, n_dates)), n_tickers)
+    df['TNX'] = np.repeat(3 + np.cumsum(rng.normal(0, 0.01, n_dates)), n_tickers)
+    next_close = np.vstack([field('Close')[1:], np.full((1, n_tickers), np.nan)]).ravel()
+    df[TARGET] = (next_close > df['Close'].to_numpy()).astype(int)
+    return df.dropna()
+
+
+def _single(n_rows):
+    return synthetic_ohlcv(n_rows)
+
+
+def _write_features_csv(n_rows, n_tickers):
+    """Write a synthetic processed CSV where the loader and training expect it."""
+    path = os.path.join('data', 'processed', 'features.csv')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    synthetic_features(n_rows, n_tickers).to_csv(path)
+    return path
+
+
+@functools.lru_cache(maxsize=1)
+def _model():
+    """Small model shared by the backtest and scoring benchmarks."""
+    from xgboost import XGBClassifier
+    df = synthetic_features(20_000, 1)
+    model = XGBClassifier(n_estimators=100, max_depth=4, learning_rate=0.05, random_state=42)
+    model.fit(df[FEATURES], df[TARGET])
+    return model
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+@benchmark('features.rsi')
+def _(n_rows, n_tickers):
+    close = _single(n_rows)['Close']
+    return lambda: features.calculate_rsi(close)
+
+
+@benchmark('features.macd')
+def _(n_rows, n_tickers):
+    close = _single(n_rows)['Close']
+    return lambda: features.calculate_macd(close)
+
+
+@benchmark('features.bollinger_bands')
+def _(n_rows, n_tickers):
+    close = _single(n_rows)['Close']
+    return lambda: features.calculate_bollinger_bands(close)
+
+
+@benchmark('features.log_returns')
+def _(n_rows, n_tickers):
+    close = _single(n_rows)['Close']
+    return lambda: features.calculate_log_returns(close)
+
+
+@benchmark('features.atr')
+def _(n_rows, n_tickers):
+    df = _single(n_rows)
+    return lambda: features.calculate_atr(df)
+
+
+@benchmark('features.adx')
+def _(n_rows, n_tickers):
+    df = _single(n_rows)
+    return lambda: features.calculate_adx(df)
+
+
+@benchmark('features.cci')
+def _(n_rows, n_tickers):
+    df = _single(n_rows)
+    return lambda: features.calculate_cci(df)
+
+
+def _rolling_apply_cci(df, window=20):
+    """The CCI as computed before the vectorized kernel (one Python call per row)."""
+    tp = (df['High'] + df['Low'] + df['Close']) / 3
+    sma_tp = tp.rolling(window=window).mean()
+    mean_dev = tp.rolling(window=window).apply(lambda x: np.abs(x - x.mean()).mean())
+    return (tp - sma_tp) / (0.015 * mean_dev)
+
+
+@benchmark('features.cci_rolling_apply', max_rows=1_000_000)
+def _(n_rows, n_tickers):
+    df = _single(n_rows)
+    return lambda: _rolling_apply_cci(df)
+
+
+@benchmark('features.add_lags')
+def _(n_rows, n_tickers):
+    df = _single(n_rows).assign(Log_Return=lambda d: features.calculate_log_returns(d['Close']))
+    return lambda: features.add_lags(df, 'Log_Return', lags=5)
+
+
+@benchmark('indicators.compute_indicators', panel=True)
+def _(n_rows, n_tickers):
+    bars = synthetic_ohlcv(n_rows, n_tickers)
+    shape = (len(bars) // n_tickers, n_tickers)
+    close, high, low = (bars[c].to_numpy().reshape(shape) for c in ('Close', 'High', 'Low'))
+    return lambda: indicators.compute_indicators(close, high, low)
+
+
+@benchmark('processor.calculate_indicators')
+def _(n_rows, n_tickers):
+    df = _single(n_rows)
+    return lambda: processor.calculate_indicators(df)
+
+
+@benchmark('loader.sync_csv', panel=True, max_rows=1_000_000)
+def _(n_rows, n_tickers):
+    path = _write_features_csv(n_rows, n_tickers)
+    roots = iter(range(1_000_000))
+    return lambda: MarketStore(root=os.path.join('data', f'store-{next(roots)}')).sync_csv(path)
+
+
+@benchmark('loader.read_local', panel=True, max_rows=1_000_000)
+def _(n_rows, n_tickers):
+    _write_features_csv(n_rows, n_tickers)
+    shutil.rmtree(os.path.join('data', 'store'), ignore_errors=True)
+    ticker = data_loader.get_local_store().tickers()[0]
+    return lambda: data_loader.read_local(ticker, 'max')
+
+
+@benchmark('processor.prepare_features_for_prediction')
+def _(n_rows, n_tickers):
+    df = synthetic_features(n_rows, 1)
+    stock, macro = df.drop(columns=['VIX', 'TNX']), df[['VIX', 'TNX']]
+    return lambda: processor.prepare_features_for_prediction(stock, macro)
+
+
+@benchmark('processor.run_backtest')
+def _(n_rows, n_tickers):
+    df, model = synthetic_features(n_rows, 1), _model()
+    return lambda: processor.run_backtest(df, model, FEATURES)
+
+
+@benchmark('backtest.sweep')
+def _(n_rows, n_tickers):
+    df = synthetic_features(n_rows, 1)
+    proba = scoring.predict_proba(_model(), df[FEATURES])
+    log_returns = df['Log_Return'].to_numpy()
+    return lambda: backtest.sweep(proba, log_returns, thresholds=(0.5, 0.52, 0.55, 0.6),
+                                  costs=(0.0, 0.0005, 0.001, 0.002), modes=backtest.MODES,
+                                  holding_periods=(1, 2, 5, 10))
+
+
+@benchmark('processor.calculate_indicators_inplace')
+def _(n_rows, n_tickers):
+    df = _single(n_rows)
+    return lambda: processor.calculate_indicators(df.copy(deep=False), inplace=True)
+
+
+@benchmark('train.load_dataset', panel=True, max_rows=1_000_000)
+def _(n_rows, n_tickers):
+    _write_features_csv(n_rows, n_tickers)
+    return load_dataset
+
+
+@benchmark('train.train_and_save_model', panel=True, max_rows=1_000_000)
+def _(n_rows, n_tickers):
+    _write_features_csv(n_rows, n_tickers)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            train_and_save_model()
+    return run
+
+
+@benchmark('scoring.single')
+def _(n_rows, n_tickers):
+    scorer = scoring.Scorer(model=_model())
+    row = synthetic_features(1_000, 1)[FEATURES].iloc[-1:]
+    return lambda: scorer.score(row)
+
+
+@benchmark('scoring.batch', max_rows=1_000_000)
+def _(n_rows, n_tickers):
+    scorer = scoring.Scorer(model=_model())
+    rows = synthetic_features(n_rows, 1)[FEATURES]
+    return lambda: scorer.score(rows)
+
+
+@benchmark('sequences.epoch', panel=True, max_rows=1_000_000)
+def _(n_rows, n_tickers):
+    dataset = SequenceDataset.from_frame(synthetic_features(n_rows, n_tickers), lookback=60)
+    return lambda: sum(len(X) for X, _ in dataset.batches(batch_size=256, shuffle=True, seed=0))
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def measure(fn, min_time=0.2, max_repeats=20):
+    """
+    Time `fn` until `min_time` seconds have been spent (at least once, at
+    most `max_repeats` times). Returns the per-call timings in seconds.
+    """
+    timings = []
+    while len(timings) < max_repeats and sum(timings) < min_time:
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def peak_memory(fn):
+    """Peak memory (bytes) allocated by one call of `fn`, traced by tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def case_key(name, n_rows, n_tickers):
+    return f'{name}[rows={n_rows},tickers={n_tickers}]'
+
+
+def cases(rows, tickers, pattern=None):
+    """(benchmark, n_rows, n_tickers) combinations to run."""
+    for bench in BENCHMARKS:
+        if pattern and not re.search(pattern, bench['name']):
+            continue
+        for n_rows in rows:
+            if bench['max_rows'] and n_rows > bench['max_rows']:
+                continue
+            for n_tickers in (tickers if bench['panel'] else [1]):
+                if n_rows // n_tickers >= MIN_ROWS_PER_TICKER:
+                    yield bench, n_rows, n_tickers
+
+
+def environment():
+    import xgboost
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def run(rows, tickers, pattern=None, min_time=0.2, max_repeats=20, memory=False, verbose=True):
+    """
+    Run the selected benchmarks in a scratch directory.
+    Returns {'environment': ..., 'results': {case key: timings summary}}.
+    """
+    results = {}
+    env = environment()
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='benchmark-')
+    try:
+        os.chdir(workdir)
+        for bench, n_rows, n_tickers in cases(rows, tickers, pattern):
+            key = case_key(bench['name'], n_rows, n_tickers)
+            fn = bench['setup'](n_rows, n_tickers)
+            timings = measure(fn, min_time, max_repeats)
+            median = float(np.median(timings))
+            results[key] = {
+                'benchmark': bench['name'], 'rows': n_rows, 'tickers': n_tickers,
+                'median_s': median, 'min_s': float(np.min(timings)), 'repeats': len(timings),
+                'rows_per_s': n_rows / median if median > 0 else None,
+            }
+            if memory:
+                results[key]['peak_mb'] = peak_memory(fn) / 1024 ** 2
+            if verbose:
+                peak = f"  peak {results[key]['peak_mb']:.1f} MB" if memory else ''
+                print(f'{key:<70} {median * 1000:>12.3f} ms  ({len(timings)}x){peak}', flush=True)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {'environment': env, 'results': results}
+
+
+def compare(current, baseline, threshold=0.25, min_delta=1e-4):
+    """
+    Compare two result sets case by case. A case is a regression when its
+    median time exceeds the baseline by more than `threshold` (relative)
+    and `min_delta` seconds; it is an improvement in the symmetric case.
+    """
+    rows = []
+    for key, result in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            rows.append({'case': key, 'baseline_s': None, 'current_s': result['median_s'],
+                         'ratio': None, 'status': 'new'})
+            continue
+        ratio = result['median_s'] / base['median_s'] if base['median_s'] > 0 else np.inf
+        delta = result['median_s'] - base['median_s']
+        if ratio > 1 + threshold and delta > min_delta:
+            status = 'REGRESSION'
+        elif ratio < 1 / (1 + threshold) and -delta > min_delta:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append({'case': key, 'baseline_s': base['median_s'], 'current_s': result['median_s'],
+                     'ratio': ratio, 'status': status})
+    return pd.DataFrame(rows, columns=['case', 'baseline_s', 'current_s', 'ratio', 'status'])
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance benchmark suite")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+    parser.add_argument('--rows', type=int, nargs='+', help="row counts (overrides the profile)")
+    parser.add_argument('--tickers', type=int, nargs='+', help="ticker counts (overrides the profile)")
+    parser.add_argument('--filter', default=None, help="regex on benchmark names")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds spent per case")
+    parser.add_argument('--memory', action='store_true', help="also record the peak memory of each case")
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="also store the results as the baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="relative slowdown flagged as regression")
+    parser.add_argument('--list', action='store_true', help="list the benchmarks and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for bench in BENCHMARKS:
+            print(bench['name'])
+        return 0
+
+    profile = PROFILES[args.profile]
+    output, baseline_path = os.path.abspath(args.output), os.path.abspath(args.baseline)
+    results = run(args.rows or profile['rows'], args.tickers or profile['tickers'],
+                  pattern=args.filter, min_time=args.min_time, memory=args.memory)
+    save_results(results, output)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        save_results(results, baseline_path)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print("No baseline to compare with (run with --save-baseline first).")
+        return 0
+
+    report = compare(results, load_results(baseline_path), threshold=args.threshold)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(report.to_string(index=False, float_format=lambda v: f'{v:.4g}'))
+    regressions = report[report['status'] == 'REGRESSION']
+    if len(regressions):
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+"""
+Out-of-core feature computation.
+
+The bars of a ticker are streamed from the market store in time-ordered
+chunks. Each chunk is computed with `compute_indicators_stateful`, whose
+state carries the overlap needed at the boundary (the last
+`warmup_length` rows of prices for the rolling windows, and the EMA values
+for MACD), then written to the output Parquet file as a row group before
+the next chunk is read. Peak memory depends on the chunk size only, and
+the output is bit-identical to computing the whole history in memory.
+
+    python -m src.chunked AAPL MSFT --chunk-rows 1000000 --output-dir data/features/chunked
+"""
+import argparse
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from . import indicators
+from .features import compact_values
+from .store import DATE_COLUMN, MarketStore
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+OUTPUT_DIR = os.path.join('data', 'features', 'chunked')
+
+
+def compute_chunk(bars, state=None, **params):
+    """Feature frame of one chunk of bars, and the state for the next chunk."""
+    has_range = 'High' in bars.columns and 'Low' in bars.columns
+    values, state = indicators.compute_indicators_stateful(
+        bars['Close'].to_numpy(),
+        bars['High'].to_numpy() if has_range else None,
+        bars['Low'].to_numpy() if has_range else None,
+        state=state, **params)
+    return bars.assign(**compact_values(values)), state
+
+
+def iter_features(chunks, **params):
+    """Feature frames for a stream of time-ordered bar chunks."""
+    state = None
+    for bars in chunks:
+        frame, state = compute_chunk(bars, state, **params)
+        yield frame
+
+
+def write_chunks(frames, path):
+    """
+    Write a stream of frames to one Parquet file, one row group per frame.
+    The file appears under `path` only once complete. Returns the row count.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    writer, rows = None, 0
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame.rename_axis(DATE_COLUMN).reset_index(), preserve_index=False)
+            if writer is None:
+                # Dictionary encoding never pays off on continuous prices and
+                # indicators, and its per-row-group attempt dominates the write.
+                writer = pq.ParquetWriter(tmp, table.schema, use_dictionary=False)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return 0
+    os.replace(tmp, path)
+    return rows
+
+
+def build_features(store, ticker, path, chunk_rows=DEFAULT_CHUNK_ROWS, **params):
+    """Stream `ticker` from `store` through the indicators into `path`."""
+    return write_chunks(iter_features(store.iter_chunks(ticker, chunk_rows), **params), path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core feature computation")
+    parser.add_argument('tickers', nargs='*', help="tickers (default: every ticker of the store)")
+    parser.add_argument('--store', default=None, help="market store root")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    store = MarketStore(args.store) if args.store else MarketStore()
+    for ticker in args.tickers or store.tickers():
+        start = time.perf_counter()
+        path = os.path.join(args.output_dir, f'{ticker}.parquet')
+        rows = build_features(store, ticker, path, chunk_rows=args.chunk_rows)
+        print(f"{ticker}: {rows:,} rows -> {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import pandas as pd
+import numpy as np
+import os
+
+from .downloader import Downloader
+from .panel import load_universe
+from .store import DEFAULT_ROOT, MarketStore, MACRO_TICKER, period_start
+
+LOCAL_CSV = "data/processed/features.csv"
+
+def filter_by_period(df, period):
+    """
+    Filter a dataframe by a yfinance-style period string, 
+    relative to the last available date in the data.
+    """
+    if period == "max" or df.empty:
+        return df
+    
+    start_date = period_start(df.index.max(), period)
+    if start_date is not None:
+        return df[df.index >= start_date]
+    
+    return df
+
+_stores = {}
+
+def get_local_store(root=DEFAULT_ROOT):
+    """
+    Local columnar store (one instance per root, so its cached last
+    timestamps are reused), refreshed from the processed CSV only when the
+    CSV file has changed since the last ingestion.
+    """
+    if root not in _stores:
+        _stores[root] = MarketStore(root)
+    store = _stores[root]
+    store.sync_csv(LOCAL_CSV)
+    return store
+
+def read_local(ticker, period, columns=None):
+    """Read one ticker over a period from the local store (pushed-down filters)."""
+    store = get_local_store()
+    start = period_start(store.last_timestamp(ticker), period)
+    return store.read(ticker, start=start, columns=columns)
+
+def get_universe():
+    """
+    Tickers offered by the dashboard: the universe file (`data/universe.txt`,
+    default AAPL/MSFT/TSLA) followed by any other ticker of the local store.
+    """
+    tickers = load_universe()
+    try:
+        tickers += [t for t in get_local_store().tickers() if t not in tickers]
+    except Exception as e:
+        print(f"Local store unavailable: {e}")
+    return tickers
+
+_downloaders = {}
+
+def get_downloader(interval="1d"):
+    """One delta-fetching downloader (and on-disk cache) per bar interval."""
+    if interval not in _downloaders:
+        _downloaders[interval] = Downloader(interval=interval)
+    return _downloaders[interval]
+
+def fetch_stock_data(ticker, period="5y", interval="1d", refresh=True):
+    """
+    Fetch historical stock data from yfinance with local fallback.
+    With `refresh=False` the bars come from the downloader's cache as
+    last refreshed (e.g. by one `Downloader.refresh` for many tickers).
+    """
+    try:
+        # Try online first (only bars missing from the on-disk cache are requested)
+        downloader = get_downloader(interval)
+        data, error = downloader.fetch(ticker, period=period, refresh=refresh)
+        if error is not None:
+            print(f"Online fetch failed for {ticker}: {error}")
+        if data is not None and not data.empty:
+            return data
+    except Exception as e:
+        print(f"Online fetch failed for {ticker}: {e}")
+
+    # Fallback to local data
+    print(f"Attempting local fallback for {ticker}...")
+    try:
+        df = read_local(ticker, period)
+        if not df.empty:
+            # Ensure required columns for the UI exist
+            required = ['Open', 'High', 'Low', 'Close']
+            for col in required:
+                if col not in df.columns:
+                    if 'Close' in df.columns:
+                        df[col] = df['Close']
+                    else:
+                        return None
+            return df
+    except Exception as e:
+        print(f"Local fallback failed: {e}")
+    
+    return None
+
+def fetch_macro_data(period="5y", refresh=True):
+    """
+    Fetch macro indicators with local fallback.
+    Each series keeps its own calendar and gaps: they are aligned to the
+    stock's dates later, as-of and with a staleness limit (`src/exogenous.py`).
+    """
+    try:
+        # ^VIX and ^TNX are refreshed concurrently
+        downloader = get_downloader()
+        frames, errors = downloader.fetch_many(["^VIX", "^TNX"], period=period, refresh=refresh)
+        vix_data, tnx_data = frames["^VIX"], frames["^TNX"]
+        for symbol, error in errors.items():
+            print(f"Online macro fetch failed for {symbol}: {error}")
+        
+        if vix_data is not None and tnx_data is not None:
+            macro_df = pd.concat([vix_data['Close'], tnx_data['Close']], axis=1)
+            macro_df.columns = ["VIX", "TNX"]
+            return macro_df
+    except Exception as e:
+        print(f"Online macro fetch failed: {e}")
+
+    # Fallback to local data
+    try:
+        df = read_local(MACRO_TICKER, period, columns=["VIX", "TNX"])
+        if "VIX" in df.columns and "TNX" in df.columns:
+            return df[["VIX", "TNX"]]
+    except Exception as e:
+        print(f"Local macro fallback failed: {e}")
+        
+    return pd.DataFrame(columns=["VIX", "TNX"])
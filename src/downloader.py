@@ -0,0 +1,282 @@
+"""
+Delta-fetching market data downloader.
+
+Bars are cached per symbol in a `MarketStore`; a refresh only asks the
+source for bars after the last cached timestamp, fetches many symbols
+concurrently through a bounded thread pool (with retries and exponential
+backoff) and appends the results to the store from a single thread.
+
+Each delta request starts at the day of the last cached bar, so the
+source's prices for the cached overlap are compared with the cache: when
+they moved (a split or dividend re-adjusted the whole history), the symbol
+is reloaded over its covered range and swapped in at once. Only completed
+bars are persisted; the bar still in progress is served but kept in memory.
+
+`RecordedSource` replays recorded responses from local files so the whole
+path can be exercised without network access.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .store import MarketStore, period_start
+
+DEFAULT_CACHE_ROOT = os.path.join('data', 'cache', 'yahoo')
+# Relative Close difference on the overlap beyond which the cached history
+# is considered re-adjusted
+ADJUSTMENT_RTOL = 1e-4
+# Timezone of the exchanges the universe trades on: bars are stamped with
+# its (naive) wall time
+EXCHANGE_TZ = 'America/New_York'
+
+
+def normalize_history(data):
+    """Flatten yfinance column levels and make the index timezone-naive."""
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    if data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+    data.index = data.index.rename('Date')
+    return data
+
+
+class YahooSource:
+    """Bars from Yahoo Finance through yfinance."""
+
+    def history(self, symbol, start=None, period="5y", interval="1d"):
+        import yfinance as yf
+
+        tk = yf.Ticker(symbol)
+        if start is not None:
+            data = tk.history(start=start, interval=interval, auto_adjust=True)
+        else:
+            data = tk.history(period=period, interval=interval, auto_adjust=True)
+        return normalize_history(data)
+
+
+class RecordedSource:
+    """
+    Offline stand-in for `YahooSource` serving recorded responses from
+    `<directory>/<symbol>.csv`. Requests and served rows are counted so
+    callers can check how much data a refresh transferred.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.requests = []
+        self.rows_served = 0
+        self._lock = threading.Lock()
+
+    def history(self, symbol, start=None, period="5y", interval="1d"):
+        path = os.path.join(self.directory, f'{symbol}.csv')
+        if not os.path.exists(path):
+            raise KeyError(f"No recorded response for {symbol}")
+        data = pd.read_csv(path, index_col=0, parse_dates=True)
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        else:
+            begin = period_start(data.index.max(), period)
+            if begin is not None:
+                data = data[data.index >= begin]
+        with self._lock:
+            self.requests.append((symbol, start, period))
+            self.rows_served += len(data)
+        return normalize_history(data)
+
+
+def record_responses(symbols, directory, period="5y", interval="1d", source=None):
+    """Save live responses under `directory` for later use by `RecordedSource`."""
+    source = source or YahooSource()
+    os.makedirs(directory, exist_ok=True)
+    for symbol in symbols:
+        source.history(symbol, period=period, interval=interval).to_csv(
+            os.path.join(directory, f'{symbol}.csv'))
+
+
+def bar_length(interval):
+    """Time covered by one bar of `interval` ('5m', '1h', '1d', '1wk', '1mo', ...)."""
+    from .intraday import interval_ns
+
+    if interval.endswith('mo'):
+        return pd.DateOffset(months=int(interval[:-2] or 1))
+    if interval.endswith('wk'):
+        return pd.Timedelta(weeks=int(interval[:-2] or 1))
+    try:
+        return pd.Timedelta(interval_ns(interval))
+    except ValueError:
+        return pd.Timedelta(days=1)
+
+
+def exchange_now(now=None):
+    """Naive exchange wall time of `now` (default: the current time); naive inputs are returned as they are."""
+    now = pd.Timestamp.now(tz=EXCHANGE_TZ) if now is None else pd.Timestamp(now)
+    return now if now.tz is None else now.tz_convert(EXCHANGE_TZ).tz_localize(None)
+
+
+def split_completed(data, interval, now=None):
+    """
+    (completed bars, bar still in progress at `now`) of `data`, bars stamped
+    with their start in exchange time (`now` naive: already exchange time).
+    """
+    now = exchange_now(now)
+    done = data.index + bar_length(interval) <= now
+    return data[done], data[~done]
+
+
+class Downloader:
+    """Keeps a per-symbol on-disk cache up to date with delta requests."""
+
+    def __init__(self, store=None, source=None, interval="1d", max_workers=8,
+                 retries=2, backoff=0.25):
+        self.interval = interval
+        self.store = store or MarketStore(os.path.join(DEFAULT_CACHE_ROOT, interval))
+        self.source = source or YahooSource()
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        # The bar in progress is still moving: it is served but not
+        # persisted, since the store is append-only.
+        self._live = {}
+        self._coverage_lock = threading.Lock()
+
+    def _coverage_path(self):
+        return os.path.join(self.store.root, '_coverage.json')
+
+    def _load_coverage(self):
+        """Start date each symbol was seeded from (None for "max")."""
+        if os.path.exists(self._coverage_path()):
+            with open(self._coverage_path()) as f:
+                return json.load(f)
+        return {}
+
+    def _save_coverage(self, updates):
+        """Merge `updates` into the coverage file (other processes may have written it too)."""
+        os.makedirs(self.store.root, exist_ok=True)
+        with self._coverage_lock:
+            coverage = self._load_coverage()
+            coverage.update(updates)
+            tmp = f'{self._coverage_path()}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(coverage, f)
+            os.replace(tmp, self._coverage_path())
+
+    def _history(self, symbol, start, period):
+        """One source request, retried with exponential backoff."""
+        for attempt in range(self.retries + 1):
+            try:
+                return self.source.history(symbol, start=start, period=period,
+                                           interval=self.interval)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _consistent(self, symbol, data, last):
+        """Whether the source's Close on the cached overlap matches the cache."""
+        if data.empty or 'Close' not in data.columns:
+            return True
+        cached = self.store.read(symbol, start=data.index.min(), end=last, columns=['Close'])['Close']
+        common = cached.index.intersection(data.index)
+        if common.empty:
+            return True
+        return bool(np.allclose(data['Close'].loc[common].to_numpy(dtype=float),
+                                cached.loc[common].to_numpy(dtype=float),
+                                rtol=ADJUSTMENT_RTOL, atol=0, equal_nan=True))
+
+    def _request(self, symbol, period, coverage):
+        """
+        Fetch the missing bars of one symbol. Returns (full, data, seeded):
+        `full` when `data` is a whole history to swap in, and the start it
+        covers (ISO date, None for "max").
+        """
+        last = self.store.last_timestamp(symbol)
+        wanted = period_start(exchange_now().normalize(), period)
+        seeded = None if wanted is None else wanted.isoformat()
+        if last is None:
+            return True, self._history(symbol, None, period), seeded
+
+        cached_from = coverage.get(symbol, 'unknown')
+        if cached_from == 'unknown':
+            first = self.store.first_timestamp(symbol)
+            cached_from = first.isoformat() if first is not None else None
+        # The cache does not reach back as far as the requested period.
+        if cached_from is not None and (wanted is None
+                                        or wanted < pd.Timestamp(cached_from) - pd.Timedelta(days=7)):
+            return True, self._history(symbol, None, period), seeded
+
+        data = self._history(symbol, last.normalize(), period)
+        if self._consistent(symbol, data, last):
+            return False, data, None
+        # Past prices were re-adjusted: reload everything the cache covered
+        # (or the requested period if longer), appending would mix bases.
+        if cached_from is None:
+            return True, self._history(symbol, None, 'max'), None
+        start = min(pd.Timestamp(cached_from), wanted)
+        return True, self._history(symbol, start, period), start.isoformat()
+
+    def refresh(self, symbols, period="5y"):
+        """
+        Bring the cache of every symbol up to date, concurrently.
+        Returns ({symbol: rows written}, {symbol: exception}) for this call;
+        a failed symbol keeps its cached bars.
+        """
+        written = {}
+        errors = {}
+        updates = {}
+        coverage = self._load_coverage()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(symbols), 1))) as pool:
+            futures = {pool.submit(self._request, symbol, period, coverage): symbol
+                       for symbol in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    full, data, seeded = future.result()
+                except Exception as e:
+                    errors[symbol] = e
+                    continue
+                if data.empty:
+                    written[symbol] = 0
+                    continue
+                data, self._live[symbol] = split_completed(data, self.interval)
+                if full:
+                    # New parts are written to a new version and the store's
+                    # pointer is switched atomically: readers see the old or
+                    # the new history, never an empty or half-written one.
+                    written[symbol] = self.store.replace(symbol, data)
+                    if written[symbol]:
+                        updates[symbol] = seeded
+                else:
+                    written[symbol] = self.store.append(symbol, data)
+        if updates:
+            self._save_coverage(updates)
+        return written, errors
+
+    def fetch(self, symbol, period="5y", refresh=True):
+        """
+        (bars, error): the bars of `symbol` over `period` from the cache
+        (refreshed first unless `refresh` is False) and the exception of the
+        refresh, if it failed. Cached bars are still returned when the source
+        fails; None if nothing is available.
+        """
+        error = self.refresh([symbol], period)[1].get(symbol) if refresh else None
+        return self._cached(symbol, period), error
+
+    def _cached(self, symbol, period):
+        last = self.store.last_timestamp(symbol)
+        if last is None and symbol not in self._live:
+            return None
+        data = self.store.read(symbol, start=period_start(last, period))
+        live = self._live.get(symbol)
+        if live is not None and not live.empty:
+            data = pd.concat([data, live[live.index > (last or pd.Timestamp.min)]])
+        return data if not data.empty else None
+
+    def fetch_many(self, symbols, period="5y", refresh=True):
+        """Refresh all `symbols` in one concurrent pass; returns ({symbol: frame}, {symbol: exception})."""
+        errors = self.refresh(symbols, period)[1] if refresh else {}
+        return {symbol: self._cached(symbol, period) for symbol in symbols}, errors
@@ -0,0 +1,113 @@
+"""
+As-of join of exogenous (macro) series onto trading calendars.
+
+Each macro series (VIX, TNX, FX, commodities, ...) keeps its own calendar:
+at every target date it takes its last observation at or before that date,
+and only while that observation is at most `max_staleness` old (per
+series). Later values are never used, so nothing leaks backwards, and a
+date with no recent observation stays missing instead of being filled.
+
+The aligned (dates x series) matrix is computed once for a date range with
+one sorted search per series; tickers then pick their rows from it by
+position, so joining to 500 tickers costs one gather, not 500 joins.
+
+    aligned = align(macro, dates)               # dates x series
+    panel = join_asof(panel, macro)             # (Date, Ticker) panel or date-indexed frame
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Weekends and holidays: a daily series older than this is treated as missing
+DEFAULT_MAX_STALENESS = pd.Timedelta('7D')
+MAX_ALIGNED = 32
+
+_lock = threading.Lock()
+_aligned = OrderedDict()
+
+
+def _ns(index):
+    return pd.DatetimeIndex(index).as_unit('ns').asi8
+
+
+def _staleness(max_staleness, column):
+    limit = max_staleness.get(column, DEFAULT_MAX_STALENESS) if isinstance(max_staleness, dict) else max_staleness
+    return None if limit is None else pd.Timedelta(limit).value
+
+
+def align(macro, dates, max_staleness=DEFAULT_MAX_STALENESS):
+    """
+    Value of every column of `macro` as known at each of `dates` (sorted):
+    its last non-missing observation at or before the date, NaN when there
+    is none or when it is older than the series' limit. `max_staleness` is
+    one limit for all series, a {column: limit} dict (others get the
+    default) or None for no limit.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    if macro.index.tz is not None:
+        macro = macro.tz_localize(None)
+    macro = macro.sort_index()
+    target = _ns(dates)
+    observed_at = _ns(macro.index)
+    out = np.full((len(dates), len(macro.columns)), np.nan)
+    for j, column in enumerate(macro.columns):
+        values = macro[column].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        times, values = observed_at[present], values[present]
+        if not len(times):
+            continue
+        last = np.searchsorted(times, target, side='right') - 1
+        known = last >= 0
+        limit = _staleness(max_staleness, column)
+        if limit is not None:
+            known &= target - times[np.maximum(last, 0)] <= limit
+        out[known, j] = values[last[known]]
+    return pd.DataFrame(out, index=dates.rename('Date'), columns=macro.columns)
+
+
+def _key(macro, dates, max_staleness):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(macro, index=True).to_numpy().tobytes())
+    digest.update(repr(list(macro.columns)).encode())
+    digest.update(_ns(dates).tobytes())
+    digest.update(repr(sorted(max_staleness.items()) if isinstance(max_staleness, dict)
+                       else max_staleness).encode())
+    return digest.hexdigest()
+
+
+def aligned_matrix(macro, dates, max_staleness=DEFAULT_MAX_STALENESS):
+    """`align`, cached per (macro content, dates, limits) for reuse across tickers."""
+    key = _key(macro, dates, max_staleness)
+    with _lock:
+        if key in _aligned:
+            _aligned.move_to_end(key)
+            return _aligned[key]
+    aligned = align(macro, dates, max_staleness)
+    with _lock:
+        _aligned[key] = aligned
+        while len(_aligned) > MAX_ALIGNED:
+            _aligned.popitem(last=False)
+    return aligned
+
+
+def join_asof(df, macro, max_staleness=DEFAULT_MAX_STALENESS):
+    """
+    Add the macro columns to `df` (a date-indexed frame, or a panel with a
+    `Date` index level), as-of each row's date. Existing columns of the
+    same name are replaced; rows are never dropped.
+    """
+    if 'Date' in (df.index.names or []) and isinstance(df.index, pd.MultiIndex):
+        row_dates = df.index.get_level_values('Date')
+    else:
+        row_dates = df.index
+    if row_dates.tz is not None:
+        row_dates = row_dates.tz_localize(None)
+    dates = row_dates.unique().sort_values()
+    aligned = aligned_matrix(macro, dates, max_staleness)
+    rows = aligned.to_numpy()[dates.get_indexer(row_dates)]
+    df = df.drop(columns=[c for c in macro.columns if c in df.columns])
+    return df.assign(**{column: rows[:, j] for j, column in enumerate(macro.columns)})
@@ -0,0 +1,285 @@
+"""
+Content-addressed store of materialized feature frames.
+
+A frame is identified by (ticker, indicator parameters, code version of
+`src/indicators.py` and `src/features.py`): each ticker keeps one history
+and every period (1mo, 1y, max, ...) is sliced out of it, so its rows take
+their warm-up from the longest history stored rather than restarting at
+the period's first bar. A lookup whose bars match the stored ones over
+its range is a warm read; when the stored bars up to the one before the
+last are unchanged and the request goes beyond them (new bars appended,
+or the live last bar revised), only the later rows are computed from the
+saved indicator state and written as new part files. A request starting
+before the stored history, or disagreeing with it (e.g. re-adjusted
+prices), is computed in full and replaces it. Least-recently-used frames
+are evicted when the store exceeds its size budget. Training and the
+dashboard read the same frames.
+
+Computation and Parquet I/O run outside any lock; only the manifest update
+is serialized, under a lock file, by reloading the manifest from disk and
+merging the change, so several processes can share a root. Part files have
+unique names and a reader whose files were evicted meanwhile recomputes.
+"""
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from . import features, indicators
+
+DEFAULT_ROOT = os.path.join('data', 'features')
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+CODE_VERSION = hashlib.sha1((inspect.getsource(indicators)
+                             + inspect.getsource(features)).encode()).hexdigest()[:12]
+# Warm reads only update the access times in memory; they are written at
+# the next manifest update, or after this many seconds
+ACCESS_FLUSH_SECONDS = 60
+# A lock file older than this is left over by a dead process
+STALE_LOCK_SECONDS = 60
+
+
+def _encode_state(state):
+    return None if state is None else {k: None if v is None else np.asarray(v).tolist()
+                                       for k, v in state.items()}
+
+
+def _decode_state(state):
+    return None if state is None else {k: None if v is None else np.asarray(v, dtype=float)
+                                       for k, v in state.items()}
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock between processes, held while the lock file exists."""
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_LOCK_SECONDS:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.005)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+def _entry_files(entry):
+    return list(entry.get('files', [])) + ([entry['last_file']] if entry.get('last_file') else [])
+
+
+def _same_bars(bars, stored):
+    """Whether `bars` and `stored` hold the same dates, columns and values (NaN equal to NaN)."""
+    if len(bars) != len(stored) or set(bars.columns) != set(stored.columns) or not bars.index.equals(stored.index):
+        return False
+    return all(bars[c].reset_index(drop=True).equals(stored[c].reset_index(drop=True)) for c in bars.columns)
+
+
+class FeatureStore:
+    """Materialized indicator frames on disk, with LRU eviction."""
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES, params=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.params = {**indicators.DEFAULT_PARAMS, **(params or {})}
+        self.hits = {'warm': 0, 'incremental': 0, 'cold': 0}
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+        self._accessed = {}
+        self._flushed = time.time()
+
+    def _manifest_path(self):
+        return os.path.join(self.root, 'manifest.json')
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_manifest(self, manifest):
+        tmp = f'{self._manifest_path()}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path())
+
+    def key(self, ticker):
+        payload = json.dumps({'ticker': ticker, 'params': self.params, 'code': CODE_VERSION}, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()[:20]
+
+    def _input_columns(self, bars):
+        """Columns of `bars` kept as they are (indicator columns are recomputed)."""
+        outputs = {'RSI', 'MACD', 'MACD_Signal', 'BB_Upper', 'BB_Lower', 'ATR', 'Log_Return'}
+        outputs.update(f'Log_Return_lag_{k}' for k in range(1, self.params['n_lags'] + 1))
+        return [c for c in bars.columns if c not in outputs]
+
+    def _compute(self, bars, state=None):
+        has_range = 'High' in bars.columns and 'Low' in bars.columns
+        values, state = indicators.compute_indicators_stateful(
+            bars['Close'].to_numpy(),
+            bars['High'].to_numpy() if has_range else None,
+            bars['Low'].to_numpy() if has_range else None,
+            state=state, **self.params)
+        return bars.assign(**features.compact_values(values)), state
+
+    def _write_part(self, key, frame):
+        path = os.path.join(self.root, key, f'part-{uuid.uuid4().hex}.parquet')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        frame.to_parquet(tmp)
+        os.replace(tmp, path)
+        return path
+
+    @staticmethod
+    def _read(files):
+        """The frames of `files`, or None when one was removed meanwhile."""
+        try:
+            return [pd.read_parquet(p) for p in files]
+        except OSError:
+            return None
+
+    @staticmethod
+    def _remove(files):
+        for path in files:
+            try:
+                os.remove(path)
+            except OSError:
+                # Already gone, or still open by a reader (Windows)
+                pass
+
+    def _evict(self, manifest, keep):
+        """Remove least-recently-used frames until under the size budget. Returns their files."""
+        total = sum(e['bytes'] for e in manifest.values())
+        dropped = []
+        for key in sorted(manifest, key=lambda k: manifest[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                total -= manifest[key]['bytes']
+                dropped.extend(_entry_files(manifest.pop(key)))
+        return dropped
+
+    def _commit(self, key=None, entry=None):
+        """
+        Merge the recorded access times and `entry` (stored under `key`)
+        into the manifest on disk, evicting if needed, under the lock file.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, _file_lock(self._manifest_path() + '.lock'):
+            manifest = self._load_manifest()
+            for name, accessed in self._accessed.items():
+                if name in manifest:
+                    manifest[name]['last_access'] = max(manifest[name]['last_access'], accessed)
+            self._accessed = {}
+            self._flushed = time.time()
+            stale = []
+            if entry is not None:
+                keep = set(entry['files']) | {entry['last_file']}
+                stale = [p for p in _entry_files(manifest.get(key, {})) if p not in keep]
+                manifest[key] = entry
+                stale.extend(self._evict(manifest, keep=key))
+            self._save_manifest(manifest)
+            self._manifest = manifest
+        self._remove(stale)
+
+    def get(self, ticker, bars):
+        """
+        Feature frame of `ticker` for `bars` (DatetimeIndex, OHLC columns):
+        the bars plus every indicator column, from cache when possible.
+        """
+        bars = bars.sort_index()
+        if bars.empty:
+            return self._compute(bars)[0]
+        key = self.key(ticker)
+        with self._lock:
+            entry = self._manifest.get(key)
+        stored = None
+        if entry is not None and pd.Timestamp(entry['start']) <= bars.index[0]:
+            parts = self._read(_entry_files(entry))
+            stored = pd.concat(parts) if parts is not None else None
+
+        columns = self._input_columns(bars)
+        first, end = bars.index[0], bars.index[-1]
+        if stored is not None and end <= stored.index[-1]:
+            window = stored.loc[first:end]
+            if _same_bars(bars[columns], window[self._input_columns(window)]):
+                with self._lock:
+                    self.hits['warm'] += 1
+                    self._accessed[key] = time.time()
+                    flush = time.time() - self._flushed > ACCESS_FLUSH_SECONDS
+                if flush:
+                    self._commit()
+                return window
+
+        # Stored rows up to the one before the last are reused when the
+        # request agrees with them and goes beyond them
+        n = entry['n_rows'] if stored is not None else 0
+        reuse = (n > 0 and first <= stored.index[n - 1] < end
+                 and _same_bars(bars.loc[:stored.index[n - 1], columns],
+                                stored.iloc[:n].loc[first:, self._input_columns(stored)]))
+        if reuse:
+            kind, state, files = 'incremental', _decode_state(entry['state']), list(entry['files'])
+            parts, start = [stored.iloc[:n]], entry['start']
+            new = bars[bars.index > stored.index[n - 1]]
+        else:
+            kind, state, files, parts, n = 'cold', None, [], [], 0
+            start, new = pd.Timestamp(first).isoformat(), bars
+
+        # The last bar (possibly still moving) is kept in its own part, with
+        # the state before it, so a revised last bar only recomputes itself.
+        if len(new) > 1:
+            body, state = self._compute(new.iloc[:-1], state)
+            files.append(self._write_part(key, body))
+            parts.append(body)
+        last, _ = self._compute(new.iloc[-1:], state)
+        parts.append(last)
+        entry = {
+            'ticker': ticker, 'start': start, 'params': self.params, 'code_version': CODE_VERSION,
+            'n_rows': n + len(new) - 1, 'files': files, 'last_file': self._write_part(key, last),
+            'state': _encode_state(state), 'last_access': time.time(),
+        }
+        entry['bytes'] = sum(os.path.getsize(p) for p in _entry_files(entry))
+        self._commit(key, entry)
+        with self._lock:
+            self.hits[kind] += 1
+        return pd.concat(parts).loc[first:]
+
+    def size(self):
+        """Bytes currently used by the materialized frames."""
+        with self._lock:
+            return sum(e['bytes'] for e in self._manifest.values())
+
+
+def build_dataset(market_store, feature_store=None, tickers=None):
+    """
+    Long training frame (one row per date and ticker, `Ticker` column) built
+    from the bars of `market_store` through the feature store, with the
+    targets of `panel.add_targets`.
+    """
+    from .panel import add_targets
+    feature_store = feature_store or FeatureStore()
+    frames = []
+    for ticker in tickers or market_store.tickers():
+        bars = market_store.read(ticker)
+        if bars.empty:
+            continue
+        frames.append(feature_store.get(ticker, bars).assign(Ticker=ticker))
+    if not frames:
+        return pd.DataFrame()
+    df = add_targets(pd.concat(frames)).dropna(subset=['Target'])
+    df['Target'] = df['Target'].astype(np.int8)
+    return features.compact_dtypes(df.sort_index(kind='stable'), inplace=True)
@@ -1,90 +1,98 @@
 import pandas as pd
 import numpy as np
 
+from . import indicators
+
+# Les formules sont implémentées une seule fois dans `src/indicators.py`
+# (entraînement et application) ; ces fonctions gardent l'API pandas.
+
+# Colonnes gardées en float64 : prix, volume et rendements (cumulés par le
+# backtest). Les autres features passent en float32, la précision avec
+# laquelle XGBoost travaille de toute façon.
+FLOAT64_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume', 'Log_Return')
+
+def _like(values, series):
+    return pd.Series(values, index=series.index)
+
 def calculate_rsi(series, window=14):
     """Calcule le Relative Strength Index (RSI)."""
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return _like(indicators.rsi(series.to_numpy(), window), series)
 
 def calculate_macd(series, slow=26, fast=12, signal=9):
     """Calcule le MACD et le Signal."""
-    exp1 = series.ewm(span=fast, adjust=False).mean()
-    exp2 = series.ewm(span=slow, adjust=False).mean()
-    macd = exp1 - exp2
-    signal_line = macd.ewm(span=signal, adjust=False).mean()
-    return macd, signal_line
+    macd, signal_line = indicators.macd(series.to_numpy(), slow=slow, fast=fast, signal=signal)
+    return _like(macd, series), _like(signal_line, series)
 
 def calculate_bollinger_bands(series, window=20, num_std=2):
     """Calcule les Bandes de Bollinger (Upper, Lower)."""
-    rolling_mean = series.rolling(window=window).mean()
-    rolling_std = series.rolling(window=window).std()
-    upper_band = rolling_mean + (rolling_std * num_std)
-    lower_band = rolling_mean - (rolling_std * num_std)
-    return upper_band, lower_band
+    upper_band, lower_band = indicators.bollinger_bands(series.to_numpy(), window, num_std)
+    return _like(upper_band, series), _like(lower_band, series)
 
-def add_lags(df, col_name, lags=3):
-    """Ajoute des colonnes retardées (t-1, t-2, ...)."""
-    df_lagged = df.copy()
+def add_lags(df, col_name, lags=3, inplace=False):
+    """
+    Ajoute des colonnes retardées (t-1, t-2, ...), calculées dans un seul
+    bloc NumPy et accolées sans recopier le DataFrame. Avec `inplace`, les
+    colonnes sont ajoutées à `df` lui-même.
+    """
+    values = df[col_name].to_numpy()
+    n = len(values)
+    padded = np.full(n + lags, np.nan, dtype=np.result_type(values.dtype, np.float32))
+    padded[lags:] = values
+    block = np.empty((n, lags), dtype=padded.dtype)
     for lag in range(1, lags + 1):
-        df_lagged[f'{col_name}_lag_{lag}'] = df_lagged[col_name].shift(lag)
-    return df_lagged
+        block[:, lag - 1] = padded[lags - lag:lags - lag + n]
+    names = [f'{col_name}_lag_{lag}' for lag in range(1, lags + 1)]
+    if inplace:
+        df[names] = block
+        return df
+    df = df.drop(columns=[c for c in names if c in df.columns])
+    return pd.concat([df, pd.DataFrame(block, index=df.index, columns=names, copy=False)], axis=1)
+
+def compact_values(values):
+    """Indicateurs (dict nom -> tableau) en float32, sauf `FLOAT64_COLUMNS`."""
+    return {name: v if name in FLOAT64_COLUMNS else np.asarray(v, dtype=np.float32)
+            for name, v in values.items()}
+
+def compact_dtypes(df, inplace=False):
+    """
+    Réduit l'empreinte mémoire : colonnes float en float32 (sauf
+    `FLOAT64_COLUMNS`), `Ticker` en category, entiers au plus petit type.
+    """
+    if not inplace:
+        df = df.copy(deep=False)
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col == 'Ticker' and not isinstance(dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+        elif dtype == np.float64 and col not in FLOAT64_COLUMNS:
+            df[col] = df[col].astype(np.float32)
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
 
 def calculate_log_returns(series):
     """Calcule les rendements logarithmiques pour la stationnarité."""
-    return np.log(series / series.shift(1))
+    return _like(indicators.log_returns(series.to_numpy()), series)
 
 def calculate_atr(df, window=14):
     """Calcule l'Average True Range (ATR)."""
-    high = df['High']
-    low = df['Low']
-    close = df['Close'].shift(1)
-    
-    tr1 = high - low
-    tr2 = abs(high - close)
-    tr3 = abs(low - close)
-    
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = tr.rolling(window=window).mean()
-    return atr
+    atr = indicators.atr(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), window)
+    return pd.Series(atr, index=df.index)
 
 def calculate_adx(df, window=14):
     """Calcule l'Average Directional Index (ADX)."""
-    high = df['High']
-    low = df['Low']
-    close = df['Close']
-    
-    plus_dm = high.diff()
-    minus_dm = low.diff()
-    
-    plus_dm[plus_dm < 0] = 0
-    minus_dm[minus_dm > 0] = 0
-    minus_dm = abs(minus_dm)
-    
-    # Simple implementation of TR
-    tr1 = high - low
-    tr2 = abs(high - close.shift(1))
-    tr3 = abs(low - close.shift(1))
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    
-    atr = tr.rolling(window=window).mean()
-    
-    plus_di = 100 * (plus_dm.rolling(window=window).mean() / atr)
-    minus_di = 100 * (minus_dm.rolling(window=window).mean() / atr)
-    
-    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
-    adx = dx.rolling(window=window).mean()
-    
-    return adx
+    adx = indicators.adx(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), window)
+    return pd.Series(adx, index=df.index)
+
+def rolling_mean_abs_deviation(series, window=20, chunk_size=65536):
+    """
+    Écart absolu moyen glissant, calculé sur des vues de fenêtres NumPy
+    (sans callback Python par ligne).
+    """
+    mad = indicators.mean_abs_deviation(np.asarray(series, dtype=float), window, chunk_size)
+    return pd.Series(mad, index=getattr(series, 'index', None))
 
 def calculate_cci(df, window=20):
     """Calcule le Commodity Channel Index (CCI)."""
-    tp = (df['High'] + df['Low'] + df['Close']) / 3
-    sma_tp = tp.rolling(window=window).mean()
-    mean_dev = tp.rolling(window=window).apply(lambda x: np.abs(x - x.mean()).mean())
-    cci = (tp - sma_tp) / (0.015 * mean_dev)
-    return cci
+    cci = indicators.cci(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), window)
+    return pd.Series(cci, index=df.index)
@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+from .features import compact_values
+
+
+def _ewm_alpha(span):
+    """Smoothing factor exactly as pandas derives it from `span`."""
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+
+class IncrementalIndicators:
+    """
+    Append-only version of `calculate_indicators`.
+
+    Keeps the running state (EMA values, rolling-window sums, previous close,
+    true-range window, recent log returns) for `n_series` synchronized series
+    so that each new bar is processed in O(1) with a single vectorized update,
+    whatever the length of the history. Rolling sums are re-synchronized from
+    their window every `window` bars so floating point drift cannot build up.
+    """
+
+    def __init__(self, n_series=1, rsi_window=14, macd_fast=12, macd_slow=26,
+                 macd_signal=9, bb_window=20, bb_std=2, atr_window=14, n_lags=5):
+        self.n_series = n_series
+        self.rsi_window = rsi_window
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.bb_window = bb_window
+        self.bb_std = bb_std
+        self.atr_window = atr_window
+        self.n_lags = n_lags
+        self.reset()
+
+    def reset(self):
+        """Drop all state, as if no bar had been seen."""
+        n = self.n_series
+        self.n_bars = 0
+        self.prev_close = np.full(n, np.nan)
+        self.ema_fast = np.full(n, np.nan)
+        self.ema_slow = np.full(n, np.nan)
+        self.ema_signal = np.full(n, np.nan)
+        self.gain_window = np.zeros((self.rsi_window, n))
+        self.loss_window = np.zeros((self.rsi_window, n))
+        self.gain_sum = np.zeros(n)
+        self.loss_sum = np.zeros(n)
+        # Bollinger sums are kept on data shifted by the first close to avoid
+        # cancellation in sum(x^2) - sum(x)^2 / n.
+        self.bb_anchor = np.full(n, np.nan)
+        self.close_window = np.zeros((self.bb_window, n))
+        self.close_sum = np.zeros(n)
+        self.close_sumsq = np.zeros(n)
+        self.tr_window = np.zeros((self.atr_window, n))
+        self.tr_sum = np.zeros(n)
+        self.return_window = np.full((self.n_lags + 1, n), np.nan)
+
+    @staticmethod
+    def _push(window, total, value, pos):
+        """Replace the oldest value of a ring buffer and update its sum."""
+        total += value - window[pos]
+        window[pos] = value
+        if pos == len(window) - 1:
+            total[:] = window.sum(axis=0)
+
+    def _ema(self, ema, value, span):
+        alpha = _ewm_alpha(span)
+        old_wt = 1.0 - alpha
+        updated = (old_wt * ema + alpha * value) / (old_wt + alpha)
+        updated = np.where(ema == value, ema, updated)
+        return np.where(np.isnan(ema), value, updated)
+
+    def update(self, close, high=None, low=None):
+        """
+        Process one new bar per series and return the latest indicator values.
+
+        `close`, `high` and `low` are scalars or arrays of length `n_series`.
+        Returns a dict mapping the `calculate_indicators` column names to
+        arrays of length `n_series` (NaN while a window is still filling).
+        """
+        close = np.broadcast_to(np.asarray(close, dtype=float), (self.n_series,))
+        prev_close = self.prev_close
+        seen = self.n_bars + 1
+
+        # RSI (simple moving average of gains and losses)
+        delta = close - prev_close
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        pos = self.n_bars % self.rsi_window
+        self._push(self.gain_window, self.gain_sum, gain, pos)
+        self._push(self.loss_window, self.loss_sum, loss, pos)
+        if seen >= self.rsi_window:
+            # An all-zero window must give an exact zero, not residual drift.
+            avg_gain = np.where(self.gain_window.any(axis=0), self.gain_sum, 0.0) / self.rsi_window
+            avg_loss = np.where(self.loss_window.any(axis=0), self.loss_sum, 0.0) / self.rsi_window
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+        else:
+            rsi = np.full(self.n_series, np.nan)
+
+        # MACD
+        self.ema_fast = self._ema(self.ema_fast, close, self.macd_fast)
+        self.ema_slow = self._ema(self.ema_slow, close, self.macd_slow)
+        macd = self.ema_fast - self.ema_slow
+        self.ema_signal = self._ema(self.ema_signal, macd, self.macd_signal)
+
+        # Bollinger Bands
+        self.bb_anchor = np.where(np.isnan(self.bb_anchor), close, self.bb_anchor)
+        shifted = close - self.bb_anchor
+        pos = self.n_bars % self.bb_window
+        self.close_sumsq += shifted ** 2 - self.close_window[pos] ** 2
+        self.close_sum += shifted - self.close_window[pos]
+        self.close_window[pos] = shifted
+        if pos == self.bb_window - 1:
+            self.close_sum = self.close_window.sum(axis=0)
+            self.close_sumsq = (self.close_window ** 2).sum(axis=0)
+        if seen >= self.bb_window:
+            w = self.bb_window
+            mean = self.close_sum / w
+            var = np.maximum((self.close_sumsq - self.close_sum * mean) / (w - 1), 0.0)
+            std = np.sqrt(var)
+            bb_upper = self.bb_anchor + mean + std * self.bb_std
+            bb_lower = self.bb_anchor + mean - std * self.bb_std
+        else:
+            bb_upper = bb_lower = np.full(self.n_series, np.nan)
+
+        # ATR (only when the high/low of the bar are known)
+        atr = np.full(self.n_series, np.nan)
+        if high is not None and low is not None:
+            high = np.broadcast_to(np.asarray(high, dtype=float), (self.n_series,))
+            low = np.broadcast_to(np.asarray(low, dtype=float), (self.n_series,))
+            tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+            pos = self.n_bars % self.atr_window
+            self._push(self.tr_window, self.tr_sum, tr, pos)
+            if seen >= self.atr_window:
+                atr = self.tr_sum / self.atr_window
+
+        # Log returns and lags
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_return = np.log(close / prev_close)
+        self.return_window = np.roll(self.return_window, 1, axis=0)
+        self.return_window[0] = log_return
+
+        self.prev_close = close.copy()
+        self.n_bars = seen
+
+        values = {
+            'RSI': rsi,
+            'MACD': macd,
+            'MACD_Signal': self.ema_signal.copy(),
+            'BB_Upper': bb_upper,
+            'BB_Lower': bb_lower,
+            'ATR': atr,
+            'Log_Return': log_return,
+        }
+        for lag in range(1, self.n_lags + 1):
+            values[f'Log_Return_lag_{lag}'] = self.return_window[lag].copy()
+        return values
+
+    def warm_up(self, close, high=None, low=None):
+        """
+        Replay a history of shape (time, n_series) bar by bar.
+        Returns the indicator values of the last bar.
+        """
+        close = np.asarray(close, dtype=float).reshape(len(close), -1)
+        high = None if high is None else np.asarray(high, dtype=float).reshape(close.shape)
+        low = None if low is None else np.asarray(low, dtype=float).reshape(close.shape)
+        values = None
+        for t in range(len(close)):
+            values = self.update(close[t],
+                                 None if high is None else high[t],
+                                 None if low is None else low[t])
+        return values
+
+    @classmethod
+    def from_history(cls, df, **params):
+        """Build a single-series engine from an OHLC dataframe."""
+        engine = cls(n_series=1, **params)
+        has_range = 'High' in df.columns and 'Low' in df.columns
+        engine.warm_up(df['Close'].to_numpy(),
+                       df['High'].to_numpy() if has_range else None,
+                       df['Low'].to_numpy() if has_range else None)
+        return engine
+
+    _CONFIG = ('n_series', 'rsi_window', 'macd_fast', 'macd_slow', 'macd_signal',
+               'bb_window', 'bb_std', 'atr_window', 'n_lags')
+    _STATE = ('n_bars', 'prev_close', 'ema_fast', 'ema_slow', 'ema_signal',
+              'gain_window', 'loss_window', 'gain_sum', 'loss_sum', 'bb_anchor',
+              'close_window', 'close_sum', 'close_sumsq', 'tr_window', 'tr_sum',
+              'return_window')
+
+    def get_state(self):
+        """Return a checkpoint of the configuration and running state."""
+        state = {name: getattr(self, name) for name in self._CONFIG}
+        state.update({name: np.array(getattr(self, name), copy=True) for name in self._STATE})
+        return state
+
+    def set_state(self, state):
+        """Restore a checkpoint produced by `get_state`."""
+        for name in self._STATE:
+            value = np.array(state[name], dtype=float, copy=True)
+            setattr(self, name, int(value) if name == 'n_bars' else value)
+
+    def save(self, path):
+        """Write the checkpoint to a `.npz` file."""
+        np.savez(path, **self.get_state())
+
+    @classmethod
+    def load(cls, path):
+        """Resume an engine from a `.npz` checkpoint without recomputation."""
+        with np.load(path) as data:
+            state = {name: data[name] for name in data.files}
+        config = {name: state[name].item() for name in cls._CONFIG}
+        engine = cls(**config)
+        engine.set_state(state)
+        return engine
+
+    def to_frame(self, values, labels=None):
+        """
+        Arrange the output of `update` as one row per series, with the
+        dtypes of `calculate_indicators` (indicators in float32). The state
+        itself stays float64.
+        """
+        return pd.DataFrame(compact_values(values), index=labels)
@@ -0,0 +1,272 @@
+"""
+Shared technical indicator kernels used by both training (`src/features.py`)
+and serving (`src/processor.py`).
+
+Every kernel accepts a 1-D array (one series) or a 2-D array laid out as
+(time, tickers) and returns an array of the same shape, so the whole universe
+is computed in a single vectorized pass. Rolling windows are evaluated from
+the values inside each window only, which keeps results identical whatever
+the length of the history or the number of tickers.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _as_2d(values):
+    """Return a float (time, tickers) view of `values` and whether it was 1-D."""
+    arr = np.asarray(values, dtype=float)
+    if arr.ndim == 1:
+        return arr[:, None], True
+    return arr, False
+
+
+def _restore(arr, was_1d):
+    return arr[:, 0] if was_1d else arr
+
+
+def _shift(arr, periods=1):
+    """Shift along the time axis, filling the gap with NaN."""
+    out = np.full_like(arr, np.nan)
+    if periods < len(arr):
+        out[periods:] = arr[:len(arr) - periods]
+    return out
+
+
+def _window_sum(arr, window):
+    """Sum of each full window, accumulated value by value in time order."""
+    n = len(arr) - window + 1
+    total = arr[0:n].copy()
+    for k in range(1, window):
+        np.add(total, arr[k:k + n], out=total)
+    return total
+
+
+def rolling_mean(values, window):
+    """Moving average; NaN until the window is full or if it holds a NaN."""
+    arr, was_1d = _as_2d(values)
+    out = np.full_like(arr, np.nan)
+    if len(arr) >= window:
+        out[window - 1:] = _window_sum(arr, window) / window
+    return _restore(out, was_1d)
+
+
+def rolling_std(values, window, ddof=1):
+    """Moving standard deviation (two-pass within each window)."""
+    arr, was_1d = _as_2d(values)
+    out = np.full_like(arr, np.nan)
+    if len(arr) >= window:
+        n = len(arr) - window + 1
+        mean = _window_sum(arr, window) / window
+        sq = np.zeros_like(mean)
+        dev = np.empty_like(mean)
+        for k in range(window):
+            np.subtract(arr[k:k + n], mean, out=dev)
+            np.multiply(dev, dev, out=dev)
+            sq += dev
+        out[window - 1:] = np.sqrt(sq / (window - ddof))
+    return _restore(out, was_1d)
+
+
+def ema(values, span, init=None):
+    """
+    Exponential moving average (`adjust=False`), identical to pandas `ewm`.
+    `init` optionally gives the EMA value just before the first row, which
+    lets a computation resume from a previous state.
+    """
+    arr, was_1d = _as_2d(values)
+    if init is not None:
+        seed = np.broadcast_to(np.asarray(init, dtype=float), (arr.shape[1],))
+        arr = np.vstack([seed[None, :], arr])
+    out = pd.DataFrame(arr).ewm(span=span, adjust=False).mean().to_numpy()
+    if init is not None:
+        out = out[1:]
+    return _restore(out, was_1d)
+
+
+def log_returns(close):
+    """Log returns, NaN on the first row."""
+    arr, was_1d = _as_2d(close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.log(arr / _shift(arr))
+    return _restore(out, was_1d)
+
+
+def lag(values, periods):
+    """Value `periods` rows earlier."""
+    arr, was_1d = _as_2d(values)
+    return _restore(_shift(arr, periods), was_1d)
+
+
+def rsi(close, window=14):
+    """Relative Strength Index (simple moving average of gains and losses)."""
+    arr, was_1d = _as_2d(close)
+    delta = arr - _shift(arr)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    # Rows before a ticker's first close stay missing so windows never mix
+    # padding with real bars in a (time, tickers) panel.
+    started = np.maximum.accumulate(~np.isnan(arr), axis=0)
+    gain[~started] = np.nan
+    loss[~started] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = rolling_mean(gain, window) / rolling_mean(loss, window)
+        out = 100 - (100 / (1 + rs))
+    return _restore(out, was_1d)
+
+
+def macd(close, slow=26, fast=12, signal=9):
+    """MACD line and its signal line."""
+    line = ema(close, fast) - ema(close, slow)
+    return line, ema(line, signal)
+
+
+def bollinger_bands(close, window=20, num_std=2):
+    """Upper and lower Bollinger Bands."""
+    mean = rolling_mean(close, window)
+    std = rolling_std(close, window)
+    return mean + std * num_std, mean - std * num_std
+
+
+def true_range(high, low, close):
+    """True Range; on the first row (no previous close) it is High - Low."""
+    high, was_1d = _as_2d(high)
+    low, _ = _as_2d(low)
+    prev_close = _shift(_as_2d(close)[0])
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return _restore(tr, was_1d)
+
+
+def atr(high, low, close, window=14):
+    """Average True Range."""
+    return rolling_mean(true_range(high, low, close), window)
+
+
+def mean_abs_deviation(values, window, chunk_size=65536):
+    """
+    Rolling mean absolute deviation from the window mean, computed on NumPy
+    sliding-window views in blocks of `chunk_size` rows to bound memory.
+    """
+    arr, was_1d = _as_2d(values)
+    out = np.full_like(arr, np.nan)
+    if len(arr) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(arr, window, axis=0)
+        for start in range(0, len(windows), chunk_size):
+            block = windows[start:start + chunk_size]
+            dev = np.abs(block - block.mean(axis=-1, keepdims=True)).mean(axis=-1)
+            out[start + window - 1:start + window - 1 + len(block)] = dev
+    return _restore(out, was_1d)
+
+
+def cci(high, low, close, window=20):
+    """Commodity Channel Index."""
+    tp = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float)
+          + np.asarray(close, dtype=float)) / 3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (tp - rolling_mean(tp, window)) / (0.015 * mean_abs_deviation(tp, window))
+
+
+def adx(high, low, close, window=14):
+    """Average Directional Index."""
+    high, was_1d = _as_2d(high)
+    low, _ = _as_2d(low)
+    plus_dm = high - _shift(high)
+    minus_dm = low - _shift(low)
+    plus_dm = np.where(plus_dm < 0, 0.0, plus_dm)
+    minus_dm = np.abs(np.where(minus_dm > 0, 0.0, minus_dm))
+    avg_tr = atr(high, low, _as_2d(close)[0], window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * (rolling_mean(plus_dm, window) / avg_tr)
+        minus_di = 100 * (rolling_mean(minus_dm, window) / avg_tr)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return _restore(rolling_mean(dx, window), was_1d)
+
+
+DEFAULT_PARAMS = {
+    'rsi_window': 14,
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'bb_window': 20,
+    'bb_std': 2,
+    'atr_window': 14,
+    'n_lags': 5,
+}
+
+
+def warmup_length(params=None):
+    """Rows of history needed before a new row to reproduce its rolling values."""
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    return max(p['rsi_window'], p['bb_window'], p['atr_window'], p['n_lags'] + 1)
+
+
+def compute_indicators_stateful(close, high=None, low=None, state=None, **params):
+    """
+    Resumable version of `compute_indicators` on arrays.
+
+    `state` is the value returned by the previous call on the rows just
+    before `close` (None at the start of the history): it holds the EMA
+    values and the last `warmup_length` rows of prices. Results are
+    bit-identical to computing the whole history at once.
+    Returns (values, new_state).
+    """
+    p = {**DEFAULT_PARAMS, **params}
+    c, was_1d = _as_2d(close)
+    has_range = high is not None and low is not None
+    h = _as_2d(high)[0] if has_range else None
+    l = _as_2d(low)[0] if has_range else None
+
+    offset = 0
+    init = {'ema_fast': None, 'ema_slow': None, 'ema_signal': None}
+    if state is not None:
+        offset = len(state['close'])
+        c = np.vstack([state['close'], c])
+        if has_range:
+            h = np.vstack([state['high'], h])
+            l = np.vstack([state['low'], l])
+        init = {name: state[name] for name in init}
+
+    new = c[offset:]
+    out = {'RSI': rsi(c, p['rsi_window'])[offset:]}
+    fast = ema(new, p['macd_fast'], init['ema_fast'])
+    slow = ema(new, p['macd_slow'], init['ema_slow'])
+    out['MACD'] = fast - slow
+    out['MACD_Signal'] = ema(out['MACD'], p['macd_signal'], init['ema_signal'])
+    upper, lower = bollinger_bands(c, p['bb_window'], p['bb_std'])
+    out['BB_Upper'], out['BB_Lower'] = upper[offset:], lower[offset:]
+    if has_range:
+        out['ATR'] = atr(h, l, c, p['atr_window'])[offset:]
+    returns = log_returns(c)
+    out['Log_Return'] = returns[offset:]
+    for k in range(1, p['n_lags'] + 1):
+        out[f'Log_Return_lag_{k}'] = lag(returns, k)[offset:]
+
+    keep = warmup_length(p)
+    new_state = {
+        'close': c[-keep:],
+        'high': h[-keep:] if has_range else None,
+        'low': l[-keep:] if has_range else None,
+        'ema_fast': fast[-1] if len(new) else init['ema_fast'],
+        'ema_slow': slow[-1] if len(new) else init['ema_slow'],
+        'ema_signal': out['MACD_Signal'][-1] if len(new) else init['ema_signal'],
+    }
+    return {name: _restore(v, was_1d) for name, v in out.items()}, new_state
+
+
+def compute_indicators(close, high=None, low=None, **params):
+    """
+    Compute the dashboard/model indicator set in one pass.
+
+    Inputs are 1-D series or (time, tickers) arrays/DataFrames. Returns a dict
+    keyed by the feature column names (`RSI`, `MACD`, `MACD_Signal`,
+    `BB_Upper`, `BB_Lower`, `ATR`, `Log_Return`, `Log_Return_lag_k`). When
+    `close` is a pandas object the values come back with the same labels.
+    `ATR` is only produced when `high` and `low` are given. Window lengths
+    can be overridden with the keys of `DEFAULT_PARAMS`.
+    """
+    out, _ = compute_indicators_stateful(close, high, low, **params)
+
+    if isinstance(close, pd.DataFrame):
+        return {name: pd.DataFrame(v, index=close.index, columns=close.columns) for name, v in out.items()}
+    if isinstance(close, pd.Series):
+        return {name: pd.Series(v, index=close.index) for name, v in out.items()}
+    return out
@@ -0,0 +1,191 @@
+"""
+Panel (long-format) pipeline for a whole ticker universe.
+
+Bars of every ticker live in one frame indexed by (Date, Ticker).
+Indicators are computed on wide (date x ticker) matrices by the kernels of
+`src/indicators.py`, so the cost is a handful of vectorized passes whatever
+the number of tickers. Macro series (VIX, TNX) are aligned once to the
+panel's dates and broadcast to every ticker (`src/exogenous.py`), and one model is trained on
+the whole cross-section.
+
+Tickers are aligned on the union of their trading days: a date missing for
+one ticker (listing, delisting, halt) is a gap in its wide column, and its
+rolling windows restart after the gap.
+
+    python -m src.panel build --universe data/universe.txt --period 20y --train
+    python -m src.panel build --from-store --output data/processed/features.parquet
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import exogenous, indicators, telemetry
+from .features import compact_dtypes, compact_values
+
+UNIVERSE_PATH = os.path.join('data', 'universe.txt')
+DEFAULT_UNIVERSE = ['AAPL', 'MSFT', 'TSLA']
+MACRO_SYMBOLS = {'VIX': '^VIX', 'TNX': '^TNX'}
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def load_universe(path=UNIVERSE_PATH):
+    """Tickers listed in `path` (one per line, `#` comments), or the default three."""
+    if not os.path.exists(path):
+        return list(DEFAULT_UNIVERSE)
+    with open(path) as f:
+        tickers = [line.split('#')[0].strip() for line in f]
+    return list(dict.fromkeys(t for t in tickers if t))
+
+
+def to_panel(bars):
+    """
+    Long frame indexed by (Date, Ticker), sorted by date then ticker, from
+    either {ticker: bars} or a date-indexed frame with a `Ticker` column.
+    """
+    if isinstance(bars, dict):
+        frames = {t: f for t, f in bars.items() if f is not None and not f.empty}
+        if not frames:
+            return pd.DataFrame(columns=PRICE_COLUMNS,
+                                index=pd.MultiIndex.from_tuples([], names=['Date', 'Ticker']))
+        panel = pd.concat(frames, names=['Ticker', 'Date']).swaplevel()
+    else:
+        panel = bars.set_index('Ticker', append=True)
+        panel.index = panel.index.set_names(['Date', 'Ticker'])
+    return panel.sort_index()
+
+
+def add_indicators(panel, **params):
+    """
+    Every indicator of `compute_indicators`, computed on the wide matrices
+    of the panel in one pass and added as columns (float32 features).
+    """
+    has_range = 'High' in panel.columns and 'Low' in panel.columns
+    wide = panel[['Close', 'High', 'Low'] if has_range else ['Close']].unstack('Ticker')
+    dates, tickers = wide.index, wide['Close'].columns
+    values = indicators.compute_indicators(
+        wide['Close'].to_numpy(),
+        wide['High'][tickers].to_numpy() if has_range else None,
+        wide['Low'][tickers].to_numpy() if has_range else None,
+        **params)
+    index = pd.MultiIndex.from_product([dates, tickers], names=['Date', 'Ticker'])
+    long = pd.DataFrame({name: v.ravel() for name, v in compact_values(values).items()}, index=index)
+    return panel.drop(columns=[c for c in long.columns if c in panel.columns]).join(long)
+
+
+def add_macro(panel, macro, max_staleness=exogenous.DEFAULT_MAX_STALENESS):
+    """
+    Broadcast date-indexed macro series to every ticker. Each date takes
+    the last macro value known on that date (no look-ahead), missing once
+    older than `max_staleness`.
+    """
+    return exogenous.join_asof(panel, macro, max_staleness)
+
+
+def add_targets(df):
+    """
+    `Direction`: 1 when the bar closes up (as in the feature notebook), and
+    `Target`: 1 when the next bar of the same ticker closes up (NaN on the
+    last bar of each ticker).
+    """
+    df = df.copy(deep=False)
+    df['Direction'] = (df['Log_Return'] > 0).astype(np.int8)
+    if 'Ticker' in df.index.names:
+        next_return = df.groupby(level='Ticker', sort=False, observed=True)['Log_Return'].shift(-1)
+    elif 'Ticker' in df.columns:
+        next_return = df.groupby('Ticker', sort=False, observed=True)['Log_Return'].shift(-1)
+    else:
+        next_return = df['Log_Return'].shift(-1)
+    df['Target'] = (next_return > 0).astype(np.float32).where(next_return.notna())
+    return df
+
+
+def build_dataset(bars, macro=None, dropna=True, **params):
+    """
+    End-to-end feature frame for a universe: indicators, macro columns and
+    targets. Returned in the `features.csv` layout (date index, `Ticker`
+    column), with compact dtypes.
+    """
+    with telemetry.span('panel.to_panel'):
+        panel = to_panel(bars)
+    with telemetry.span('panel.indicators', rows=len(panel)):
+        panel = add_indicators(panel, **params)
+    if macro is not None:
+        with telemetry.span('panel.macro'):
+            panel = add_macro(panel, macro)
+    with telemetry.span('panel.targets'):
+        panel = add_targets(panel)
+    if dropna:
+        panel = panel.dropna()
+        panel['Target'] = panel['Target'].astype(np.int8)
+    df = panel.reset_index('Ticker')
+    return compact_dtypes(df, inplace=True)
+
+
+def fetch_universe(tickers, period='20y', downloader=None):
+    """Bars of every ticker and the macro frame, refreshed in one concurrent pass."""
+    from .downloader import Downloader
+    downloader = downloader or Downloader()
+    frames, errors = downloader.fetch_many(list(tickers) + list(MACRO_SYMBOLS.values()), period=period)
+    for symbol, error in errors.items():
+        print(f"Fetch failed for {symbol}: {error}")
+    bars = {t: frames[t] for t in tickers if frames.get(t) is not None}
+    macro = pd.DataFrame({name: frames[symbol]['Close'] for name, symbol in MACRO_SYMBOLS.items()
+                          if frames.get(symbol) is not None})
+    return bars, macro
+
+
+def read_universe(store, tickers=None):
+    """Bars and macro frame from the local market store."""
+    from .store import MACRO_TICKER
+    bars = {t: store.read(t, columns=PRICE_COLUMNS) for t in (tickers or store.tickers())}
+    macro = store.read(MACRO_TICKER)
+    return bars, macro[[c for c in MACRO_SYMBOLS if c in macro.columns]]
+
+
+def write_dataset(df, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith('.parquet'):
+        df.to_parquet(path)
+    else:
+        df.to_csv(path)
+
+
+def main():
+    from .train_model import DATA_PATH, train_and_save_model
+
+    parser = argparse.ArgumentParser(description="Panel feature pipeline for a ticker universe")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="build the feature dataset of a universe")
+    build.add_argument('--universe', default=UNIVERSE_PATH, help="file with one ticker per line")
+    build.add_argument('--tickers', nargs='+', help="tickers (instead of the universe file)")
+    build.add_argument('--period', default='20y')
+    build.add_argument('--from-store', action='store_true',
+                       help="read bars from the local market store (all its tickers unless --tickers)")
+    build.add_argument('--output', default=DATA_PATH, help=".csv or .parquet")
+    build.add_argument('--train', action='store_true', help="train the model on the result")
+    args = parser.parse_args()
+
+    telemetry.enable()
+    start = time.perf_counter()
+    with telemetry.span('panel.load'):
+        if args.from_store:
+            from .store import MarketStore
+            bars, macro = read_universe(MarketStore(), args.tickers)
+        else:
+            bars, macro = fetch_universe(args.tickers or load_universe(args.universe), period=args.period)
+    df = build_dataset(bars, macro if not macro.empty else None)
+    with telemetry.span('panel.write'):
+        write_dataset(df, args.output)
+    print(f"{len(df):,} rows, {df['Ticker'].nunique()} tickers -> {args.output}")
+    if args.train:
+        with telemetry.span('panel.train'):
+            train_and_save_model(data_path=args.output)
+    print(telemetry.summary().to_string(index=False))
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
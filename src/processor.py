@@ -0,0 +1,136 @@
+import pandas as pd
+import numpy as np
+
+from . import backtest, exogenous, indicators, risk, scoring
+from .features import compact_values
+
+def calculate_indicators(df, inplace=False):
+    """
+    Calculate technical indicators for the given dataframe.
+    Expects a dataframe with 'Open', 'High', 'Low', 'Close', 'Volume' columns.
+    Uses the same kernels as training (`src/indicators.py`).
+    New columns are float32 (prices and log returns stay float64) and added
+    in one step without copying the input; with `inplace=True` they are
+    added to `df` itself.
+    """
+    has_range = all(col in df.columns for col in ['High', 'Low', 'Close'])
+    values = indicators.compute_indicators(
+        df['Close'].to_numpy(),
+        df['High'].to_numpy() if has_range else None,
+        df['Low'].to_numpy() if has_range else None,
+    )
+
+    # Keep indicators already present (e.g. local fallback data), except
+    # log returns which are always recalculated for accuracy.
+    groups = {'RSI': ['RSI'], 'MACD': ['MACD', 'MACD_Signal'],
+              'BB_Upper': ['BB_Upper', 'BB_Lower'], 'ATR': ['ATR']}
+    new = {}
+    for trigger, cols in groups.items():
+        if trigger not in df.columns and cols[0] in values:
+            for col in cols:
+                new[col] = values[col]
+
+    new['Log_Return'] = values['Log_Return']
+    for lag in range(1, 6):
+        col = f'Log_Return_lag_{lag}'
+        if col not in df.columns:
+            new[col] = values[col]
+
+    new = compact_values(new)
+    if not inplace:
+        return df.assign(**new)
+    for col, v in new.items():
+        df[col] = v
+    return df
+
+def prepare_features_for_prediction(df, macro_df):
+    """
+    Add the macro series to the stock data and clean up for prediction.
+    Each trading day takes the macro values known on that day (as-of, with
+    a staleness limit per series), so differing calendars lose no rows.
+    """
+    # Ensure both dataframes are timezone-naive to avoid join errors
+    if df.index.tz is not None:
+        df = df.tz_localize(None)
+    if macro_df.index.tz is not None:
+        macro_df = macro_df.tz_localize(None)
+
+    # Replaces overlapping columns (e.g., if df already has VIX/TNX from local fallback)
+    combined_df = exogenous.join_asof(df, macro_df)
+    
+    # Drop rows with NaN values (due to indicators/lags or stale macro data)
+    combined_df = combined_df.dropna()
+    
+    return combined_df
+
+def predict_probabilities(df, model, feature_names):
+    """
+    Probability of an up move for every row, from a single in-place
+    prediction on the booster.
+    """
+    return pd.Series(scoring.predict_proba(model, df[feature_names]), index=df.index, name='Probability')
+
+def explain_predictions(df, model, feature_names, approximate=True):
+    """
+    Per-feature contributions (log-odds) to the prediction of every row,
+    from one batched call on the booster. The approximate (path-based)
+    attribution costs about one prediction; exact TreeSHAP values are
+    more than a hundred times slower on the default model.
+    """
+    return scoring.predict_contributions(model, df[feature_names], approximate=approximate)
+
+def rolling_importance(contributions, window=21):
+    """
+    Mean absolute contribution of each feature over the last `window` rows,
+    as a share of the total, i.e. how much each feature drove the predictions
+    at each point in time.
+    """
+    strength = contributions.drop(columns='Bias', errors='ignore').abs()
+    rolling = strength.rolling(window, min_periods=1).mean()
+    return rolling.div(rolling.sum(axis=1), axis=0)
+
+def run_backtest(df, model, feature_names, probabilities=None, transaction_cost=0.001):
+    """
+    Simulate a trading strategy based on model predictions.
+    Pass `probabilities` (see `predict_probabilities`) to reuse rows that
+    were already scored instead of calling the model again.
+    """
+    df = df.copy()
+    if probabilities is None:
+        probabilities = predict_probabilities(df, model, feature_names)
+
+    # If the model predicts an up move (Buy), we get the next day's return.
+    # A transaction cost is paid whenever the signal changes (trade executed).
+    signal = backtest.positions_from_probabilities(np.asarray(probabilities))
+    df['Signal'] = signal.astype(int)
+    df['Trade'] = df['Signal'].diff().fillna(0).abs()
+
+    returns = backtest.strategy_returns(signal, df['Log_Return'], transaction_cost)[:, 0]
+    df['Strategy_Return'] = np.append(returns, np.nan)
+    
+    # Cumulative Returns (Corrected for Log Returns)
+    # Formula: exp(cumsum(log_returns))
+    df['Cumulative_Market'] = np.exp(df['Log_Return'].cumsum())
+    df['Cumulative_Strategy'] = np.exp(df['Strategy_Return'].cumsum())
+    
+    return df
+
+def run_strategy_sweep(df, probabilities, thresholds=(0.5, 0.52, 0.55, 0.6),
+                       costs=(0.0, 0.0005, 0.001, 0.002), modes=backtest.MODES,
+                       holding_periods=(1, 2, 5, 10)):
+    """
+    Evaluate a grid of strategy variants on already-scored rows.
+    """
+    return backtest.sweep(np.asarray(probabilities), df['Log_Return'].to_numpy(),
+                          thresholds=thresholds, costs=costs, modes=modes,
+                          holding_periods=holding_periods)
+
+def run_risk_simulation(backtest_results, n_paths=10_000, method='block', block_size=21):
+    """
+    Distribution of the strategy and buy-and-hold results over resampled
+    paths (see `src/risk.py`). Each strategy return is paired with the
+    market return of the same bar (the next day's log return).
+    """
+    market = backtest_results['Log_Return'].shift(-1)
+    return risk.simulate(backtest_results['Strategy_Return'], market, n_paths=n_paths,
+                         method=method, block_size=block_size)
@@ -0,0 +1,221 @@
+"""
+Model registry.
+
+Each trained booster is stored in XGBoost's native binary format (UBJSON)
+in its own version directory, next to a manifest with everything needed
+to use it: feature list and order, target, training window, parameters
+and metrics.
+
+    models/registry/direction/v0003/model.ubj
+    models/registry/direction/v0003/manifest.json
+
+Version directories are written under a temporary name and renamed into
+place, so readers never see a half-written model, and never change
+afterwards. `get_model()` resolves the latest version and loads each one
+at most once per process into a plain `Booster` (no sklearn wrapper to
+unpickle); xgboost itself is only imported on the first load.
+
+    python -m src.registry list
+    python -m src.registry import models/xgboost_model.joblib
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+
+REGISTRY_DIR = os.path.join('models', 'registry')
+DEFAULT_NAME = 'direction'
+MODEL_FILE = 'model.ubj'
+MANIFEST_FILE = 'manifest.json'
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+class RegisteredModel:
+    """A booster loaded from the registry, with its manifest."""
+
+    def __init__(self, booster, manifest):
+        self.booster = booster
+        self.manifest = manifest
+
+    @property
+    def name(self):
+        return self.manifest['name']
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    @property
+    def features(self):
+        return list(self.manifest['features'])
+
+    def get_booster(self):
+        return self.booster
+
+    def __repr__(self):
+        return f"RegisteredModel({self.name!r}, version={self.version})"
+
+
+def _version_dir(name, version, root):
+    return os.path.join(root, name, f'v{version:04d}')
+
+
+def versions(name=DEFAULT_NAME, root=REGISTRY_DIR):
+    """Complete versions of model `name`, oldest first."""
+    path = os.path.join(root, name)
+    if not os.path.isdir(path):
+        return []
+    found = [int(entry[1:]) for entry in os.listdir(path)
+             if entry.startswith('v') and entry[1:].isdigit()
+             and os.path.exists(os.path.join(path, entry, MANIFEST_FILE))]
+    return sorted(found)
+
+
+def latest_version(name=DEFAULT_NAME, root=REGISTRY_DIR):
+    found = versions(name, root)
+    return found[-1] if found else None
+
+
+def load_manifest(name=DEFAULT_NAME, version=None, root=REGISTRY_DIR):
+    """Manifest of a version (the latest by default), or None if there is none."""
+    version = latest_version(name, root) if version is None else version
+    if version is None:
+        return None
+    path = os.path.join(_version_dir(name, version, root), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def training_window(df):
+    """Start, end, row and ticker counts of a date-indexed training frame."""
+    window = {'start': None, 'end': None, 'rows': int(len(df))}
+    if len(df):
+        window['start'] = pd.Timestamp(df.index.min()).isoformat()
+        window['end'] = pd.Timestamp(df.index.max()).isoformat()
+    if 'Ticker' in df.columns:
+        window['tickers'] = int(df['Ticker'].nunique())
+    return window
+
+
+def save_model(model, features, target=None, name=DEFAULT_NAME, root=REGISTRY_DIR,
+               train_window=None, params=None, metrics=None, **info):
+    """
+    Register `model` (a sklearn wrapper or a Booster) as the next version of
+    `name`. Returns the manifest written next to it.
+    """
+    import xgboost
+
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    os.makedirs(os.path.join(root, name), exist_ok=True)
+    while True:
+        version = (latest_version(name, root) or 0) + 1
+        manifest = {
+            'name': name,
+            'version': version,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'format': 'xgboost-ubj',
+            'file': MODEL_FILE,
+            'xgboost': xgboost.__version__,
+            'features': list(features),
+            'target': target,
+            'train_window': train_window,
+            'params': params or {},
+            'metrics': metrics or {},
+            **info,
+        }
+        final = _version_dir(name, version, root)
+        # Unique per writer (threads of one process share the pid)
+        tmp = os.path.join(root, name, f'.v{version:04d}.{uuid.uuid4().hex[:8]}.tmp')
+        os.makedirs(tmp)
+        booster.save_model(os.path.join(tmp, MODEL_FILE))
+        with open(os.path.join(tmp, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        try:
+            os.rename(tmp, final)
+            return manifest
+        except OSError:
+            # Another writer took this version number first.
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.exists(final):
+                raise
+
+
+def get_model(name=DEFAULT_NAME, version=None, root=REGISTRY_DIR):
+    """
+    The registered model (latest version by default), loaded once per
+    process and shared. Returns None if nothing is registered.
+    """
+    version = latest_version(name, root) if version is None else version
+    if version is None:
+        return None
+    path = _version_dir(name, version, root)
+    key = os.path.abspath(path)
+    with _lock:
+        model = _loaded.get(key)
+    if model is not None:
+        return model
+    manifest = load_manifest(name, version, root)
+    if manifest is None:
+        return None
+
+    import xgboost
+
+    booster = xgboost.Booster()
+    booster.load_model(os.path.join(path, manifest.get('file', MODEL_FILE)))
+    with _lock:
+        model = _loaded.setdefault(key, RegisteredModel(booster, manifest))
+    return model
+
+
+def clear_loaded():
+    """Forget the models loaded by `get_model`."""
+    with _lock:
+        _loaded.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model registry")
+    parser.add_argument('--root', default=REGISTRY_DIR)
+    parser.add_argument('--name', default=DEFAULT_NAME)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="list the registered versions")
+    legacy = sub.add_parser('import', help="register a joblib-pickled model")
+    legacy.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        import joblib
+        from .train_model import FEATURES, TARGET
+        model = joblib.load(args.path)
+        features = model.get_booster().feature_names or FEATURES
+        params = {k: v for k, v in model.get_params().items() if v is not None}
+        manifest = save_model(model, features, target=TARGET, name=args.name, root=args.root,
+                              params=params, source=os.path.abspath(args.path))
+        print(f"Registered {args.path} as {args.name} v{manifest['version']}")
+        return
+
+    rows = []
+    for version in versions(args.name, args.root):
+        manifest = load_manifest(args.name, version, args.root)
+        window = manifest.get('train_window') or {}
+        rows.append({'version': version, 'created': manifest['created'],
+                     'train_start': window.get('start'), 'train_end': window.get('end'),
+                     'rows': window.get('rows'), 'features': len(manifest['features']),
+                     **manifest.get('metrics', {})})
+    if rows:
+        print(pd.DataFrame(rows).to_string(index=False))
+    else:
+        print(f"No model registered under {os.path.join(args.root, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Offline replay harness for the intraday pipeline.
+
+Recorded bars (one CSV or Parquet file per ticker, e.g. written by
+`record_responses`) or synthetic ones are replayed in time order through
+the live scoring path: aggregation to a coarser interval (`BarAggregator`,
+optional), O(1) indicator update (`IncrementalIndicators`) and scoring
+with the latest registered model, every ticker of a timestamp at once.
+Bars are released at `speed` times their recorded pace (0: as fast as
+possible, e.g. to load-test a market-open burst). The end-to-end latency
+of every bar (release to scores) and the sustained throughput are reported.
+
+    python -m src.replay data/recorded --interval 5m --speed 60
+    python -m src.replay --synthetic 500 --bars 2000
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import exogenous, registry
+from .incremental import IncrementalIndicators
+from .intraday import BAR_COLUMNS, BarAggregator
+from .scoring import ScoringMetrics, predict_proba
+from .train_model import FEATURES
+
+MACRO_FILES = {'VIX': '^VIX', 'TNX': '^TNX'}
+
+
+def load_recorded(directory, tickers=None):
+    """
+    Bars per ticker from `<directory>/<ticker>.csv|.parquet`, and the macro
+    frame from the `^VIX` / `^TNX` files when they were recorded too.
+    """
+    frames = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.csv')) + glob.glob(os.path.join(directory, '*.parquet'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if tickers is not None and name not in tickers and name not in MACRO_FILES.values():
+            continue
+        df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, index_col=0, parse_dates=True)
+        frames[name] = df.sort_index()
+    macro = pd.DataFrame({column: frames.pop(symbol)['Close'] for column, symbol in MACRO_FILES.items()
+                          if symbol in frames})
+    return frames, macro
+
+
+def align(frames):
+    """
+    (timestamps, tickers, {column: (time, tickers) array}) on the union of
+    the timestamps. A ticker without a bar at a timestamp repeats its last
+    close with no volume; rows before every ticker has traded are dropped
+    (all of them when some ticker never trades).
+    """
+    tickers = list(frames)
+    wide = {column: pd.concat({t: frames[t][column] for t in tickers}, axis=1)
+            for column in BAR_COLUMNS if all(column in f.columns for f in frames.values())}
+    close = wide['Close'].ffill()
+    for column in ('Open', 'High', 'Low'):
+        if column in wide:
+            wide[column] = wide[column].fillna(close)
+    wide['Close'] = close
+    if 'Volume' in wide:
+        wide['Volume'] = wide['Volume'].fillna(0.0)
+    complete = close.notna().all(axis=1).to_numpy()
+    start = complete.argmax() if complete.any() else len(close)
+    return close.index[start:], tickers, {column: w.to_numpy(dtype=float)[start:] for column, w in wide.items()}
+
+
+def _macro_lookup(macro, features, timestamps=(), max_staleness=exogenous.DEFAULT_MAX_STALENESS):
+    """
+    Function giving the macro values known at a bar time, as-of with the
+    staleness limits of `exogenous.align`. A daily series is only known
+    after its session: intraday bars see the previous session's value.
+    Values at `timestamps` are aligned up front in one pass.
+    """
+    columns = [c for c in features if c in getattr(macro, 'columns', [])]
+    if not columns:
+        return lambda ts: {}
+    macro = macro[columns]
+    daily = bool((macro.index == macro.index.normalize()).all())
+    known = {}
+
+    def as_of(ts):
+        ts = pd.Timestamp(ts)
+        ts = ts.tz_localize(None) if ts.tz is not None else ts
+        return ts.normalize() - pd.Timedelta(1, 'ns') if daily and ts != ts.normalize() else ts
+
+    def fill(points):
+        points = pd.DatetimeIndex(sorted(set(points) - set(known)))
+        if len(points):
+            aligned = exogenous.align(macro, points, max_staleness).to_numpy()
+            known.update((point, dict(zip(columns, row))) for point, row in zip(points, aligned))
+
+    fill(as_of(ts) for ts in timestamps)
+
+    def lookup(ts):
+        point = as_of(ts)
+        if point not in known:
+            fill([point])
+        return known[point]
+    return lookup
+
+
+def replay(frames, model=None, interval=None, speed=0.0, macro=None, max_bars=None):
+    """
+    Replay aligned bars through aggregation, indicators and scoring.
+
+    Returns (report, scores): the latency/throughput summary (`rows` are
+    input ticker-bars, `batches` scored bars) and the last scores per ticker.
+    """
+    timestamps, tickers, arrays = align(frames)
+    if not len(timestamps):
+        raise ValueError("No timestamp at which every ticker has a bar")
+    if max_bars is not None:
+        timestamps = timestamps[:max_bars]
+    n = len(tickers)
+    aggregator = BarAggregator(interval, n_series=n) if interval else None
+    engine = IncrementalIndicators(n_series=n)
+    features = (getattr(model, 'features', None) or FEATURES) if model is not None else []
+    macro_at = _macro_lookup(macro, features, timestamps if aggregator is None else ())
+    metrics = ScoringMetrics(window=max(10_000, len(timestamps)))
+    matrix = np.empty((n, len(features)), dtype=np.float32)
+    scores = None
+
+    def process(bar_time, bar):
+        nonlocal scores
+        values = engine.update(bar['Close'], bar.get('High'), bar.get('Low'))
+        if model is None:
+            return
+        known = macro_at(bar_time)
+        for j, name in enumerate(features):
+            matrix[:, j] = values[name] if name in values else known.get(name, np.nan)
+        scores = (bar_time, predict_proba(model, matrix))
+
+    origin = timestamps[0].value if len(timestamps) else 0
+    started = time.perf_counter()
+    metrics.started = started
+    for i, ts in enumerate(timestamps):
+        release = started + (ts.value - origin) / 1e9 / speed if speed > 0 else time.perf_counter()
+        wait = release - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        event = {column: a[i] for column, a in arrays.items()}
+        if aggregator is None:
+            completed = [(ts, event)]
+        else:
+            completed = aggregator.update(ts, event['Open'], event['High'], event['Low'],
+                                          event['Close'], event.get('Volume', 0.0))
+        for bar_time, bar in completed:
+            process(bar_time, bar)
+        metrics.record(time.perf_counter() - release, n, batches=len(completed))
+    if aggregator is not None:
+        for bar_time, bar in aggregator.flush():
+            process(bar_time, bar)
+            metrics.record_batch()
+
+    report = metrics.summary()
+    report.update({'tickers': n, 'timestamps': len(timestamps), 'interval': interval or 'as recorded',
+                   'speed': speed, 'seconds': time.perf_counter() - started})
+    last = None
+    if scores is not None:
+        last = pd.DataFrame({'Probability': scores[1], 'Direction': (scores[1] > 0.5).astype(int)},
+                            index=pd.Index(tickers, name='Ticker'))
+        last.attrs['time'] = scores[0]
+    return report, last
+
+
+def synthetic_frames(n_tickers, n_bars, seed=0):
+    """Per-ticker 1-minute bars for load tests (see `benchmark.synthetic_ohlcv`)."""
+    from .benchmark import synthetic_ohlcv
+    bars = synthetic_ohlcv(n_tickers * n_bars, n_tickers, seed)
+    return {t: g.drop(columns='Ticker') for t, g in bars.groupby('Ticker', sort=True)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline replay of recorded bars through the scoring path")
+    parser.add_argument('directory', nargs='?', help="recorded bars, one <ticker>.csv/.parquet per ticker")
+    parser.add_argument('--tickers', nargs='+', help="only these tickers")
+    parser.add_argument('--synthetic', type=int, metavar='N_TICKERS', help="replay synthetic 1-minute bars instead")
+    parser.add_argument('--bars', type=int, default=1_000, help="timestamps of synthetic data")
+    parser.add_argument('--interval', default=None, help="aggregate to this interval first (5m, 15m, 1h, 1d)")
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="replay speed relative to recorded time (0: as fast as possible)")
+    parser.add_argument('--max-bars', type=int, default=None, help="stop after this many timestamps")
+    parser.add_argument('--no-model', action='store_true', help="aggregation and indicators only")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        frames, macro = synthetic_frames(args.synthetic, args.bars), None
+    elif args.directory:
+        frames, macro = load_recorded(args.directory, args.tickers)
+    else:
+        parser.error("give a directory of recorded bars or --synthetic N")
+    if not frames:
+        print("No recorded bars found.")
+        return
+    model = None if args.no_model else registry.get_model()
+    if model is None and not args.no_model:
+        print("No registered model: replaying aggregation and indicators only.")
+
+    report, scores = replay(frames, model, interval=args.interval, speed=args.speed,
+                            macro=macro, max_bars=args.max_bars)
+    if scores is not None:
+        print(f"Last scores ({scores.attrs['time']}):")
+        print(scores.head(20).to_string())
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
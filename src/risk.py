@@ -0,0 +1,146 @@
+"""
+Monte Carlo / bootstrap risk engine for strategy results.
+
+The per-bar log returns of a strategy and of buy-and-hold are resampled
+together (same bars drawn for both, so their correlation is kept) into
+many alternative paths of the same length:
+
+- 'block': circular block bootstrap, blocks of `block_size`
+  consecutive bars (wrapping around), keeping volatility clusters;
+- 'iid': bars drawn independently;
+- 'normal': bivariate normal returns with the sample mean and covariance.
+
+Paths are generated as (paths, time) arrays, `chunk_paths` at a time to
+bound memory, and reduced to terminal returns, maximum drawdowns and
+quantile bands of the cumulative growth (on at most `band_points` dates).
+"""
+import numpy as np
+import pandas as pd
+
+METHODS = ('block', 'iid', 'normal')
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def resample_indices(n, n_paths, block_size=1, horizon=None, rng=None):
+    """
+    Bar indices of `n_paths` bootstrap paths of `horizon` bars, shape
+    (paths, horizon). Blocks wrap around the end of the history: indices
+    run up to n + block_size - 2, to be read with `np.take(..., mode='wrap')`.
+    """
+    rng = rng or np.random.default_rng()
+    horizon = horizon or n
+    if block_size <= 1:
+        return rng.integers(0, n, size=(n_paths, horizon), dtype=np.int32)
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, n, size=(n_paths, n_blocks, 1), dtype=np.int32)
+    return (starts + np.arange(block_size, dtype=np.int32)).reshape(n_paths, -1)[:, :horizon]
+
+
+def _paths(returns, n_paths, method, block_size, horizon, rng):
+    """Resampled (strategy, market) log returns, each of shape (paths, horizon), float32."""
+    if method == 'normal':
+        # Correlated normals from two standard normal draws (a 2x2 Cholesky
+        # factor), much cheaper than `multivariate_normal`
+        # Python floats keep the float32 arithmetic in float32
+        (mu_s, mu_m), (sd_s, sd_m) = returns.mean(axis=0).tolist(), returns.std(axis=0, ddof=1).tolist()
+        rho = float(np.corrcoef(returns, rowvar=False)[0, 1]) if sd_s > 0 and sd_m > 0 else 0.0
+        z = rng.standard_normal((2, n_paths, horizon), dtype=np.float32)
+        market = z[1] * sd_m + mu_m
+        # Strategy = rho * (market shock) + sqrt(1 - rho^2) * (independent shock)
+        strategy = z[1] * (rho * sd_s)
+        strategy += z[0] * (np.sqrt(1 - rho ** 2) * sd_s) + mu_s
+        return strategy, market
+    idx = resample_indices(len(returns), n_paths, block_size if method == 'block' else 1, horizon, rng)
+    values = returns.astype(np.float32)
+    return np.take(values[:, 0], idx, mode='wrap'), np.take(values[:, 1], idx, mode='wrap')
+
+
+def _max_drawdown(cum):
+    """Maximum drawdown of each cumulative log-return path (rows), as in `backtest.performance`."""
+    peak = np.maximum(cum, 0.0)
+    np.maximum.accumulate(peak, axis=1, out=peak)
+    np.subtract(cum, peak, out=peak)
+    return np.expm1(peak.min(axis=1))
+
+
+def simulate(strategy_returns, market_returns, n_paths=10_000, method='block', block_size=21,
+             horizon=None, quantiles=QUANTILES, band_points=200, chunk_paths=2_000, seed=0):
+    """
+    Resample the strategy and market log returns (aligned per bar, NaN bars
+    dropped) into `n_paths` paths of `horizon` bars (default: as many as
+    the history).
+
+    Returns a dict with, per path, `strategy_total` / `market_total` (total
+    simple return) and `strategy_drawdown` / `market_drawdown` (maximum
+    drawdown), and `bands`: {'strategy': frame, 'market': frame} of growth
+    quantiles (columns) per bar, indexed like the inputs when they are
+    Series and the horizon is the history.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    strategy = np.asarray(strategy_returns, dtype=float)
+    market = np.asarray(market_returns, dtype=float)
+    keep = ~(np.isnan(strategy) | np.isnan(market))
+    returns = np.column_stack([strategy[keep], market[keep]])
+    if len(returns) < 2:
+        raise ValueError("Need at least two bars of returns")
+    horizon = horizon or len(returns)
+    grid = np.unique(np.linspace(0, horizon - 1, min(band_points, horizon)).round().astype(int))
+
+    rng = np.random.default_rng(seed)
+    out = {name: np.empty(n_paths) for name in
+           ('strategy_total', 'market_total', 'strategy_drawdown', 'market_drawdown')}
+    # (dates, paths): the quantiles below then reduce contiguous rows
+    sampled = {name: np.empty((len(grid), n_paths), dtype=np.float32) for name in ('strategy', 'market')}
+    for start in range(0, n_paths, chunk_paths):
+        stop = min(start + chunk_paths, n_paths)
+        for name, paths in zip(('strategy', 'market'),
+                               _paths(returns, stop - start, method, block_size, horizon, rng)):
+            cum = np.cumsum(paths, axis=1)
+            out[f'{name}_total'][start:stop] = np.expm1(cum[:, -1])
+            out[f'{name}_drawdown'][start:stop] = _max_drawdown(cum)
+            sampled[name][:, start:stop] = cum[:, grid].T
+
+    index = grid
+    if horizon == len(returns) and isinstance(strategy_returns, pd.Series):
+        index = strategy_returns.index[keep][grid]
+    out['bands'] = {name: pd.DataFrame(np.exp(np.quantile(values, quantiles, axis=1)).T,
+                                       index=index, columns=list(quantiles))
+                    for name, values in sampled.items()}
+    out['paths'], out['horizon'], out['method'] = n_paths, horizon, method
+    return out
+
+
+def tail_risk(total_returns, alpha=0.95):
+    """Value at risk and conditional VaR (expected shortfall) at `alpha`, as positive losses."""
+    total_returns = np.asarray(total_returns, dtype=float)
+    cutoff = np.quantile(total_returns, 1 - alpha)
+    return -cutoff, -total_returns[total_returns <= cutoff].mean()
+
+
+def summary(result, alphas=(0.95, 0.99)):
+    """
+    Risk table of a `simulate` result, one row per series (strategy and
+    buy-and-hold): mean and median total return, VaR/CVaR of the total
+    return, median and 5% worst maximum drawdown, and the probability of
+    beating the other series.
+    """
+    rows = {}
+    for name, other in (('strategy', 'market'), ('market', 'strategy')):
+        total = result[f'{name}_total']
+        drawdown = result[f'{name}_drawdown']
+        row = {'mean_return': total.mean(), 'median_return': np.median(total)}
+        for alpha in alphas:
+            var, cvar = tail_risk(total, alpha)
+            row[f'var_{alpha:.0%}'] = var
+            row[f'cvar_{alpha:.0%}'] = cvar
+        row['median_max_drawdown'] = np.median(drawdown)
+        row['worst_5%_max_drawdown'] = np.quantile(drawdown, 0.05)
+        row['prob_beat_other'] = (total > result[f'{other}_total']).mean()
+        rows[name] = row
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def prob_beat_market(result):
+    """Share of paths where the strategy ends above buy-and-hold."""
+    return float((result['strategy_total'] > result['market_total']).mean())
@@ -0,0 +1,361 @@
+"""
+Batch scoring of the direction model.
+
+`Scorer` loads the booster once and returns direction and probability from
+a single in-place prediction over any number of rows. `MicroBatcher`
+merges rows submitted concurrently (e.g. by HTTP handler threads) into one
+prediction call. Latency and throughput are tracked in `ScoringMetrics`.
+The service scores tickers from the cached bars; a background
+`CacheRefresher` keeps the cache of the tickers seen so far up to date.
+
+    python -m src.scoring score AAPL MSFT TSLA
+    python -m src.scoring serve --port 8000
+        POST /score  {"tickers": ["AAPL", "MSFT"]}
+                     or {"rows": {"AAPL": {"RSI": ..., ...}, ...}}
+        GET  /metrics
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from . import exogenous, indicators, registry
+from .downloader import Downloader
+from .train_model import FEATURES
+
+MACRO_SYMBOLS = {'VIX': '^VIX', 'TNX': '^TNX'}
+
+
+def get_booster(model):
+    """Underlying xgboost Booster of a sklearn wrapper (or the booster itself)."""
+    return model.get_booster() if hasattr(model, 'get_booster') else model
+
+
+def _iteration_kwargs(booster):
+    try:
+        return {'iteration_range': (0, booster.best_iteration + 1)}
+    except AttributeError:
+        return {}
+
+
+def predict_proba(model, X):
+    """Up-move probability for every row of `X` with one in-place prediction."""
+    booster = get_booster(model)
+    return np.asarray(booster.inplace_predict(X, **_iteration_kwargs(booster)), dtype=float)
+
+
+def predict_contributions(model, X, approximate=False):
+    """
+    Contribution of each feature to the log-odds of every row of the frame
+    `X` (XGBoost's TreeSHAP output), computed in one call over all rows.
+    The `Bias` column holds the expected value; a row sums to its margin.
+    `approximate=True` uses the cheaper path-based attribution instead.
+    """
+    import xgboost
+
+    booster = get_booster(model)
+    values = booster.predict(xgboost.DMatrix(X), pred_contribs=True, approx_contribs=approximate,
+                             **_iteration_kwargs(booster))
+    return pd.DataFrame(values, index=X.index, columns=list(X.columns) + ['Bias'])
+
+
+class ScoringMetrics:
+    """Rolling latency samples and cumulative throughput counters."""
+
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, seconds, rows, batches=0):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.rows += rows
+            self.batches += batches
+
+    def record_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    def summary(self):
+        with self._lock:
+            lat = np.array(self.latencies) * 1000
+            elapsed = time.perf_counter() - self.started
+            out = {'requests': self.requests, 'rows': self.rows, 'batches': self.batches,
+                   'rows_per_second': self.rows / elapsed if elapsed > 0 else 0.0}
+        if len(lat):
+            out.update({'latency_ms_p50': float(np.percentile(lat, 50)),
+                        'latency_ms_p95': float(np.percentile(lat, 95)),
+                        'latency_ms_p99': float(np.percentile(lat, 99)),
+                        'latency_ms_max': float(lat.max())})
+        return out
+
+
+class Scorer:
+    """
+    Scores feature rows in batches with a given model, or by default with
+    the latest registered one (feature order from its manifest).
+    """
+
+    def __init__(self, model=None, version=None, features=None, root=registry.REGISTRY_DIR):
+        if model is None:
+            model = registry.get_model(version=version, root=root)
+            if model is None:
+                raise FileNotFoundError(f"No model registered under {root}")
+        self.model = model
+        self.booster = get_booster(self.model)
+        self.features = list(features or getattr(model, 'features', None) or FEATURES)
+        self.metrics = ScoringMetrics()
+
+    def score(self, rows):
+        """
+        Score a frame of feature rows (any index, e.g. tickers).
+        Returns `Probability` (up move) and `Direction` (1 = up) per row.
+        """
+        start = time.perf_counter()
+        X = rows[self.features].to_numpy(dtype=np.float32)
+        proba = predict_proba(self.booster, X)
+        result = pd.DataFrame({'Probability': proba, 'Direction': (proba > 0.5).astype(int)},
+                              index=rows.index)
+        self.metrics.record(time.perf_counter() - start, len(rows), batches=1)
+        return result
+
+
+class MicroBatcher:
+    """
+    Collects rows submitted from many threads and scores them together:
+    a batch is flushed when it reaches `max_batch` rows or when the oldest
+    request has waited `max_wait_ms`.
+    """
+
+    def __init__(self, scorer, max_batch=4096, max_wait_ms=2.0):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = ScoringMetrics()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, rows):
+        """Queue a frame of feature rows; returns a Future of its scores."""
+        future = Future()
+        self._queue.put((rows, future, time.perf_counter()))
+        return future
+
+    def score(self, rows):
+        return self.submit(rows).result()
+
+    def _loop(self):
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = pending[0][2] + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+            self._flush(pending)
+
+    def _flush(self, pending):
+        try:
+            batch = pd.concat([rows for rows, _, _ in pending])
+            scores = self.scorer.score(batch)
+        except Exception as e:
+            for _, future, _ in pending:
+                future.set_exception(e)
+            return
+        offset, now = 0, time.perf_counter()
+        for rows, future, submitted in pending:
+            future.set_result(scores.iloc[offset:offset + len(rows)])
+            offset += len(rows)
+            self.metrics.record(now - submitted, len(rows), batches=0)
+        self.metrics.record_batch()
+
+
+class CacheRefresher:
+    """
+    Refreshes the cached bars of every ticker seen so far (and the macro
+    series) in one concurrent pass every `interval` seconds, on a
+    background thread, so requests never wait for the network.
+    """
+
+    def __init__(self, downloader, period="1y", interval=300.0):
+        self.downloader = downloader
+        self.period = period
+        self.interval = interval
+        self.tickers = set(MACRO_SYMBOLS.values())
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def track(self, tickers):
+        with self._lock:
+            self.tickers.update(tickers)
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                tickers = sorted(self.tickers)
+            try:
+                self.downloader.refresh(tickers, period=self.period)
+            except Exception as e:
+                print(f"Background refresh failed: {e}")
+            time.sleep(self.interval)
+
+
+def latest_features(tickers, period="1y", downloader=None, refresh=False):
+    """
+    Latest complete feature row of each ticker, indexed by ticker, from the
+    downloader's cache (refreshed first in one concurrent pass when
+    `refresh`; tickers not cached yet are always fetched). Tickers sharing
+    a calendar are computed together on a (time, tickers) panel, so a
+    ticker's rolling windows never see another ticker's dates.
+    """
+    downloader = downloader or Downloader()
+    symbols = list(tickers) + list(MACRO_SYMBOLS.values())
+    if refresh:
+        downloader.refresh(symbols, period)
+    else:
+        missing = [s for s in symbols if downloader.store.last_timestamp(s) is None]
+        if missing:
+            downloader.refresh(missing, period)
+    frames, _ = downloader.fetch_many(symbols, period=period, refresh=False)
+    bars = {t: frames[t].dropna(subset=['Close']) for t in tickers if frames.get(t) is not None}
+    available = [t for t in tickers if t in bars and not bars[t].empty]
+    if not available:
+        return pd.DataFrame(columns=FEATURES)
+
+    calendars = {}
+    for ticker in available:
+        calendars.setdefault(bars[ticker].index.as_unit('ns').asi8.tobytes(), []).append(ticker)
+    values = {}
+    for group in calendars.values():
+        field = lambda name: pd.concat({t: bars[t][name] for t in group}, axis=1)
+        computed = indicators.compute_indicators(field('Close'), field('High'), field('Low'))
+        for ticker in group:
+            values[ticker] = pd.DataFrame({name: v[ticker] for name, v in computed.items()})
+
+    macro = pd.DataFrame({column: frames[symbol]['Close'] for column, symbol in MACRO_SYMBOLS.items()
+                          if frames.get(symbol) is not None})
+
+    if not macro.empty:
+        # One aligned matrix on the union of the calendars; tickers gather their rows
+        dates = pd.DatetimeIndex(sorted(set().union(*(values[t].index for t in available))))
+        aligned = exogenous.aligned_matrix(macro, dates).to_numpy()
+
+    rows = {}
+    for ticker in available:
+        panel = values[ticker]
+        if not macro.empty:
+            gathered = aligned[dates.get_indexer(panel.index)]
+            panel = panel.assign(**{column: gathered[:, j] for j, column in enumerate(macro.columns)})
+        complete = panel.dropna(subset=[c for c in FEATURES if c in panel.columns])
+        if not complete.empty and all(c in complete.columns for c in FEATURES):
+            rows[ticker] = complete.iloc[-1]
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def make_handler(batcher, period="1y", downloader=None, refresher=None):
+    """HTTP handler class bound to a batcher (tickers scored from `downloader`'s cache)."""
+    downloader = downloader or Downloader()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send(200, {'service': batcher.metrics.summary(),
+                                 'model': batcher.scorer.metrics.summary()})
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._send(404, {'error': 'not found'})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if 'rows' in request:
+                    rows = pd.DataFrame.from_dict(request['rows'], orient='index')
+                else:
+                    if refresher is not None:
+                        refresher.track(request['tickers'])
+                    rows = latest_features(request['tickers'], period=request.get('period', period),
+                                           downloader=downloader)
+                scores = batcher.score(rows) if len(rows) else pd.DataFrame()
+                self._send(200, {'scores': scores.to_dict(orient='index')})
+            except Exception as e:
+                self._send(400, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(scorer, host='127.0.0.1', port=8000, max_batch=4096, max_wait_ms=2.0, refresh_seconds=300.0):
+    """Run the local scoring HTTP service until interrupted."""
+    batcher = MicroBatcher(scorer, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    downloader = Downloader()
+    refresher = CacheRefresher(downloader, interval=refresh_seconds)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher, downloader=downloader, refresher=refresher))
+    print(f"Scoring service on http://{host}:{port} (POST /score, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch scoring of the direction model")
+    parser.add_argument('--version', type=int, default=None, help="registered model version (default: latest)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    score_cmd = sub.add_parser('score', help="score the latest bar of each ticker")
+    score_cmd.add_argument('tickers', nargs='+')
+    score_cmd.add_argument('--period', default='1y')
+    serve_cmd = sub.add_parser('serve', help="run the HTTP service")
+    serve_cmd.add_argument('--host', default='127.0.0.1')
+    serve_cmd.add_argument('--port', type=int, default=8000)
+    serve_cmd.add_argument('--max-batch', type=int, default=4096)
+    serve_cmd.add_argument('--max-wait-ms', type=float, default=2.0)
+    serve_cmd.add_argument('--refresh-seconds', type=float, default=300.0,
+                           help="interval of the background price refresh")
+    args = parser.parse_args()
+
+    scorer = Scorer(version=args.version)
+    if args.command == 'score':
+        rows = latest_features(args.tickers, period=args.period, refresh=True)
+        print(scorer.score(rows).to_string())
+        print(json.dumps(scorer.metrics.summary()))
+    else:
+        serve(scorer, args.host, args.port, args.max_batch, args.max_wait_ms, args.refresh_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Hyperparameter search for the XGBoost direction model.
+
+Candidates are scored with walk-forward (time-series) cross-validation, in
+parallel in a process pool. Every score is stored in a fitness cache keyed
+by a hash of the parameters, the number of boosting rounds and the data,
+so a configuration is never trained twice (also across runs). Within a fit,
+early stopping cuts unpromising candidates by boosting round; it watches
+the last dates of the training fold (after a purge gap), never the
+validation fold the AUC is measured on.
+
+Strategies: genetic search, successive halving, Hyperband and an exhaustive
+grid (as a reference). The winner is written to `models/best_params.json`,
+which `train_model` picks up.
+
+    python -m src.search --method halving --jobs 4
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.metrics import roc_auc_score
+from xgboost import XGBClassifier
+
+from .train_model import BEST_PARAMS_PATH, FEATURES, TARGET, load_dataset, save_best_params
+from .walk_forward import make_folds
+
+SEARCH_SPACE = {
+    'max_depth': [3, 4, 5, 6, 7],
+    'learning_rate': [0.01, 0.03, 0.05, 0.1, 0.2],
+    'subsample': [0.6, 0.7, 0.8, 0.9, 1.0],
+    'colsample_bytree': [0.6, 0.7, 0.8, 0.9, 1.0],
+    'min_child_weight': [1, 3, 5],
+}
+FIXED_PARAMS = {'eval_metric': 'logloss', 'random_state': 42}
+CACHE_PATH = os.path.join('models', 'search_cache.json')
+EARLY_STOPPING_ROUNDS = 20
+# Share of each training fold's dates held out for early stopping
+EARLY_STOPPING_FRACTION = 0.2
+
+# Data shared with worker processes (set once per worker by the initializer)
+_DATA = None
+
+
+def param_key(params, n_rounds, fingerprint):
+    """Stable hash of a configuration, its boosting rounds and the data."""
+    payload = json.dumps({'params': params, 'rounds': n_rounds, 'data': fingerprint}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class FitnessCache:
+    """Scores by configuration hash, persisted as JSON."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.scores = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.scores = json.load(f)
+        self.hits = 0
+        self.misses = 0
+
+    def save(self):
+        """Write the scores to a temporary file swapped in at once (never a truncated cache)."""
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.scores, f)
+            os.replace(tmp, self.path)
+
+
+def _init_worker(data):
+    global _DATA
+    _DATA = data
+
+
+def _cv_score(task):
+    """Mean validation AUC of one configuration over the CV folds."""
+    params, n_rounds = task
+    X, y, splits = _DATA
+    scores, rounds_used = [], []
+    for train, stop, valid in splits:
+        model = XGBClassifier(**FIXED_PARAMS, **params, n_estimators=n_rounds, n_jobs=1,
+                              early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+        model.fit(X[train], y[train], eval_set=[(X[stop], y[stop])], verbose=False)
+        scores.append(roc_auc_score(y[valid], model.predict_proba(X[valid])[:, 1]))
+        rounds_used.append(model.best_iteration + 1)
+    return float(np.mean(scores)), int(np.max(rounds_used))
+
+
+class Searcher:
+    """Shared evaluation machinery: CV splits, process pool and fitness cache."""
+
+    def __init__(self, df, features=FEATURES, target=TARGET, n_splits=3, n_jobs=None,
+                 cache_path=CACHE_PATH, seed=42):
+        df = df.sort_index(kind='stable')
+        dates = df.index.unique()
+        positions = dates.get_indexer(df.index)
+        folds = make_folds(len(dates), n_folds=n_splits, purge=1)
+        splits = []
+        for a, b, c, d in folds:
+            # (fit, early stopping, validation) dates, purged like the folds
+            e = b - max(1, int((b - a) * EARLY_STOPPING_FRACTION))
+            splits.append(((positions >= a) & (positions < e - 1), (positions >= e) & (positions < b),
+                           (positions >= c) & (positions < d)))
+        X = df[features].to_numpy(dtype=np.float32)
+        y = df[target].to_numpy()
+        self.data = (X, y, splits)
+        # The split scheme is part of the key: scores of other schemes are not reused
+        scheme = repr((folds, EARLY_STOPPING_FRACTION)).encode()
+        self.fingerprint = hashlib.sha1(X.tobytes() + y.tobytes() + scheme).hexdigest()[:16]
+        self.cache = FitnessCache(cache_path)
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.rng = random.Random(seed)
+        self.history = []
+
+    def evaluate(self, candidates, n_rounds):
+        """Scores of `candidates` at `n_rounds`, training only uncached ones."""
+        keys = [param_key(c, n_rounds, self.fingerprint) for c in candidates]
+        todo = {}
+        for key, params in zip(keys, candidates):
+            if key in self.cache.scores:
+                self.cache.hits += 1
+            elif key not in todo:
+                self.cache.misses += 1
+                todo[key] = params
+        if todo:
+            tasks = [(params, n_rounds) for params in todo.values()]
+            if self.n_jobs == 1 or len(tasks) == 1:
+                _init_worker(self.data)
+                results = [_cv_score(task) for task in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=min(self.n_jobs, len(tasks)),
+                                         initializer=_init_worker, initargs=(self.data,)) as pool:
+                    results = list(pool.map(_cv_score, tasks))
+            for key, (score, rounds) in zip(todo, results):
+                self.cache.scores[key] = {'score': score, 'rounds': rounds}
+            self.cache.save()
+        scores = [self.cache.scores[key] for key in keys]
+        for params, entry in zip(candidates, scores):
+            self.history.append({**params, 'n_rounds': n_rounds, **entry})
+        return scores
+
+    def sample(self):
+        return {name: self.rng.choice(values) for name, values in SEARCH_SPACE.items()}
+
+    def best(self):
+        """
+        Best configuration evaluated at the largest budget (boosting rounds),
+        as training parameters, and its score. Scores from the short rungs of
+        successive halving are noisier and are not ranked against it.
+        """
+        final = max(h['n_rounds'] for h in self.history)
+        top = max((h for h in self.history if h['n_rounds'] == final), key=lambda h: h['score'])
+        params = {name: top[name] for name in SEARCH_SPACE}
+        params['n_estimators'] = top['rounds']
+        return {**params, **FIXED_PARAMS}, top['score']
+
+
+def genetic_search(searcher, population=16, generations=6, n_rounds=300,
+                   mutation_rate=0.2, elite=2, tournament=3):
+    """Genetic algorithm over `SEARCH_SPACE` (tournament selection, uniform crossover)."""
+    rng = searcher.rng
+    pop = [searcher.sample() for _ in range(population)]
+    for _ in range(generations):
+        scores = [s['score'] for s in searcher.evaluate(pop, n_rounds)]
+        ranked = [p for _, p in sorted(zip(scores, pop), key=lambda t: -t[0])]
+        children = ranked[:elite]
+        while len(children) < population:
+            parents = [max(rng.sample(list(zip(scores, pop)), tournament), key=lambda t: t[0])[1]
+                       for _ in range(2)]
+            child = {name: rng.choice(parents)[name] for name in SEARCH_SPACE}
+            for name, values in SEARCH_SPACE.items():
+                if rng.random() < mutation_rate:
+                    child[name] = rng.choice(values)
+            children.append(child)
+        pop = children
+    searcher.evaluate(pop, n_rounds)
+    return searcher.best()
+
+
+def successive_halving(searcher, n_candidates=27, min_rounds=25, max_rounds=400, eta=3,
+                       candidates=None):
+    """
+    Evaluate many candidates with few boosting rounds, keep the best 1/eta
+    and multiply their rounds by eta until `max_rounds`.
+    """
+    candidates = candidates or [searcher.sample() for _ in range(n_candidates)]
+    n_rounds = min_rounds
+    while True:
+        scores = [s['score'] for s in searcher.evaluate(candidates, n_rounds)]
+        if n_rounds >= max_rounds or len(candidates) == 1:
+            break
+        keep = max(1, len(candidates) // eta)
+        order = np.argsort(scores)[::-1][:keep]
+        candidates = [candidates[i] for i in order]
+        n_rounds = min(n_rounds * eta, max_rounds)
+    return searcher.best()
+
+
+def hyperband(searcher, max_rounds=400, eta=3):
+    """Hyperband: successive halving brackets trading candidates for rounds."""
+    s_max = int(np.log(max_rounds) / np.log(eta) + 1e-9)
+    for s in range(s_max, -1, -1):
+        n = int(np.ceil((s_max + 1) / (s + 1) * eta ** s))
+        min_rounds = max(1, int(max_rounds * eta ** -s))
+        successive_halving(searcher, n_candidates=n, min_rounds=min_rounds,
+                           max_rounds=max_rounds, eta=eta)
+    return searcher.best()
+
+
+def grid_search(searcher, n_rounds=300, space=SEARCH_SPACE):
+    """Exhaustive grid (reference for the faster strategies)."""
+    names = list(space)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*space.values())]
+    searcher.evaluate(candidates, n_rounds)
+    return searcher.best()
+
+
+METHODS = {
+    'ga': genetic_search,
+    'halving': successive_halving,
+    'hyperband': hyperband,
+    'grid': grid_search,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XGBoost hyperparameter search")
+    parser.add_argument('--method', choices=sorted(METHODS), default='halving')
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--splits', type=int, default=3, help="time-series CV folds")
+    parser.add_argument('--cache', default=CACHE_PATH)
+    parser.add_argument('--output', default=BEST_PARAMS_PATH)
+    args = parser.parse_args()
+
+    df = load_dataset()
+    if df is None:
+        print("Data not found!")
+        return
+
+    start = time.perf_counter()
+    searcher = Searcher(df, n_splits=args.splits, n_jobs=args.jobs, cache_path=args.cache)
+    params, score = METHODS[args.method](searcher)
+    elapsed = time.perf_counter() - start
+    save_best_params(params, path=args.output, score=score, method=args.method)
+    print(f"Best CV AUC {score:.4f} with {params}")
+    print(f"{len(searcher.history)} evaluations ({searcher.cache.misses} trained, "
+          f"{searcher.cache.hits} from cache) in {elapsed:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
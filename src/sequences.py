@@ -0,0 +1,176 @@
+"""
+Sliding-window sequence datasets for the sequence models (LSTM, GRU with
+attention, CNN-LSTM) trained on the `features.csv` feature set.
+
+The feature matrix is stored once, ticker by ticker and in date order, as
+a float32 `.npy` file that is memory-mapped on open. The (samples x lookback
+x features) tensor is a strided view of that matrix (each window shares its
+rows with the next one), so it costs no memory whatever the lookback; only
+the rows of the current batch are gathered. Windows never cross a ticker
+boundary, and train/test splits are made on the date of the last row of
+each window, with a purge gap of `purge` dates so no training label
+overlaps the test period.
+
+    python -m src.sequences build --lookback 60
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .train_model import DATA_PATH, FEATURES, TARGET, load_dataset
+from .walk_forward import make_folds
+
+SEQUENCE_DIR = os.path.join('data', 'sequences')
+
+
+def _ticker_order(df):
+    """Row order grouping tickers (in sorted order), dates ascending, and the ticker names."""
+    if 'Ticker' not in df.columns:
+        return np.argsort(df.index.to_numpy(), kind='stable'), [None], np.array([len(df)])
+    codes, tickers = pd.factorize(df['Ticker'], sort=True)
+    order = np.lexsort((df.index.to_numpy(), codes))
+    return order, [str(t) for t in tickers], np.bincount(codes, minlength=len(tickers))
+
+
+def write_matrix(df, path=SEQUENCE_DIR, features=FEATURES, target=TARGET):
+    """
+    Store the features of `df` (date index, optional `Ticker` column) as
+    memory-mappable arrays in the directory `path`. Columns are copied one
+    at a time, so memory stays at one column above the frame.
+    """
+    os.makedirs(path, exist_ok=True)
+    order, tickers, counts = _ticker_order(df)
+    matrix = np.lib.format.open_memmap(os.path.join(path, 'features.npy'), mode='w+',
+                                       dtype=np.float32, shape=(len(df), len(features)))
+    for j, column in enumerate(features):
+        matrix[:, j] = df[column].to_numpy(dtype=np.float32)[order]
+    matrix.flush()
+    del matrix
+    np.save(os.path.join(path, 'target.npy'), df[target].to_numpy()[order])
+    np.save(os.path.join(path, 'dates.npy'), df.index.to_numpy(dtype='datetime64[ns]')[order])
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'features': list(features), 'target': target,
+                   'tickers': tickers, 'counts': counts.tolist()}, f, indent=2)
+    return path
+
+
+class SequenceDataset:
+    """
+    Windows of `lookback` consecutive rows of one ticker, labelled with the
+    target of their last row. Samples are numbered ticker by ticker in date
+    order; `batches()` yields (X, y) with X of shape (batch, lookback, features).
+    """
+
+    def __init__(self, matrix, target, dates, counts, lookback, features=None, tickers=None):
+        if lookback < 1:
+            raise ValueError("lookback must be at least 1")
+        self.matrix, self.target, self.dates = matrix, target, dates
+        self.lookback = lookback
+        self.features = list(features) if features is not None else None
+        self.tickers = list(tickers) if tickers is not None else None
+        counts = np.asarray(counts, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        per_ticker = np.maximum(counts - lookback + 1, 0)
+        self.sample_offsets = np.concatenate([[0], np.cumsum(per_ticker)])
+        self.windows = np.lib.stride_tricks.sliding_window_view(matrix, lookback, axis=0).transpose(0, 2, 1) \
+            if len(matrix) >= lookback else np.empty((0, lookback, matrix.shape[1]), dtype=matrix.dtype)
+
+    @classmethod
+    def open(cls, lookback, path=SEQUENCE_DIR, mmap_mode='r'):
+        """Dataset over the arrays written by `write_matrix`, memory-mapped."""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+        return cls(load('features'), load('target'), load('dates'), meta['counts'], lookback,
+                   features=meta['features'], tickers=meta['tickers'])
+
+    @classmethod
+    def from_frame(cls, df, lookback, features=FEATURES, target=TARGET):
+        """In-memory dataset built from a feature frame (one float32 copy of the features)."""
+        order, tickers, counts = _ticker_order(df)
+        matrix = np.empty((len(df), len(features)), dtype=np.float32)
+        for j, column in enumerate(features):
+            matrix[:, j] = df[column].to_numpy(dtype=np.float32)[order]
+        return cls(matrix, df[target].to_numpy()[order], df.index.to_numpy(dtype='datetime64[ns]')[order],
+                   counts, lookback, features=features, tickers=tickers)
+
+    def __len__(self):
+        return int(self.sample_offsets[-1])
+
+    def end_rows(self, samples):
+        """Matrix row of the last step of each sample."""
+        samples = np.asarray(samples, dtype=np.int64)
+        ticker = np.searchsorted(self.sample_offsets, samples, side='right') - 1
+        return self.offsets[ticker] + self.lookback - 1 + (samples - self.sample_offsets[ticker])
+
+    def sample_dates(self, samples=None):
+        samples = np.arange(len(self)) if samples is None else samples
+        return self.dates[self.end_rows(samples)]
+
+    def get(self, samples):
+        """(X, y) for the given samples; X is a copy of shape (len(samples), lookback, features)."""
+        rows = self.end_rows(samples)
+        return self.windows[rows - (self.lookback - 1)], np.asarray(self.target[rows])
+
+    def batches(self, samples=None, batch_size=256, shuffle=False, seed=None, drop_last=False):
+        """Iterate over (X, y) batches of `samples` (default: all), optionally shuffled."""
+        samples = np.arange(len(self)) if samples is None else np.asarray(samples)
+        if shuffle:
+            samples = np.random.default_rng(seed).permutation(samples)
+        stop = len(samples) - len(samples) % batch_size if drop_last else len(samples)
+        for start in range(0, stop, batch_size):
+            yield self.get(samples[start:start + batch_size])
+
+    def split(self, test_start, test_end=None, purge=1):
+        """
+        Train and test samples around the date range [test_start, test_end):
+        training windows end before it, minus the last `purge` dates.
+        """
+        dates, positions = np.unique(self.sample_dates(), return_inverse=True)
+        first = np.searchsorted(dates, np.datetime64(pd.Timestamp(test_start), 'ns'))
+        last = len(dates) if test_end is None else \
+            np.searchsorted(dates, np.datetime64(pd.Timestamp(test_end), 'ns'))
+        return (np.flatnonzero(positions < first - purge),
+                np.flatnonzero((positions >= first) & (positions < last)))
+
+    def folds(self, n_folds=5, window='expanding', train_size=None, test_size=None, purge=1):
+        """Walk-forward (train, test) samples, with the fold layout of `make_folds`."""
+        dates, positions = np.unique(self.sample_dates(), return_inverse=True)
+        return [(np.flatnonzero((positions >= a) & (positions < b)),
+                 np.flatnonzero((positions >= c) & (positions < d)))
+                for a, b, c, d in make_folds(len(dates), n_folds, window, train_size, test_size, purge)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sliding-window sequence datasets")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="write the memory-mapped feature matrix")
+    build.add_argument('--data', default=DATA_PATH, help="processed features (.csv or .parquet)")
+    build.add_argument('--output', default=SEQUENCE_DIR)
+    build.add_argument('--lookback', type=int, default=60, help="window length for the summary")
+    build.add_argument('--batch-size', type=int, default=256)
+    args = parser.parse_args()
+
+    df = load_dataset(args.data)
+    if df is None:
+        print("Data not found!")
+        return
+    write_matrix(df, args.output)
+    del df
+    dataset = SequenceDataset.open(args.lookback, args.output)
+    start, n = time.perf_counter(), 0
+    for X, _ in dataset.batches(batch_size=args.batch_size, shuffle=True, seed=0):
+        n += len(X)
+    seconds = time.perf_counter() - start
+    print(f"{dataset.matrix.shape[0]:,} rows x {dataset.matrix.shape[1]} features "
+          f"({dataset.matrix.nbytes / 1e6:.0f} MB) -> {args.output}")
+    print(f"{len(dataset):,} windows of {args.lookback} rows, {len(dataset.tickers)} tickers; "
+          f"one shuffled epoch in {seconds:.1f}s ({n / seconds:,.0f} windows/s)")
+
+
+if __name__ == "__main__":
+    main()
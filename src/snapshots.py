@@ -0,0 +1,324 @@
+"""
+Precomputed dashboard snapshots.
+
+After the close, `python -m src.snapshots build` runs the dashboard's whole
+chain (bars, indicators, macro join, predictions, contributions, backtest
+and strategy sweep) for every (ticker, period) pair and stores the results
+the tabs display:
+
+    data/snapshots/AAPL/1y/snapshot.json      signal, backtest summary, model version
+    data/snapshots/AAPL/1y/indicators.parquet bars and indicator series
+    data/snapshots/AAPL/1y/signals.parquet    probability and contributions per row
+    data/snapshots/AAPL/1y/backtest.parquet   strategy and cumulative returns
+    data/snapshots/AAPL/1y/sweep.parquet      strategy parameter sweep
+
+The dashboard reads the snapshot first and only computes live when it is
+missing, does not include the last completed trading session or was made
+with another model version. All prices are refreshed in one concurrent
+pass, then tickers are processed in parallel (one shared feature store and
+model); the bars of a ticker are read once and sliced per period.
+
+    python -m src.snapshots build --periods 1y 5y --workers 8
+    python -m src.snapshots list
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import pandas as pd
+from pandas.tseries.holiday import USFederalHolidayCalendar
+from pandas.tseries.offsets import CustomBusinessDay
+
+from . import registry
+from .downloader import EXCHANGE_TZ
+from .store import period_start
+
+SNAPSHOT_DIR = os.path.join('data', 'snapshots')
+META_FILE = 'snapshot.json'
+FRAMES = ('indicators', 'signals', 'backtest', 'sweep')
+# Periods offered by the dashboard, shortest first
+PERIODS = ['1mo', '3mo', '6mo', '1y', '2y', '5y', 'max']
+# Regular session of the exchanges the universe trades on (`EXCHANGE_TZ`);
+# sessions are the weekdays outside US federal holidays (close enough to the
+# NYSE calendar: a missed holiday only makes a snapshot look stale for that day)
+SESSION_CLOSE = pd.Timedelta(hours=16)
+SESSIONS = CustomBusinessDay(calendar=USFederalHolidayCalendar())
+
+INDICATOR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'RSI', 'MACD', 'MACD_Signal',
+                     'BB_Upper', 'BB_Lower', 'ATR', 'Log_Return']
+BACKTEST_COLUMNS = ['Log_Return', 'Signal', 'Strategy_Return', 'Cumulative_Market', 'Cumulative_Strategy']
+
+
+class Snapshot:
+    """Precomputed results of one (ticker, period) pair."""
+
+    def __init__(self, meta, indicators, signals=None, backtest=None, sweep=None):
+        self.meta = meta
+        self.indicators = indicators
+        self.signals = signals
+        self.backtest = backtest
+        self.sweep = sweep
+
+    @property
+    def created(self):
+        return pd.Timestamp(self.meta['created'])
+
+    @property
+    def model_version(self):
+        return (self.meta.get('model') or {}).get('version')
+
+    @property
+    def missing_features(self):
+        return list(self.meta.get('missing_features', []))
+
+    @property
+    def probabilities(self):
+        return None if self.signals is None else self.signals['Probability']
+
+    @property
+    def contributions(self):
+        return None if self.signals is None else self.signals.drop(columns='Probability')
+
+    def is_fresh(self, model_version=None, now=None):
+        """Includes the last completed session at `now` and, when given, made with `model_version`."""
+        last = self.meta.get('last_date')
+        if last is None or pd.Timestamp(last).normalize() < last_session(now):
+            return False
+        return model_version is None or self.model_version == model_version
+
+    def __repr__(self):
+        return f"Snapshot({self.meta['ticker']!r}, {self.meta['period']!r}, created={self.meta['created']})"
+
+
+def last_session(now=None):
+    """Date of the last trading session closed at `now` (default: the current time)."""
+    now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+    local = (now if now.tz is not None else now.tz_localize('UTC')).tz_convert(EXCHANGE_TZ).tz_localize(None)
+    day = local.normalize()
+    if local - day < SESSION_CLOSE:
+        day -= pd.Timedelta(days=1)
+    return SESSIONS.rollback(day)
+
+
+def period_bars(history, period, last=None):
+    """
+    Bars of `period` from a longer `history`, starting where a fetch of that
+    period would (counted back from `last`, the last stored bar, by default
+    the last bar of `history`).
+    """
+    start = period_start(history.index[-1] if last is None else last, period)
+    return history if start is None else history[history.index >= start]
+
+
+def snapshot_dir(ticker, period, root=SNAPSHOT_DIR):
+    return os.path.join(root, ticker, period)
+
+
+def compute_snapshot(ticker, period, data, macro, model, feature_store=None):
+    """Run the dashboard chain on `data` (bars of one period) and keep what the tabs show."""
+    from .processor import (explain_predictions, predict_probabilities, prepare_features_for_prediction,
+                            run_backtest, run_strategy_sweep)
+    from .feature_store import FeatureStore
+
+    feature_store = feature_store or FeatureStore()
+    df = feature_store.get(ticker, data)
+    feature_names = model.features
+    full_df = prepare_features_for_prediction(df, macro)
+    missing = [f for f in feature_names if f not in full_df.columns]
+    meta = {
+        'ticker': ticker,
+        'period': period,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'model': {'name': model.name, 'version': model.version},
+        'rows': int(len(df)),
+        'last_date': pd.Timestamp(df.index[-1]).isoformat() if len(df) else None,
+        'missing_features': missing,
+    }
+    snapshot = Snapshot(meta, df[[c for c in INDICATOR_COLUMNS if c in df.columns]])
+    if full_df.empty or missing:
+        return snapshot
+
+    probabilities = predict_probabilities(full_df, model, feature_names)
+    contributions = explain_predictions(full_df, model, feature_names)
+    snapshot.signals = contributions.assign(Probability=probabilities.to_numpy(dtype='float32'))
+    results = run_backtest(full_df, model, feature_names, probabilities)
+    snapshot.backtest = results[BACKTEST_COLUMNS]
+    snapshot.sweep = run_strategy_sweep(full_df, probabilities)
+
+    prob_up = float(probabilities.iloc[-1])
+    final_market = float(results['Cumulative_Market'].iloc[-2])
+    final_strategy = float(results['Cumulative_Strategy'].iloc[-2])
+    meta['signal'] = {'date': pd.Timestamp(full_df.index[-1]).isoformat(), 'probability': prob_up,
+                      'direction': int(prob_up > 0.5), 'confidence': max(prob_up, 1 - prob_up)}
+    meta['backtest'] = {'market_return': final_market - 1, 'strategy_return': final_strategy - 1,
+                        'outperformance': final_strategy - final_market}
+    return snapshot
+
+
+def write_snapshot(snapshot, root=SNAPSHOT_DIR):
+    """
+    Write a snapshot in place of the previous one. Files are written to a
+    temporary directory first, so a reader sees the old or the new snapshot
+    (or briefly none, and computes live), never a mix.
+    """
+    final = snapshot_dir(snapshot.meta['ticker'], snapshot.meta['period'], root)
+    parent = os.path.dirname(final)
+    os.makedirs(parent, exist_ok=True)
+    tmp = os.path.join(parent, f'.{snapshot.meta["period"]}.{os.getpid()}.{time.monotonic_ns()}.tmp')
+    os.makedirs(tmp)
+    for name in FRAMES:
+        frame = getattr(snapshot, name)
+        if frame is not None:
+            frame.to_parquet(os.path.join(tmp, f'{name}.parquet'))
+    with open(os.path.join(tmp, META_FILE), 'w') as f:
+        json.dump(snapshot.meta, f, indent=2)
+    old = None
+    if os.path.exists(final):
+        old = tmp + '.old'
+        os.rename(final, old)
+    os.rename(tmp, final)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+    return final
+
+
+def load_meta(ticker, period, root=SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir(ticker, period, root), META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_snapshot(ticker, period, root=SNAPSHOT_DIR):
+    """The stored snapshot of (ticker, period), or None."""
+    path = snapshot_dir(ticker, period, root)
+    try:
+        meta = load_meta(ticker, period, root)
+        if meta is None:
+            return None
+        frames = {name: pd.read_parquet(os.path.join(path, f'{name}.parquet'))
+                  for name in FRAMES if os.path.exists(os.path.join(path, f'{name}.parquet'))}
+    except (OSError, ValueError):
+        # Replaced while being read
+        return None
+    if 'indicators' not in frames:
+        return None
+    return Snapshot(meta, **frames)
+
+
+def build_ticker(ticker, periods, macro, model, feature_store, root=SNAPSHOT_DIR):
+    """
+    Snapshots of every period of `ticker` (prices already refreshed), from
+    one read of its longest period. Returns one status row per period.
+    """
+    from .data_loader import fetch_stock_data, get_downloader
+
+    history = fetch_stock_data(ticker, period=max(periods, key=PERIODS.index), refresh=False)
+    if history is None or history.empty:
+        return [{'ticker': ticker, 'period': period, 'status': 'no data'} for period in periods]
+    # Periods are counted back from the last stored bar, not the live one
+    last = get_downloader().store.last_timestamp(ticker)
+    # The feature store keeps one history per ticker: materialize the
+    # longest first so every period is a warm slice of it
+    feature_store.get(ticker, period_bars(history, max(periods, key=PERIODS.index), last))
+    rows = []
+    for period in periods:
+        started = time.perf_counter()
+        data = period_bars(history, period, last)
+        snapshot = compute_snapshot(ticker, period, data, macro[period], model, feature_store)
+        write_snapshot(snapshot, root)
+        signal = snapshot.meta.get('signal') or {}
+        rows.append({'ticker': ticker, 'period': period,
+                     'status': 'ok' if snapshot.signals is not None else 'no signal',
+                     'rows': snapshot.meta['rows'], 'probability': signal.get('probability'),
+                     'seconds': time.perf_counter() - started})
+    return rows
+
+
+def build(tickers, periods=PERIODS, workers=8, root=SNAPSHOT_DIR):
+    """
+    Refresh the prices of `tickers` and the macro series in one concurrent
+    pass, then build the snapshots of every ticker in a thread pool.
+    Returns a status frame (one row per ticker and period).
+    """
+    from .data_loader import fetch_macro_data, get_downloader
+    from .feature_store import FeatureStore
+    from .panel import MACRO_SYMBOLS
+
+    model = registry.get_model()
+    if model is None:
+        raise RuntimeError("No registered model: train one first (python -m src.train_model)")
+    longest = max(periods, key=PERIODS.index)
+    downloader = get_downloader()
+    try:
+        _, errors = downloader.refresh(list(tickers) + list(MACRO_SYMBOLS.values()), period=longest)
+        for symbol, error in errors.items():
+            print(f"Online fetch failed for {symbol}: {error}")
+    except Exception as e:
+        print(f"Online refresh failed: {e}")
+    macro = {period: fetch_macro_data(period=period, refresh=False) for period in periods}
+    feature_store = FeatureStore()
+
+    rows = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers)))) as pool:
+        futures = {pool.submit(build_ticker, ticker, periods, macro, model, feature_store, root): ticker
+                   for ticker in tickers}
+        for future in as_completed(futures):
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                rows.append({'ticker': futures[future], 'status': f'failed: {e}'})
+    return pd.DataFrame(rows)
+
+
+def list_snapshots(root=SNAPSHOT_DIR):
+    """Summary of the stored snapshots (one row per ticker and period)."""
+    rows = []
+    latest = registry.latest_version()
+    now = pd.Timestamp.now(tz='UTC')
+    for ticker in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        for period in PERIODS:
+            meta = load_meta(ticker, period, root)
+            if meta is None:
+                continue
+            snapshot = Snapshot(meta, None)
+            signal = meta.get('signal') or {}
+            rows.append({'ticker': ticker, 'period': period, 'created': meta['created'],
+                         'model_version': snapshot.model_version,
+                         'fresh': snapshot.is_fresh(latest, now=now),
+                         'last_date': meta['last_date'], 'probability': signal.get('probability'),
+                         **(meta.get('backtest') or {})})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed dashboard snapshots")
+    parser.add_argument('--root', default=SNAPSHOT_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('build', help="compute the snapshots (e.g. nightly, after the close)")
+    run.add_argument('tickers', nargs='*', help="tickers (default: the dashboard's universe)")
+    run.add_argument('--periods', nargs='+', default=PERIODS, choices=PERIODS)
+    run.add_argument('--workers', type=int, default=8, help="tickers processed in parallel")
+    sub.add_parser('list', help="list the stored snapshots")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        summary = list_snapshots(args.root)
+        print(summary.to_string(index=False) if not summary.empty else f"No snapshot under {args.root}")
+        return
+
+    from .data_loader import get_universe
+    tickers = args.tickers or get_universe()
+    started = time.perf_counter()
+    status = build(tickers, args.periods, workers=args.workers, root=args.root)
+    print(status.to_string(index=False))
+    print(f"{len(tickers)} tickers x {len(args.periods)} periods in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Local columnar market-data store.
+
+Bars are kept as Parquet files partitioned by ticker and year:
+
+    data/store/<TICKER>/<YEAR>/part-<first timestamp>-<random>.parquet
+
+Ingestion is append-only: new bars (strictly after the last stored timestamp
+of a ticker) are written as a new part file, existing files are never
+rewritten. Part names sort in time order and are unique, so concurrent
+writers never pick the same file; appends to one ticker are serialized
+within a process. `replace` writes a whole new history to a version
+directory (`<TICKER>/v-<random>/<YEAR>/...`) and switches the ticker's
+`CURRENT` pointer file to it with one atomic rename; the previous version
+is kept until the next replace, and a read that still hits a removed file
+starts over from the new pointer. Reads only open the partitions of the
+requested ticker and years and push the column projection and the date
+filter down to Parquet.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DEFAULT_ROOT = os.path.join('data', 'store')
+MACRO_TICKER = '_MACRO'
+DATE_COLUMN = 'Date'
+POINTER_FILE = 'CURRENT'
+READ_ATTEMPTS = 3
+
+PERIOD_OFFSETS = {
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6)
+}
+
+
+def period_start(last_date, period):
+    """
+    Start date of a yfinance-style period ending at `last_date`
+    (None for "max" or an unknown period).
+    """
+    offset = PERIOD_OFFSETS.get(period)
+    if last_date is None or offset is None:
+        return None
+    return last_date - offset
+
+
+_ticker_locks = {}
+_ticker_locks_guard = threading.Lock()
+
+
+def _ticker_lock(path):
+    """Lock serializing the writes to one ticker directory within the process."""
+    with _ticker_locks_guard:
+        return _ticker_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class MarketStore:
+    """Partitioned Parquet store of OHLCV / feature bars."""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self._last = {}
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.root, ticker)
+
+    def _version(self, ticker):
+        """Current version directory name of `ticker` (None: bars directly under the ticker directory)."""
+        try:
+            with open(os.path.join(self._ticker_dir(ticker), POINTER_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _data_dir(self, ticker):
+        version = self._version(ticker)
+        return self._ticker_dir(ticker) if version is None else os.path.join(self._ticker_dir(ticker), version)
+
+    @staticmethod
+    def _consistent(read):
+        """Run `read` again when a concurrent `replace` removed a file it had listed."""
+        for attempt in range(READ_ATTEMPTS):
+            try:
+                return read()
+            except FileNotFoundError:
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+
+    def tickers(self):
+        """Tickers with at least one partition (the macro pseudo-ticker excluded)."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if not name.startswith('_') and os.path.isdir(self._ticker_dir(name)))
+
+    def years(self, ticker):
+        if not os.path.isdir(self._ticker_dir(ticker)):
+            return []
+        # A version directory removed since the pointer was read raises,
+        # so the caller retries instead of seeing an empty history
+        return sorted(int(name) for name in os.listdir(self._data_dir(ticker)) if name.isdigit())
+
+    def _parts(self, ticker, year):
+        path = os.path.join(self._data_dir(ticker), str(year))
+        return sorted(os.path.join(path, name) for name in os.listdir(path)
+                      if name.endswith('.parquet'))
+
+    def last_timestamp(self, ticker):
+        """Last stored timestamp of `ticker` (None if empty); reads one column of one file."""
+        if ticker not in self._last:
+            self._last[ticker] = self._consistent(lambda: self._edge_timestamp(ticker, last=True))
+        return self._last[ticker]
+
+    def first_timestamp(self, ticker):
+        """First stored timestamp of `ticker` (None if empty)."""
+        return self._consistent(lambda: self._edge_timestamp(ticker, last=False))
+
+    def _edge_timestamp(self, ticker, last):
+        years = self.years(ticker)
+        if not years:
+            return None
+        parts = self._parts(ticker, years[-1] if last else years[0])
+        if not parts:
+            return None
+        dates = pq.read_table(parts[-1] if last else parts[0], columns=[DATE_COLUMN]).column(0)
+        return pd.Timestamp((pc.max(dates) if last else pc.min(dates)).as_py())
+
+    def drop(self, ticker):
+        """Delete every partition of `ticker`."""
+        with _ticker_lock(self._ticker_dir(ticker)):
+            shutil.rmtree(self._ticker_dir(ticker), ignore_errors=True)
+            self._last.pop(ticker, None)
+
+    @staticmethod
+    def _prepare(df):
+        df = df.sort_index()
+        if df.index.tz is not None:
+            df = df.tz_localize(None)
+        return df
+
+    @staticmethod
+    def _write_parts(directory, df):
+        """Write `df` as one new part file per year under `directory`."""
+        frame = df.copy()
+        frame.index = frame.index.rename(DATE_COLUMN)
+        frame = frame.reset_index()
+        for year, rows in frame.groupby(frame[DATE_COLUMN].dt.year, sort=True):
+            path = os.path.join(directory, str(year))
+            os.makedirs(path, exist_ok=True)
+            # Named after the first bar (parts sort in time order) plus a
+            # random suffix, so two writers never pick the same name.
+            first = rows[DATE_COLUMN].iloc[0]
+            part = os.path.join(path, f'part-{first:%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}.parquet')
+            # Write to a temporary name first so readers never see half a file.
+            tmp = part + '.tmp'
+            pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), tmp)
+            os.replace(tmp, part)
+
+    def append(self, ticker, df):
+        """
+        Append the bars of `df` (DatetimeIndex) that are newer than what is
+        stored. Returns the number of rows written.
+        """
+        if df is None or df.empty:
+            return 0
+        df = self._prepare(df)
+        with _ticker_lock(self._ticker_dir(ticker)):
+            last = self.last_timestamp(ticker)
+            if last is not None:
+                df = df[df.index > last]
+            if df.empty:
+                return 0
+            self._write_parts(self._data_dir(ticker), df)
+            self._last[ticker] = df.index.max()
+        return len(df)
+
+    def replace(self, ticker, df):
+        """
+        Replace the whole history of `ticker` by `df` (e.g. after a split
+        re-adjusted every past price). The new parts are written to a new
+        version directory and the `CURRENT` pointer is switched to it with
+        one atomic rename, so readers see the old or the new history, never
+        a partial one. Returns the number of rows written.
+        """
+        if df is None or df.empty:
+            return 0
+        df = self._prepare(df)
+        directory = self._ticker_dir(ticker)
+        version = f'v-{uuid.uuid4().hex[:8]}'
+        self._write_parts(os.path.join(directory, version), df)
+        with _ticker_lock(directory):
+            previous = self._version(ticker)
+            pointer = os.path.join(directory, POINTER_FILE)
+            tmp = f'{pointer}.{version}.tmp'
+            with open(tmp, 'w') as f:
+                f.write(version)
+            os.replace(tmp, pointer)
+            self._last[ticker] = df.index.max()
+            # The version just replaced stays for readers that listed its
+            # files; older ones (and the unversioned layout) are removed
+            for name in os.listdir(directory):
+                stale = (name.startswith('v-') and name not in (version, previous)
+                         or previous is not None and name.isdigit())
+                if stale:
+                    shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        return len(df)
+
+    def read(self, ticker, start=None, end=None, columns=None):
+        """
+        Load the bars of `ticker` between `start` and `end` (inclusive).
+        Only the partitions overlapping the range and the requested
+        `columns` are read. Returns an empty frame if nothing matches.
+        """
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        return self._consistent(lambda: self._read(ticker, start, end, columns))
+
+    def _read(self, ticker, start, end, columns):
+        files = []
+        for year in self.years(ticker):
+            if start is not None and year < start.year:
+                continue
+            if end is not None and year > end.year:
+                continue
+            files.extend(self._parts(ticker, year))
+        if not files:
+            return pd.DataFrame(columns=columns or []).rename_axis(DATE_COLUMN)
+
+        dataset = ds.dataset(files, format='parquet')
+        names = dataset.schema.names
+        if columns is not None:
+            columns = [DATE_COLUMN] + [c for c in columns if c in names and c != DATE_COLUMN]
+        condition = None
+        if start is not None:
+            condition = ds.field(DATE_COLUMN) >= pa.scalar(start.to_pydatetime(), pa.timestamp('ns'))
+        if end is not None:
+            upper = ds.field(DATE_COLUMN) <= pa.scalar(end.to_pydatetime(), pa.timestamp('ns'))
+            condition = upper if condition is None else condition & upper
+        table = dataset.to_table(columns=columns, filter=condition)
+        return table.to_pandas().set_index(DATE_COLUMN).sort_index()
+
+    def iter_chunks(self, ticker, chunk_rows=1_000_000, columns=None):
+        """
+        Stream the bars of `ticker` in time order as frames of `chunk_rows`
+        rows (the last one shorter). Part files are read batch by batch, so
+        memory depends on the chunk size, not on the length of the history.
+        The files are those of the version current when iteration starts.
+        """
+        files = self._consistent(lambda: [path for year in self.years(ticker) for path in self._parts(ticker, year)])
+        pending, size = [], 0
+        for path in files:
+            parquet = pq.ParquetFile(path)
+            names = parquet.schema_arrow.names
+            wanted = None if columns is None else [DATE_COLUMN] + [c for c in columns if c in names]
+            for batch in parquet.iter_batches(batch_size=chunk_rows, columns=wanted):
+                pending.append(batch.to_pandas().set_index(DATE_COLUMN))
+                size += batch.num_rows
+                while size >= chunk_rows:
+                    frame = pd.concat(pending) if len(pending) > 1 else pending[0]
+                    chunk, rest = frame.iloc[:chunk_rows], frame.iloc[chunk_rows:]
+                    yield chunk if columns is None else chunk.reindex(columns=columns)
+                    pending, size = ([rest] if len(rest) else []), len(rest)
+        if size:
+            frame = pd.concat(pending)
+            yield frame if columns is None else frame.reindex(columns=columns)
+
+    def ingest_frame(self, df, ticker_column='Ticker', macro_columns=('VIX', 'TNX'), replace=False):
+        """
+        Split a long frame (one row per date and ticker) into the store.
+        Macro columns are also stored once per date under `MACRO_TICKER`.
+        With `replace`, the history of every ticker in `df` is replaced
+        instead of extended with its newer rows.
+        """
+        write = self.replace if replace else self.append
+        written = 0
+        if ticker_column in df.columns:
+            for ticker, rows in df.groupby(ticker_column, sort=False):
+                written += write(str(ticker), rows.drop(columns=[ticker_column]))
+        macro = [c for c in macro_columns if c in df.columns]
+        if macro:
+            macro_df = df[macro][~df.index.duplicated(keep='first')]
+            written += write(MACRO_TICKER, macro_df)
+        return written
+
+    def _sources_path(self):
+        return os.path.join(self.root, '_sources.json')
+
+    def sync_csv(self, csv_path, **kwargs):
+        """
+        Ingest `csv_path` if it changed since the last sync (tracked by mtime
+        and size), so the CSV is parsed once instead of on every read. A
+        changed file may revise past rows, so the tickers it holds are
+        rewritten with `replace`.
+        """
+        if not os.path.exists(csv_path):
+            return 0
+        sources = {}
+        if os.path.exists(self._sources_path()):
+            with open(self._sources_path()) as f:
+                sources = json.load(f)
+        stat = os.stat(csv_path)
+        signature = [stat.st_mtime, stat.st_size]
+        key = os.path.abspath(csv_path)
+        if sources.get(key) == signature:
+            return 0
+        df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        written = self.ingest_frame(df, replace=True, **kwargs)
+        sources[key] = signature
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._sources_path(), 'w') as f:
+            json.dump(sources, f)
+        return written
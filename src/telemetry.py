@@ -0,0 +1,203 @@
+"""
+Lightweight timing spans and counters.
+
+    from src import telemetry
+    telemetry.enable()
+    with telemetry.span('fetch', ticker='AAPL'):
+        ...
+    telemetry.count('rows', len(df))
+    telemetry.write_chrome_trace('trace.json')   # chrome://tracing, Perfetto
+    print(telemetry.prometheus_text())
+
+Recording is off unless `enable()` is called or the `TELEMETRY`
+environment variable is set; `enable_thread()` overrides that flag for the
+calling thread only (e.g. one Streamlit session's script run), so a session
+turning its debug panel on or off does not affect the others. A disabled
+`span()` returns a shared no-op context manager, so instrumented code pays
+one flag check per stage.
+Spans and counter increments are kept in bounded buffers with their
+thread, so concurrent callers (e.g. Streamlit sessions) can select their
+own records and counts.
+"""
+import contextlib
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+MAX_SPANS = 100_000
+
+_enabled = os.environ.get('TELEMETRY', '') not in ('', '0')
+_spans = deque(maxlen=MAX_SPANS)
+_counters = {}
+_counts = deque(maxlen=MAX_SPANS)
+_lock = threading.Lock()
+_local = threading.local()
+_NOOP = contextlib.nullcontext()
+_EPOCH = time.perf_counter()
+
+
+def enable(on=True):
+    """Turn recording on or off for the whole process."""
+    global _enabled
+    _enabled = bool(on)
+
+
+def enable_thread(on=True):
+    """
+    Turn recording on or off for the calling thread, whatever the
+    process-wide flag (None: follow the process-wide flag again).
+    """
+    if on is None:
+        _local.__dict__.pop('enabled', None)
+    else:
+        _local.enabled = bool(on)
+
+
+def is_enabled():
+    return getattr(_local, 'enabled', _enabled)
+
+
+def now():
+    """Seconds on the span clock (use as `since` for `records`)."""
+    return time.perf_counter() - _EPOCH
+
+
+class _Span:
+    __slots__ = ('name', 'attrs', 'start', 'depth')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.depth = getattr(_local, 'depth', 0)
+        _local.depth = self.depth + 1
+        self.start = now()
+        return self
+
+    def __exit__(self, *exc):
+        end = now()
+        _local.depth = self.depth
+        with _lock:
+            _spans.append({'name': self.name, 'start': self.start, 'duration': end - self.start,
+                           'thread': threading.get_ident(), 'depth': self.depth,
+                           'attrs': self.attrs, 'error': exc[0] is not None})
+        return False
+
+
+def span(name, **attrs):
+    """Context manager timing the enclosed block as stage `name`."""
+    if not is_enabled():
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def timed(name=None):
+    """Decorator recording every call of the function as a span."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return fn(*args, **kwargs)
+            with _Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """Add `value` to counter `name`."""
+    if is_enabled():
+        event = {'name': name, 'time': now(), 'thread': threading.get_ident(), 'value': value}
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+            _counts.append(event)
+
+
+def records(since=None, thread=None):
+    """Recorded spans, optionally only those started after `since` / on `thread`."""
+    with _lock:
+        spans = list(_spans)
+    return [s for s in spans
+            if (since is None or s['start'] >= since) and (thread is None or s['thread'] == thread)]
+
+
+def counters(since=None, thread=None):
+    """Counter totals, optionally only of the increments made after `since` / on `thread`."""
+    with _lock:
+        if since is None and thread is None:
+            return dict(_counters)
+        events = list(_counts)
+    totals = {}
+    for e in events:
+        if (since is None or e['time'] >= since) and (thread is None or e['thread'] == thread):
+            totals[e['name']] = totals.get(e['name'], 0) + e['value']
+    return totals
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _counts.clear()
+
+
+def summary(spans=None):
+    """Calls, total, mean and max duration (ms) per stage, slowest first."""
+    spans = records() if spans is None else spans
+    columns = ['stage', 'calls', 'total_ms', 'mean_ms', 'max_ms']
+    if not spans:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame({'stage': [s['name'] for s in spans],
+                       'ms': [s['duration'] * 1000 for s in spans]})
+    out = df.groupby('stage', sort=False)['ms'].agg(['count', 'sum', 'mean', 'max']).reset_index()
+    out.columns = columns
+    return out.sort_values('total_ms', ascending=False, ignore_index=True)
+
+
+def chrome_trace(spans=None):
+    """Spans in the Chrome trace event format (complete events, microseconds)."""
+    spans = records() if spans is None else spans
+    pid = os.getpid()
+    events = [{'name': s['name'], 'ph': 'X', 'ts': s['start'] * 1e6, 'dur': s['duration'] * 1e6,
+               'pid': pid, 'tid': s['thread'],
+               'args': {k: str(v) for k, v in s['attrs'].items()}} for s in spans]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(path, spans=None):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(spans), f)
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def prometheus_text(spans=None, counts=None, prefix='stock_predictor'):
+    """
+    Stage durations (summary) and counters in the Prometheus text format.
+    Pass the `counts` matching `spans` (see `counters`) when exporting a
+    selection of the records.
+    """
+    stats = summary(spans)
+    lines = [f'# HELP {prefix}_stage_seconds Time spent per stage.',
+             f'# TYPE {prefix}_stage_seconds summary']
+    for row in stats.itertuples(index=False):
+        label = row.stage.replace('\\', '\\\\').replace('"', '\\"')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{label}"}} {row.total_ms / 1000:.6f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {row.calls}')
+    for name, value in sorted((counters() if counts is None else counts).items()):
+        metric = f'{prefix}_{_metric_name(name)}_total'
+        lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric} {value}')
+    return '\n'.join(lines) + '\n'
@@ -1,52 +1,284 @@
+"""
+Training of the XGBoost direction model.
+
+Run as a module from the repository root (the imports are package-relative):
+
+    python -m src.train_model [--from-store | --stream] [--trace trace.json]
+"""
+import argparse
+import glob
 import pandas as pd
 import numpy as np
-from xgboost import XGBClassifier
-import joblib
+import pyarrow.parquet as pq
+from sklearn.metrics import accuracy_score, log_loss
+from xgboost import DataIter, XGBClassifier
+import json
 import os
+import time
 
-def train_and_save_model():
-    # Load data
-    data_path = 'data/processed/features.csv'
+from . import registry, telemetry
+from .features import FLOAT64_COLUMNS, compact_dtypes
+
+DATA_PATH = 'data/processed/features.csv'
+MODEL_DIR = 'models'
+BEST_PARAMS_PATH = os.path.join(MODEL_DIR, 'best_params.json')
+CSV_CHUNK_ROWS = 250_000
+STREAM_BATCH_ROWS = 250_000
+
+# Based on the notebook, we use 'pure' features to avoid data leakage
+FEATURES = ['RSI', 'MACD', 'MACD_Signal', 'Log_Return_lag_1', 
+            'Log_Return_lag_2', 'Log_Return_lag_3', 'Log_Return_lag_4', 
+            'Log_Return_lag_5', 'VIX', 'TNX']
+TARGET = 'Direction'
+
+# Best parameters from Grid Search (default when no search result is saved)
+BEST_PARAMS = {
+    'colsample_bytree': 0.8,
+    'learning_rate': 0.05,
+    'max_depth': 5,
+    'n_estimators': 100,
+    'subsample': 0.9,
+    'use_label_encoder': False,
+    'eval_metric': 'logloss',
+    'random_state': 42
+}
+
+def save_best_params(params, path=BEST_PARAMS_PATH, **info):
+    """Write search winners (and extra info such as the score) for training."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'params': params, **info}, f, indent=2)
+
+def load_best_params(path=BEST_PARAMS_PATH):
+    """Parameters from the last hyperparameter search, else `BEST_PARAMS`."""
+    params = dict(BEST_PARAMS)
+    if os.path.exists(path):
+        with open(path) as f:
+            params.update(json.load(f)['params'])
+    return params
+
+def load_dataset(data_path=DATA_PATH, from_store=False):
+    """
+    Load the processed feature file, sorted by date (None if missing).
+    `.parquet` files are read as is; CSV files are parsed in chunks, with
+    features directly as float32 and `Ticker` as a category (see
+    `compact_dtypes`), to bound peak memory. With `from_store`, features
+    are read from the feature store instead, built from the bars of the
+    local market store.
+    """
+    if from_store:
+        from .feature_store import build_dataset
+        from .store import MarketStore
+        df = build_dataset(MarketStore())
+        return None if df.empty else df
     if not os.path.exists(data_path):
+        return None
+    if data_path.endswith('.parquet'):
+        df = compact_dtypes(pd.read_parquet(data_path), inplace=True)
+        return df if df.index.is_monotonic_increasing else df.sort_index()
+    header = pd.read_csv(data_path, index_col=0, nrows=0).columns
+    dtypes = {col: 'float32' for col in header if col not in FLOAT64_COLUMNS + ('Ticker', TARGET)}
+    if 'Ticker' in header:
+        dtypes['Ticker'] = 'category'
+    chunks = pd.read_csv(data_path, index_col=0, parse_dates=True, dtype=dtypes, chunksize=CSV_CHUNK_ROWS)
+    df = compact_dtypes(pd.concat(chunks), inplace=True)
+    return df if df.index.is_monotonic_increasing else df.sort_index()
+
+def train_and_save_model(from_store=False, data_path=DATA_PATH):
+    # Load data
+    with telemetry.span('train.load_dataset', from_store=from_store):
+        df = load_dataset(data_path, from_store=from_store)
+    if df is None:
         print("Data not found!")
         return
-
-    df = pd.read_csv(data_path, index_col=0, parse_dates=True)
-    df = df.sort_index()
+    telemetry.count('train.rows', len(df))
 
     # Define features and target
-    # Based on the notebook, we use 'pure' features to avoid data leakage
-    features = ['RSI', 'MACD', 'MACD_Signal', 'Log_Return_lag_1', 
-                'Log_Return_lag_2', 'Log_Return_lag_3', 'Log_Return_lag_4', 
-                'Log_Return_lag_5', 'VIX', 'TNX']
-    
-    X = df[features]
-    y = df['Direction']
-
-    # Best parameters from Grid Search
-    best_params = {
-        'colsample_bytree': 0.8,
-        'learning_rate': 0.05,
-        'max_depth': 5,
-        'n_estimators': 100,
-        'subsample': 0.9,
-        'use_label_encoder': False,
-        'eval_metric': 'logloss',
-        'random_state': 42
-    }
+    X = df[FEATURES]
+    y = df[TARGET]
 
     # Train model
-    model = XGBClassifier(**best_params)
-    model.fit(X, y)
-
-    # Save model
-    model_dir = 'models'
-    if not os.path.exists(model_dir):
-        os.makedirs(model_dir)
-    
-    model_path = os.path.join(model_dir, 'xgboost_model.joblib')
-    joblib.dump(model, model_path)
-    print(f"Model saved to {model_path}")
+    params = load_best_params()
+    with telemetry.span('train.fit', rows=len(X)):
+        model = XGBClassifier(**params)
+        model.fit(X, y)
+
+    # Register the booster (native format) with its manifest
+    proba = model.predict_proba(X)[:, 1]
+    metrics = {'train_accuracy': float(accuracy_score(y, proba > 0.5)),
+               'train_logloss': float(log_loss(y, proba, labels=[0, 1]))}
+    with telemetry.span('train.save_model'):
+        manifest = registry.save_model(model, FEATURES, target=TARGET,
+                                       train_window=registry.training_window(df),
+                                       params=params, metrics=metrics,
+                                       data='feature_store' if from_store else data_path)
+    print(f"Model saved to {os.path.join(registry.REGISTRY_DIR, manifest['name'])} "
+          f"(version {manifest['version']})")
+    return manifest
+
+def feature_files(data_path=DATA_PATH):
+    """Feature files behind `data_path`: the file itself, or the Parquet files of a directory."""
+    if os.path.isdir(data_path):
+        return sorted(glob.glob(os.path.join(data_path, '*.parquet')))
+    return [data_path] if os.path.exists(data_path) else []
+
+def _batch_arrays(frame, dates, dtype):
+    y = frame[TARGET].to_numpy(dtype=np.float64)
+    keep = ~np.isnan(y)
+    X = frame[FEATURES].to_numpy(dtype=dtype)[keep]
+    return (dates[keep] if dates is not None else None), X, y[keep]
+
+def iter_feature_batches(data_path=DATA_PATH, batch_rows=STREAM_BATCH_ROWS, dtype=np.float32):
+    """
+    Stream (dates, X, y) batches of at most `batch_rows` rows from a feature
+    file (.csv or .parquet) or a directory of Parquet files (e.g. the output
+    of `src.chunked` once targets are added), holding one Parquet row group
+    or CSV chunk at a time. Rows without a target are skipped.
+    """
+    for path in feature_files(data_path):
+        if path.endswith('.parquet'):
+            parquet = pq.ParquetFile(path)
+            date_column = 'Date' if 'Date' in parquet.schema_arrow.names else None
+            columns = FEATURES + [TARGET] + ([date_column] if date_column else [])
+            # One row group at a time: `iter_batches` keeps the buffers of
+            # every row group already read until the end of the file.
+            for group in range(parquet.num_row_groups):
+                for batch in parquet.read_row_group(group, columns=columns).to_batches(batch_rows):
+                    frame = batch.to_pandas(ignore_metadata=True)
+                    dates = frame[date_column].to_numpy() if date_column else None
+                    yield _batch_arrays(frame, dates, dtype)
+        else:
+            index = pd.read_csv(path, nrows=0).columns[0]
+            chunks = pd.read_csv(path, usecols=[index] + FEATURES + [TARGET], parse_dates=[index],
+                                 dtype={col: dtype for col in FEATURES}, chunksize=batch_rows)
+            for frame in chunks:
+                yield _batch_arrays(frame, frame[index].to_numpy(), dtype)
+
+class FeatureBatches(DataIter):
+    """
+    XGBoost data iterator over `iter_feature_batches`. XGBoost calls
+    `reset`/`next` once per pass over the data; the training window is
+    recorded on the first pass.
+    """
+
+    def __init__(self, data_path=DATA_PATH, batch_rows=STREAM_BATCH_ROWS, dtype=np.float32, cache_prefix=None):
+        super().__init__(cache_prefix=cache_prefix)
+        self.data_path = data_path
+        self.batch_rows = batch_rows
+        self.dtype = dtype
+        self.passes = 0
+        self.window = {'start': None, 'end': None, 'rows': 0}
+        self._batches = None
+
+    def reset(self):
+        self._batches = None
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = iter_feature_batches(self.data_path, self.batch_rows, self.dtype)
+            self.passes += 1
+        batch = next(self._batches, None)
+        if batch is None:
+            return False
+        dates, X, y = batch
+        if self.passes == 1 and len(y):
+            self.window['rows'] += len(y)
+            if dates is not None:
+                start, end = pd.Timestamp(dates.min()).isoformat(), pd.Timestamp(dates.max()).isoformat()
+                self.window['start'] = min(self.window['start'] or start, start)
+                self.window['end'] = max(self.window['end'] or end, end)
+        input_data(data=X, label=y, feature_names=FEATURES)
+        return True
+
+def booster_params(params, nthread=None):
+    """Native `xgboost.train` parameters (and boosting rounds) for sklearn-style `params`."""
+    native = {k: v for k, v in params.items() if k not in ('n_estimators', 'use_label_encoder', 'n_jobs', 'random_state')}
+    if 'random_state' in params:
+        native['seed'] = params['random_state']
+    native.update(objective='binary:logistic', tree_method='hist',
+                  nthread=nthread or params.get('n_jobs') or os.cpu_count() or 1)
+    return native, int(params.get('n_estimators', 100))
+
+def train_streaming(data_path=DATA_PATH, batch_rows=STREAM_BATCH_ROWS, float32=True, nthread=None, cache_dir=None):
+    """
+    Train from feature batches streamed off disk instead of one DataFrame.
+    The batches are quantized into a `QuantileDMatrix` (histogram bins, about
+    one byte per value), or with `cache_dir` into an external-memory matrix
+    whose pages live on disk, so peak memory follows `batch_rows` rather than
+    the dataset. Metrics come from a second streamed pass.
+    """
+    import xgboost
+
+    params = load_best_params()
+    native, rounds = booster_params(params, nthread)
+    dtype = np.float32 if float32 else np.float64
+    started = time.perf_counter()
+    with telemetry.span('train.quantize', external_memory=cache_dir is not None):
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            batches = FeatureBatches(data_path, batch_rows, dtype, cache_prefix=os.path.join(cache_dir, 'train'))
+            dtrain = xgboost.ExtMemQuantileDMatrix(batches, max_bin=native.get('max_bin', 256), nthread=native['nthread'])
+        else:
+            batches = FeatureBatches(data_path, batch_rows, dtype)
+            dtrain = xgboost.QuantileDMatrix(batches, max_bin=native.get('max_bin', 256), nthread=native['nthread'])
+    rows = batches.window['rows']
+    if rows == 0:
+        print("Data not found!")
+        return
+    telemetry.count('train.rows', rows)
+    with telemetry.span('train.fit', rows=rows):
+        booster = xgboost.train(native, dtrain, num_boost_round=rounds)
+    seconds = time.perf_counter() - started
+    del dtrain
+
+    correct, loss = 0, 0.0
+    with telemetry.span('train.evaluate', rows=rows):
+        for _, X, y in iter_feature_batches(data_path, batch_rows, dtype):
+            proba = np.clip(booster.inplace_predict(X), 1e-15, 1 - 1e-15)
+            correct += int(((proba > 0.5) == (y > 0.5)).sum())
+            loss -= float((y * np.log(proba) + (1 - y) * np.log(1 - proba)).sum())
+    metrics = {'train_accuracy': correct / rows, 'train_logloss': loss / rows,
+               'rows_per_second': rows / seconds}
+    print(f"Streamed {rows:,} rows in batches of {batch_rows:,} "
+          f"({batches.passes} passes, {seconds:.1f}s, {rows / seconds:,.0f} rows/s)")
+
+    with telemetry.span('train.save_model'):
+        manifest = registry.save_model(booster, FEATURES, target=TARGET, train_window=batches.window,
+                                       params=params, metrics=metrics, data=data_path,
+                                       streaming={'batch_rows': batch_rows, 'float32': float32,
+                                                  'external_memory': cache_dir is not None,
+                                                  'nthread': native['nthread']})
+    print(f"Model saved to {os.path.join(registry.REGISTRY_DIR, manifest['name'])} "
+          f"(version {manifest['version']})")
+    return manifest
+
 
 if __name__ == "__main__":
-    train_and_save_model()
+    parser = argparse.ArgumentParser(description="Train the XGBoost direction model")
+    parser.add_argument('--data', default=DATA_PATH, help="feature file (.csv or .parquet)")
+    parser.add_argument('--from-store', action='store_true',
+                        help="read features from the feature store instead of features.csv")
+    parser.add_argument('--stream', action='store_true',
+                        help="stream --data (.csv, .parquet or a directory of .parquet) in batches instead of loading it")
+    parser.add_argument('--batch-rows', type=int, default=STREAM_BATCH_ROWS, help="rows per streamed batch")
+    parser.add_argument('--float64', action='store_true', help="stream features as float64 (default float32)")
+    parser.add_argument('--threads', type=int, default=None, help="XGBoost threads (default: CPU count)")
+    parser.add_argument('--external-memory', metavar='CACHE_DIR',
+                        help="keep the quantized pages on disk under CACHE_DIR (with --stream)")
+    parser.add_argument('--trace', help="write a Chrome trace (JSON) of the training steps")
+    parser.add_argument('--metrics', help="write the step timings as Prometheus text")
+    args = parser.parse_args()
+    if args.trace or args.metrics:
+        telemetry.enable()
+    if args.stream or args.external_memory:
+        train_streaming(args.data, batch_rows=args.batch_rows, float32=not args.float64,
+                        nthread=args.threads, cache_dir=args.external_memory)
+    else:
+        train_and_save_model(from_store=args.from_store, data_path=args.data)
+    if args.trace:
+        telemetry.write_chrome_trace(args.trace)
+    if args.metrics:
+        with open(args.metrics, 'w') as f:
+            f.write(telemetry.prometheus_text())
+    if telemetry.is_enabled():
+        print(telemetry.summary().to_string(index=False))
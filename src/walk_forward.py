@@ -0,0 +1,169 @@
+"""
+Walk-forward training and evaluation.
+
+Dates are split into successive folds (expanding or rolling training window,
+then a test window), with a purge gap of `purge` dates between them so the
+next-day target of the last training rows never overlaps the test period.
+All tickers of a date always fall in the same fold.
+
+Independent folds are trained in parallel in a process pool. With
+`warm_start=True` the folds are chained instead: each fold continues the
+previous fold's booster with a few extra boosting rounds rather than
+training from scratch.
+
+    python -m src.walk_forward --folds 5 --window expanding --jobs 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+from xgboost import XGBClassifier
+
+from .train_model import BEST_PARAMS, FEATURES, MODEL_DIR, TARGET, load_dataset
+
+
+def make_folds(n_dates, n_folds=5, window='expanding', train_size=None, test_size=None, purge=1):
+    """
+    Fold boundaries as (train_start, train_end, test_start, test_end) date
+    positions (end exclusive). `train_size` is the initial training length
+    (and the length of the rolling window); the last fold runs to the end.
+    """
+    if window not in ('expanding', 'rolling'):
+        raise ValueError("window must be 'expanding' or 'rolling'")
+    train_size = train_size or n_dates // (n_folds + 1)
+    test_size = test_size or (n_dates - train_size - purge) // n_folds
+    if test_size <= 0:
+        raise ValueError("Not enough dates for the requested folds")
+
+    folds = []
+    for k in range(n_folds):
+        test_start = train_size + purge + k * test_size
+        test_end = n_dates if k == n_folds - 1 else min(test_start + test_size, n_dates)
+        if test_start >= n_dates:
+            break
+        train_end = test_start - purge
+        train_start = 0 if window == 'expanding' else max(0, train_end - train_size)
+        folds.append((train_start, train_end, test_start, test_end))
+    return folds
+
+
+def _fit_fold(X_train, y_train, X_test, params, booster=None):
+    """Fit one fold (optionally continuing `booster`) and score its test rows."""
+    start = time.perf_counter()
+    model = XGBClassifier(**params)
+    model.fit(X_train, y_train, xgb_model=booster)
+    proba = model.predict_proba(X_test)[:, 1]
+    return model, proba, time.perf_counter() - start
+
+
+def _run_fold(args):
+    X_train, y_train, X_test, params = args
+    _, proba, seconds = _fit_fold(X_train, y_train, X_test, params)
+    return proba, seconds
+
+
+def _fold_metrics(y_true, proba):
+    metrics = {'accuracy': accuracy_score(y_true, proba > 0.5)}
+    if len(np.unique(y_true)) == 2:
+        metrics['auc'] = roc_auc_score(y_true, proba)
+        metrics['logloss'] = log_loss(y_true, proba, labels=[0, 1])
+    else:
+        metrics['auc'] = metrics['logloss'] = np.nan
+    return metrics
+
+
+def walk_forward(df, features=FEATURES, target=TARGET, params=None, n_folds=5,
+                 window='expanding', train_size=None, test_size=None, purge=1,
+                 n_jobs=None, warm_start=False, warm_start_rounds=None):
+    """
+    Run the walk-forward evaluation on a date-indexed frame.
+
+    Returns (predictions, metrics): out-of-sample `Probability` and
+    `Prediction` for every test row (with its `fold`), and one row of
+    metrics per fold.
+    """
+    params = dict(params or BEST_PARAMS)
+    df = df.sort_index(kind='stable')
+    dates = df.index.unique()
+    folds = make_folds(len(dates), n_folds, window, train_size, test_size, purge)
+    positions = dates.get_indexer(df.index)
+    X = df[features].to_numpy()
+    y = df[target].to_numpy()
+
+    def rows(begin, end):
+        return (positions >= begin) & (positions < end)
+
+    splits = [(rows(a, b), rows(c, d)) for a, b, c, d in folds]
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    if warm_start:
+        # Chained folds: each one adds a few rounds to the previous booster.
+        extra = dict(params, n_estimators=warm_start_rounds or max(1, params.get('n_estimators', 100) // 4))
+        results, booster = [], None
+        for train, test in splits:
+            model, proba, seconds = _fit_fold(X[train], y[train], X[test],
+                                              params if booster is None else extra, booster)
+            booster = model.get_booster()
+            results.append((proba, seconds))
+    else:
+        # Independent folds run in parallel, one XGBoost thread per worker.
+        fold_params = dict(params, n_jobs=max(1, (os.cpu_count() or 1) // n_jobs))
+        tasks = [(X[train], y[train], X[test], fold_params) for train, test in splits]
+        if n_jobs == 1 or len(tasks) == 1:
+            results = [_run_fold(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+                results = list(pool.map(_run_fold, tasks))
+
+    predictions, metrics = [], []
+    for k, ((a, b, c, d), (train, test), (proba, seconds)) in enumerate(zip(folds, splits, results)):
+        fold = df.loc[test, [col for col in ('Ticker', target) if col in df.columns]].copy()
+        fold['Probability'] = proba
+        fold['Prediction'] = (proba > 0.5).astype(int)
+        fold['fold'] = k
+        predictions.append(fold)
+        metrics.append({
+            'fold': k,
+            'train_start': dates[a], 'train_end': dates[b - 1],
+            'test_start': dates[c], 'test_end': dates[d - 1],
+            'n_train': int(train.sum()), 'n_test': int(test.sum()),
+            'seconds': seconds,
+            **_fold_metrics(y[test], proba),
+        })
+    return pd.concat(predictions), pd.DataFrame(metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward training and evaluation")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--window', choices=['expanding', 'rolling'], default='expanding')
+    parser.add_argument('--train-size', type=int, default=None, help="initial/rolling training length in dates")
+    parser.add_argument('--test-size', type=int, default=None, help="test length in dates")
+    parser.add_argument('--purge', type=int, default=1, help="dates dropped between train and test")
+    parser.add_argument('--jobs', type=int, default=None, help="parallel folds (default: all cores)")
+    parser.add_argument('--warm-start', action='store_true', help="chain folds from the previous booster")
+    parser.add_argument('--output-dir', default=MODEL_DIR)
+    args = parser.parse_args()
+
+    df = load_dataset()
+    if df is None:
+        print("Data not found!")
+        return
+
+    start = time.perf_counter()
+    predictions, metrics = walk_forward(df, n_folds=args.folds, window=args.window,
+                                        train_size=args.train_size, test_size=args.test_size,
+                                        purge=args.purge, n_jobs=args.jobs, warm_start=args.warm_start)
+    os.makedirs(args.output_dir, exist_ok=True)
+    predictions.to_csv(os.path.join(args.output_dir, 'walk_forward_predictions.csv'))
+    metrics.to_csv(os.path.join(args.output_dir, 'walk_forward_metrics.csv'), index=False)
+    print(metrics.to_string(index=False))
+    print(f"Walk-forward done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import the shared `src` package and the app's `utils` package the
+# way `streamlit run app/main.py` does (project root and `app/` on sys.path).
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'app')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,74 @@
+"""
+Pandas formulas the vectorized kernels replaced, kept as references for the
+equivalence tests.
+"""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_bars(n=600, n_series=1, seed=0, flat=True):
+    """OHLC random walks (one frame per series) on a gap-free calendar, with a flat stretch if `flat`."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2015-01-01', periods=n, name='Date')
+    frames = []
+    for _ in range(n_series):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+        if flat:
+            close[n // 3:n // 3 + 30] = close[n // 3]
+        spread = np.abs(rng.normal(0, 0.01, n)) * close
+        frames.append(pd.DataFrame({'Open': close, 'High': close + spread, 'Low': close - spread,
+                                    'Close': close, 'Volume': 1_000.0}, index=index))
+    return frames
+
+
+def calculate_indicators(df):
+    """`processor.calculate_indicators` before the shared kernels (float64)."""
+    df = df.copy()
+    delta = df['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    df['RSI'] = 100 - (100 / (1 + gain / loss))
+    exp1 = df['Close'].ewm(span=12, adjust=False).mean()
+    exp2 = df['Close'].ewm(span=26, adjust=False).mean()
+    df['MACD'] = exp1 - exp2
+    df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    rolling_mean = df['Close'].rolling(window=20).mean()
+    rolling_std = df['Close'].rolling(window=20).std()
+    df['BB_Upper'] = rolling_mean + (rolling_std * 2)
+    df['BB_Lower'] = rolling_mean - (rolling_std * 2)
+    close_prev = df['Close'].shift(1)
+    tr = pd.concat([df['High'] - df['Low'], abs(df['High'] - close_prev), abs(df['Low'] - close_prev)],
+                   axis=1).max(axis=1)
+    df['ATR'] = tr.rolling(window=14).mean()
+    df['Log_Return'] = np.log(df['Close'] / df['Close'].shift(1))
+    for lag in range(1, 6):
+        df[f'Log_Return_lag_{lag}'] = df['Log_Return'].shift(lag)
+    return df
+
+
+INDICATOR_COLUMNS = ['RSI', 'MACD', 'MACD_Signal', 'BB_Upper', 'BB_Lower', 'ATR', 'Log_Return'] + \
+    [f'Log_Return_lag_{lag}' for lag in range(1, 6)]
+
+
+def calculate_cci(df, window=20):
+    """`features.calculate_cci` with its per-row lambda."""
+    tp = (df['High'] + df['Low'] + df['Close']) / 3
+    sma_tp = tp.rolling(window=window).mean()
+    mean_dev = tp.rolling(window=window).apply(lambda x: np.abs(x - x.mean()).mean())
+    return (tp - sma_tp) / (0.015 * mean_dev)
+
+
+def calculate_adx(df, window=14):
+    """`features.calculate_adx` on Series with the concatenated true range."""
+    high, low, close = df['High'], df['Low'], df['Close']
+    plus_dm = high.diff()
+    minus_dm = low.diff()
+    plus_dm[plus_dm < 0] = 0
+    minus_dm[minus_dm > 0] = 0
+    minus_dm = abs(minus_dm)
+    tr = pd.concat([high - low, abs(high - close.shift(1)), abs(low - close.shift(1))], axis=1).max(axis=1)
+    atr = tr.rolling(window=window).mean()
+    plus_di = 100 * (plus_dm.rolling(window=window).mean() / atr)
+    minus_di = 100 * (minus_dm.rolling(window=window).mean() / atr)
+    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
+    return dx.rolling(window=window).mean()
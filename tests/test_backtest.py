@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import backtest
+
+
+def _reference(probabilities, log_returns, threshold, mode, holding_period, cost):
+    """One configuration with plain pandas, as in the original `run_backtest` loop."""
+    p = pd.Series(probabilities)
+    long_, short = (p > threshold).astype(float), (p < 1 - threshold).astype(float)
+    signal = {'long': long_, 'short': -short, 'long_short': long_ - short}[mode]
+    # Revised every `holding_period` bars, held in between
+    signal = signal.where(pd.Series(np.arange(len(p))) % holding_period == 0).ffill()
+    trade = signal.diff().fillna(0).abs()
+    returns = (signal * pd.Series(log_returns).fillna(0).shift(-1) - trade * cost).iloc[:-1]
+
+    wealth = np.exp(returns.cumsum())
+    held = signal.iloc[:-1] != 0
+    return {
+        'total_return': wealth.iloc[-1] - 1,
+        'sharpe': returns.mean() / returns.std() * np.sqrt(252),
+        'max_drawdown': (wealth / wealth.clip(lower=1).cummax() - 1).min(),
+        'turnover': signal.diff().abs().iloc[1:].mean(),
+        'hit_rate': ((returns > 0) & held).sum() / held.sum(),
+    }
+
+
+def test_sweep_matches_a_pandas_backtest():
+    rng = np.random.default_rng(0)
+    n = 500
+    probabilities = rng.uniform(0.3, 0.7, n)
+    log_returns = rng.normal(0, 0.01, n)
+    log_returns[0] = np.nan
+    thresholds, costs, holding = (0.5, 0.55), (0.0, 0.001), (1, 5)
+    result = backtest.sweep(probabilities, log_returns, thresholds=thresholds, costs=costs,
+                            modes=backtest.MODES, holding_periods=holding)
+    assert len(result) == len(thresholds) * len(costs) * len(holding) * len(backtest.MODES)
+    for row in result.itertuples(index=False):
+        expected = _reference(probabilities, log_returns, row.threshold, row.mode, row.holding_period, row.cost)
+        for name, value in expected.items():
+            assert getattr(row, name) == pytest.approx(value, rel=1e-10), (row, name)
+    assert result['market_return'].iloc[0] == pytest.approx(np.exp(np.nansum(log_returns[1:])) - 1)
+
+
+def test_performance_of_a_flat_strategy():
+    returns = np.zeros((10, 1))
+    metrics = backtest.performance(returns, np.zeros(11))
+    assert metrics['total_return'][0] == 0 and metrics['max_drawdown'][0] == 0
+    assert np.isnan(metrics['sharpe'][0]) and np.isnan(metrics['hit_rate'][0])
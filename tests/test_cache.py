@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.registry import RegisteredModel
+from utils import cache
+
+
+def _model(version):
+    return RegisteredModel(booster=None, manifest={'name': 'direction', 'version': version})
+
+
+def test_keys_follow_content_not_identity():
+    frame = pd.DataFrame({'a': np.arange(5.0)})
+    assert cache._key_part(frame) == cache._key_part(frame.copy())
+    assert cache._key_part(frame) != cache._key_part(frame + 1)
+    assert cache._key_part(_model(3)) == cache._key_part(_model(3))
+    assert cache._key_part(_model(3)) != cache._key_part(_model(4))
+    assert cache._key_part(['RSI', 'MACD']) != cache._key_part(('RSI', 'MACD'))
+    assert cache._key_part(np.float64(0.5)) == cache._key_part(np.float64(0.5))
+
+
+@pytest.mark.parametrize('value', [{'a': 1}, object(), np.arange(3)])
+def test_unkeyable_arguments_are_refused(value):
+    with pytest.raises(TypeError):
+        cache._key_part(value)
+
+
+def test_memoized_calls_are_shared():
+    cache.clear_caches()
+    calls = []
+
+    @cache.memoize_frame
+    def total(df, model, columns):
+        calls.append(1)
+        return df[columns].sum()
+
+    frame = pd.DataFrame({'a': [1.0, 2.0], 'b': [3.0, 4.0]})
+    total(frame, _model(1), ['a'])
+    total(frame.copy(), _model(1), ['a'])
+    total(frame, _model(2), ['a'])
+    assert len(calls) == 2
+    with pytest.raises(TypeError):
+        total(frame, object(), ['a'])
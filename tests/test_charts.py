@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from utils import charts
+
+
+def _bars(n=20_000):
+    index = pd.date_range('2020-01-01', periods=n, freq='min', name='Date')
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close}, index=index)
+
+
+def test_budget_follows_the_chart_width():
+    bars = _bars()
+    for width in (800, 1400, 3840):
+        candles = charts.resample_ohlc(bars, width_px=width)
+        assert len(candles) <= width // charts.PX_PER_CANDLE
+        assert candles['High'].max() == bars['High'].max()
+        assert candles['Low'].min() == bars['Low'].min()
+        line = charts.downsample_series(bars['Close'], width_px=width)
+        assert len(line) == width * charts.POINTS_PER_PX
+        assert line.index[0] == bars.index[0] and line.index[-1] == bars.index[-1]
+
+
+def test_explicit_budget_overrides_the_width():
+    bars = _bars()
+    assert len(charts.downsample_series(bars['Close'], n_out=100, width_px=3840)) == 100
+    assert len(charts.resample_ohlc(bars, max_bars=50, width_px=3840)) <= 50
+    # Short histories are left alone
+    pd.testing.assert_frame_equal(charts.resample_ohlc(bars.iloc[:100], width_px=800), bars.iloc[:100])
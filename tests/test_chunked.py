@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import legacy
+from src import chunked, indicators
+from src.features import compact_values
+from src.store import MarketStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    bars = legacy.synthetic_bars(n=1_500, seed=6)[0]
+    store = MarketStore(str(tmp_path / 'store'))
+    # Many part files of uneven sizes
+    for start, stop in ((0, 100), (100, 137), (137, 900), (900, 1_500)):
+        store.append('AAPL', bars.iloc[start:stop])
+    return store, bars
+
+
+def _in_memory(bars):
+    values = indicators.compute_indicators(bars['Close'].to_numpy(), bars['High'].to_numpy(), bars['Low'].to_numpy())
+    return bars.assign(**compact_values(values))
+
+
+@pytest.mark.parametrize('chunk_rows', [50, 333, 1_000, 10_000])
+def test_chunked_output_matches_in_memory(tmp_path, store, chunk_rows):
+    store, bars = store
+    path = str(tmp_path / 'AAPL.parquet')
+    assert chunked.build_features(store, 'AAPL', path, chunk_rows=chunk_rows) == len(bars)
+    result = pd.read_parquet(path).set_index('Date')
+    expected = _in_memory(store.read('AAPL'))
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+
+def test_chunks_follow_the_stored_order(store):
+    store, bars = store
+    chunks = list(store.iter_chunks('AAPL', chunk_rows=128))
+    assert all(len(c) == 128 for c in chunks[:-1])
+    stitched = pd.concat(chunks)
+    assert stitched.index.is_monotonic_increasing
+    np.testing.assert_array_equal(stitched['Close'], bars['Close'])
@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.downloader import Downloader, RecordedSource, split_completed
+from src.store import MarketStore
+
+
+def _bars(start='2020-01-01', end='2020-12-31', scale=1.0):
+    index = pd.bdate_range(start, end, name='Date')
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, len(index)))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1_000}, index=index) * scale
+
+
+@pytest.fixture
+def setup(tmp_path):
+    recorded = tmp_path / 'recorded'
+    recorded.mkdir()
+    source = RecordedSource(str(recorded))
+    downloader = Downloader(MarketStore(str(tmp_path / 'store')), source, max_workers=2, retries=0)
+
+    def record(frame):
+        frame.to_csv(recorded / 'AAPL.csv')
+    return downloader, source, record, recorded
+
+
+def test_first_refresh_seeds_the_cache(setup):
+    downloader, source, record, _ = setup
+    bars = _bars()
+    record(bars)
+    assert downloader.refresh(['AAPL'], period='max') == ({'AAPL': len(bars)}, {})
+    assert source.requests == [('AAPL', None, 'max')]
+    pd.testing.assert_series_equal(downloader.store.read('AAPL')['Close'], bars['Close'], check_freq=False)
+
+
+def test_refresh_appends_only_new_bars(setup):
+    downloader, source, record, _ = setup
+    bars = _bars()
+    record(bars.loc[:'2020-06-30'])
+    downloader.refresh(['AAPL'], period='max')
+    record(bars)
+    written, _ = downloader.refresh(['AAPL'], period='max')
+
+    assert source.requests[-1] == ('AAPL', pd.Timestamp('2020-06-30'), 'max')
+    assert written == {'AAPL': len(bars.loc['2020-07-01':])}
+    pd.testing.assert_series_equal(downloader.store.read('AAPL')['Close'], bars['Close'], check_freq=False)
+
+
+def test_readjusted_history_is_reloaded(setup):
+    downloader, source, record, _ = setup
+    bars = _bars()
+    record(bars.loc[:'2020-06-30'])
+    downloader.refresh(['AAPL'], period='max')
+    # A 2:1 split re-adjusts every past price
+    adjusted = bars * 0.5
+    record(adjusted)
+    written, _ = downloader.refresh(['AAPL'], period='max')
+
+    assert source.requests[-1] == ('AAPL', None, 'max')
+    assert written == {'AAPL': len(bars)}
+    stored = downloader.store.read('AAPL')['Close']
+    pd.testing.assert_series_equal(stored, adjusted['Close'], check_freq=False)
+
+
+def test_source_failure_serves_the_cache(setup):
+    downloader, _, record, recorded = setup
+    bars = _bars()
+    record(bars)
+    downloader.refresh(['AAPL'], period='max')
+    (recorded / 'AAPL.csv').unlink()
+
+    data, error = downloader.fetch('AAPL', period='max')
+    assert isinstance(error, KeyError)
+    assert not hasattr(downloader, 'errors')
+    pd.testing.assert_series_equal(data['Close'], bars['Close'], check_freq=False)
+
+
+def test_bar_in_progress_is_not_persisted():
+    index = pd.date_range('2020-03-02 09:30', periods=6, freq='5min')
+    bars = pd.DataFrame({'Close': np.arange(6.0)}, index=index)
+    done, live = split_completed(bars, '5m', now=pd.Timestamp('2020-03-02 09:57'))
+    assert list(done.index) == list(index[:5])
+    assert list(live.index) == [index[5]]
+    done, live = split_completed(bars.iloc[:1], '1mo', now=pd.Timestamp('2020-03-31'))
+    assert done.empty and len(live) == 1
+
+
+def test_concurrent_appends_get_distinct_parts(tmp_path):
+    store = MarketStore(str(tmp_path))
+    bars = _bars('2020-01-01', '2020-01-31')
+    store.append('AAPL', bars.iloc[:10])
+    store.append('AAPL', bars.iloc[10:])
+    assert len(store._parts('AAPL', 2020)) == 2
+    pd.testing.assert_frame_equal(store.read('AAPL'), bars, check_freq=False, check_dtype=False)
+
+
+def test_replace_switches_versions_atomically(tmp_path):
+    store = MarketStore(str(tmp_path))
+    bars = _bars('2020-01-01', '2020-03-31')
+    store.append('AAPL', bars.iloc[:20])
+    store.replace('AAPL', bars)
+    store.append('AAPL', _bars('2020-04-01', '2020-04-30'))
+    assert store.last_timestamp('AAPL') == pd.Timestamp('2020-04-30')
+    for scale in (2, 3):
+        store.replace('AAPL', bars * scale)
+    pd.testing.assert_frame_equal(store.read('AAPL'), bars * 3, check_freq=False, check_dtype=False)
+    # The current version and the one it replaced are kept, older ones removed
+    versions = [name for name in os.listdir(tmp_path / 'AAPL') if name.startswith('v-')]
+    assert len(versions) == 2 and not any(name.isdigit() for name in os.listdir(tmp_path / 'AAPL'))
+
+
+def test_read_restarts_when_a_replace_removes_its_files(tmp_path, monkeypatch):
+    store = MarketStore(str(tmp_path))
+    bars = _bars('2020-01-01', '2020-03-31')
+    store.replace('AAPL', bars)
+    parts = store._parts
+
+    def racing(ticker, year):
+        listed = parts(ticker, year)
+        monkeypatch.setattr(store, '_parts', parts)
+        # Two replaces in between: the listed version is gone
+        store.replace('AAPL', bars * 2)
+        store.replace('AAPL', bars * 3)
+        return listed
+    monkeypatch.setattr(store, '_parts', racing)
+    pd.testing.assert_frame_equal(store.read('AAPL'), bars * 3, check_freq=False, check_dtype=False)
+
+
+def test_bar_completion_uses_exchange_time():
+    index = pd.date_range('2020-03-02 09:30', periods=6, freq='5min')
+    bars = pd.DataFrame({'Close': np.arange(6.0)}, index=index)
+    # 14:57 UTC is 09:57 in New York: the 09:55 bar is still in progress
+    done, live = split_completed(bars, '5m', now=pd.Timestamp('2020-03-02 14:57', tz='UTC'))
+    assert len(done) == 5 and list(live.index) == [index[5]]
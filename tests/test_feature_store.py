@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.feature_store import FeatureStore
+
+
+def _bars(n=400, seed=0):
+    index = pd.bdate_range('2020-01-01', periods=n, name='Date')
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, n)))
+    return pd.DataFrame({'Close': close, 'High': close * 1.01, 'Low': close * 0.99}, index=index)
+
+
+def _cold(tmp_path, bars):
+    return FeatureStore(str(tmp_path / 'reference')).get('AAPL', bars)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(str(tmp_path / 'features'))
+
+
+def test_periods_are_sliced_from_one_history(tmp_path, store):
+    bars = _bars()
+    long, short = bars, bars.iloc[-100:]
+    # A shorter period first, then the longer history replaces it
+    store.get('AAPL', short)
+    store.get('AAPL', long)
+    for _ in range(2):
+        frame = store.get('AAPL', short)
+    assert store.hits == {'warm': 2, 'incremental': 0, 'cold': 2}
+    assert len(store._manifest) == 1
+    pd.testing.assert_frame_equal(frame, _cold(tmp_path, long).iloc[-100:], check_freq=False)
+
+
+def test_sliding_period_is_incremental(tmp_path, store):
+    bars = _bars()
+    store.get('AAPL', bars.iloc[:300])
+    # The next day's 1y window: one bar dropped at the start, one appended
+    frame = store.get('AAPL', bars.iloc[1:301])
+    assert store.hits == {'warm': 0, 'incremental': 1, 'cold': 1}
+    pd.testing.assert_frame_equal(frame, _cold(tmp_path, bars.iloc[:301]).iloc[1:], check_freq=False)
+
+
+def test_appended_bars_are_incremental(tmp_path, store):
+    bars = _bars()
+    store.get('AAPL', bars.iloc[:300])
+    frame = store.get('AAPL', bars)
+    assert store.hits['incremental'] == 1
+    pd.testing.assert_frame_equal(frame, _cold(tmp_path, bars), check_freq=False)
+
+
+def test_revised_last_bar_is_incremental(tmp_path, store):
+    bars = _bars()
+    store.get('AAPL', bars)
+    revised = bars.copy()
+    revised.iloc[-1] *= 1.02
+    frame = store.get('AAPL', revised)
+    assert store.hits == {'warm': 0, 'incremental': 1, 'cold': 1}
+    pd.testing.assert_frame_equal(frame, _cold(tmp_path, revised), check_freq=False)
+    # The replaced last bar's part is gone
+    assert sum(len(files) for _, _, files in os.walk(store.root)) == 3
+
+
+def test_stores_sharing_a_root_merge_their_manifests(tmp_path):
+    root = str(tmp_path / 'features')
+    first, second = FeatureStore(root), FeatureStore(root)
+    first.get('AAPL', _bars(seed=1))
+    second.get('MSFT', _bars(seed=2))
+    with open(os.path.join(root, 'manifest.json')) as f:
+        manifest = json.load(f)
+    assert sorted(e['ticker'] for e in manifest.values()) == ['AAPL', 'MSFT']
+
+
+def test_evicted_files_are_recomputed(tmp_path, store):
+    bars = _bars()
+    expected = store.get('AAPL', bars)
+    for root, _, files in os.walk(store.root):
+        for name in files:
+            if name.endswith('.parquet'):
+                os.remove(os.path.join(root, name))
+    pd.testing.assert_frame_equal(store.get('AAPL', bars), expected)
+    assert store.hits['cold'] == 2
+
+
+def test_concurrent_gets_agree(tmp_path, store):
+    frames = {}
+
+    def run(seed):
+        frames[seed] = store.get(f'T{seed}', _bars(seed=seed))
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for seed, frame in frames.items():
+        pd.testing.assert_frame_equal(frame, FeatureStore(str(tmp_path / f'ref{seed}')).get(f'T{seed}', _bars(seed=seed)))
+    assert len(store._manifest) == 6
+
+
+def test_readjusted_history_replaces_the_entry(tmp_path, store):
+    bars = _bars()
+    store.get('AAPL', bars)
+    adjusted = bars * 0.5
+    frame = store.get('AAPL', adjusted.iloc[-100:])
+    assert store.hits == {'warm': 0, 'incremental': 0, 'cold': 2}
+    pd.testing.assert_frame_equal(frame, _cold(tmp_path, adjusted.iloc[-100:]), check_freq=False)
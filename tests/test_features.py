@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import legacy
+from src import features
+
+
+@pytest.fixture
+def bars():
+    # No flat stretch: CCI is 0/0 on constant windows, where both versions
+    # only return rounding noise
+    df = legacy.synthetic_bars(n=800, seed=3, flat=False)[0]
+    # NaN gaps (missing prints) inside the windows
+    df.iloc[[100, 101, 400], df.columns.get_indexer(['High', 'Low', 'Close'])] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('window', [5, 20])
+def test_cci_matches_the_rolling_apply(bars, window):
+    np.testing.assert_allclose(features.calculate_cci(bars, window), legacy.calculate_cci(bars, window),
+                               rtol=1e-10, equal_nan=True)
+
+
+def test_mean_abs_deviation_in_blocks(bars):
+    tp = (bars['High'] + bars['Low'] + bars['Close']) / 3
+    expected = tp.rolling(20).apply(lambda x: np.abs(x - x.mean()).mean())
+    # Several blocks, one of them shorter than a window
+    np.testing.assert_allclose(features.rolling_mean_abs_deviation(tp, 20, chunk_size=37), expected,
+                               rtol=1e-10, equal_nan=True)
+
+
+@pytest.mark.parametrize('window', [7, 14])
+def test_adx_matches_the_pandas_formula(bars, window):
+    np.testing.assert_allclose(features.calculate_adx(bars, window), legacy.calculate_adx(bars, window),
+                               rtol=1e-10, equal_nan=True)
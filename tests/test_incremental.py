@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from legacy import INDICATOR_COLUMNS, calculate_indicators, synthetic_bars
+from src.incremental import IncrementalIndicators
+from utils.processor import calculate_indicators as batch_indicators
+
+RTOL = 1e-9
+# pandas' online rolling variance leaves a residual (~1e-6 std) on constant
+# windows, where the engine's value is exact
+BOLLINGER_RTOL = 1e-7
+
+
+def _replay(frames, engine=None):
+    engine = engine or IncrementalIndicators(n_series=len(frames))
+    close = np.column_stack([f['Close'] for f in frames])
+    high = np.column_stack([f['High'] for f in frames])
+    low = np.column_stack([f['Low'] for f in frames])
+    rows = [engine.update(close[t], high[t], low[t]) for t in range(len(close))]
+    return engine, {name: np.stack([r[name] for r in rows]) for name in INDICATOR_COLUMNS}
+
+
+def test_incremental_matches_the_pandas_formulas():
+    frames = synthetic_bars(n_series=3)
+    _, values = _replay(frames)
+    for j, frame in enumerate(frames):
+        expected = calculate_indicators(frame)
+        for name in INDICATOR_COLUMNS:
+            rtol = BOLLINGER_RTOL if name.startswith('BB_') else RTOL
+            np.testing.assert_allclose(values[name][:, j], expected[name], rtol=rtol, atol=1e-12,
+                                       equal_nan=True, err_msg=name)
+
+
+def test_incremental_matches_calculate_indicators():
+    frame = synthetic_bars(seed=1)[0]
+    _, values = _replay([frame])
+    batch = batch_indicators(frame)
+    for name in INDICATOR_COLUMNS:
+        # calculate_indicators stores indicators as float32
+        rtol = RTOL if batch[name].dtype == np.float64 else 1e-6
+        np.testing.assert_allclose(values[name][:, 0], batch[name], rtol=rtol, atol=1e-6,
+                                   equal_nan=True, err_msg=name)
+
+
+def test_checkpoint_resumes_where_it_stopped(tmp_path):
+    frames = synthetic_bars(n_series=2, seed=2)
+    head = [f.iloc[:250] for f in frames]
+    tail = [f.iloc[250:] for f in frames]
+    engine, _ = _replay(head)
+    engine.save(tmp_path / 'state.npz')
+    _, resumed = _replay(tail, IncrementalIndicators.load(tmp_path / 'state.npz'))
+    _, whole = _replay(frames)
+    for name in INDICATOR_COLUMNS:
+        np.testing.assert_array_equal(resumed[name], whole[name][250:], err_msg=name)
+
+
+def test_frame_has_the_batch_dtypes():
+    frame = synthetic_bars(seed=3)[0]
+    engine = IncrementalIndicators()
+    values = engine.warm_up(frame['Close'].to_numpy(), frame['High'].to_numpy(), frame['Low'].to_numpy())
+    last = engine.to_frame(values, labels=[frame.index[-1]])
+    batch = batch_indicators(frame)[INDICATOR_COLUMNS]
+    pd.testing.assert_series_equal(last[INDICATOR_COLUMNS].dtypes, batch.dtypes)
+    # Same float32 values, up to one rounding of the float64 state
+    np.testing.assert_allclose(last[INDICATOR_COLUMNS].iloc[0].to_numpy(np.float64),
+                               batch.iloc[-1].to_numpy(np.float64), rtol=2 ** -23)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+import legacy
+from legacy import INDICATOR_COLUMNS
+from src import features, indicators
+
+RTOL = 1e-9
+# pandas' online rolling variance leaves a residual on constant windows
+BOLLINGER_RTOL = 1e-7
+
+
+def _panel(frames, column):
+    return pd.concat({t: f[column] for t, f in frames.items()}, axis=1)
+
+
+def _frames():
+    frames = dict(zip('ABC', legacy.synthetic_bars(n_series=3, seed=4)))
+    # C is listed late: no bars before its 200th session
+    frames['C'] = frames['C'].copy()
+    frames['C'].iloc[:200] = np.nan
+    return frames
+
+
+def test_panel_matches_the_pandas_formulas_per_ticker():
+    frames = _frames()
+    values = indicators.compute_indicators(_panel(frames, 'Close'), _panel(frames, 'High'), _panel(frames, 'Low'))
+    for ticker, frame in frames.items():
+        listed = frame.dropna(subset=['Close'])
+        expected = legacy.calculate_indicators(listed)
+        for name in INDICATOR_COLUMNS:
+            rtol = BOLLINGER_RTOL if name.startswith('BB_') else RTOL
+            np.testing.assert_allclose(values[name][ticker].loc[listed.index], expected[name],
+                                       rtol=rtol, atol=1e-12, equal_nan=True, err_msg=f'{ticker} {name}')
+
+
+def test_ticker_is_identical_alone_or_in_a_panel():
+    frames = _frames()
+    panel = indicators.compute_indicators(_panel(frames, 'Close'), _panel(frames, 'High'), _panel(frames, 'Low'))
+    for ticker, frame in frames.items():
+        alone = indicators.compute_indicators(frame['Close'], frame['High'], frame['Low'])
+        for name in INDICATOR_COLUMNS:
+            np.testing.assert_array_equal(panel[name][ticker], alone[name], err_msg=f'{ticker} {name}')
+
+
+def test_feature_wrappers_match_the_pandas_formulas():
+    close = legacy.synthetic_bars(seed=5)[0]['Close']
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    np.testing.assert_allclose(features.calculate_rsi(close), 100 - 100 / (1 + gain / loss),
+                               rtol=RTOL, equal_nan=True)
+    macd, signal = features.calculate_macd(close)
+    fast, slow = close.ewm(span=12, adjust=False).mean(), close.ewm(span=26, adjust=False).mean()
+    np.testing.assert_allclose(macd, fast - slow, rtol=RTOL, equal_nan=True)
+    np.testing.assert_allclose(signal, (fast - slow).ewm(span=9, adjust=False).mean(), rtol=RTOL, equal_nan=True)
+    upper, lower = features.calculate_bollinger_bands(close)
+    mean, std = close.rolling(20).mean(), close.rolling(20).std()
+    np.testing.assert_allclose(upper, mean + 2 * std, rtol=BOLLINGER_RTOL, equal_nan=True)
+    np.testing.assert_allclose(lower, mean - 2 * std, rtol=BOLLINGER_RTOL, equal_nan=True)
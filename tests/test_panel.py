@@ -0,0 +1,25 @@
+import numpy as np
+
+import legacy
+from legacy import INDICATOR_COLUMNS
+from src import panel
+
+# The panel stores the indicators as float32
+RTOL = 2 ** -23
+
+
+def test_add_indicators_matches_calculate_indicators_per_ticker():
+    frames = dict(zip(['AAPL', 'MSFT', 'LATE'], legacy.synthetic_bars(n_series=3, seed=7)))
+    # LATE is listed after the others: its first bar is their 150th session
+    frames['LATE'] = frames['LATE'].iloc[150:]
+    result = panel.add_indicators(panel.to_panel(frames))
+    for ticker, bars in frames.items():
+        rows = result.xs(ticker, level='Ticker').loc[bars.index]
+        expected = legacy.calculate_indicators(bars)
+        np.testing.assert_array_equal(rows['Close'], bars['Close'])
+        for name in INDICATOR_COLUMNS:
+            assert rows[name].dtype == (np.float64 if name == 'Log_Return' else np.float32)
+            np.testing.assert_allclose(rows[name], expected[name], rtol=RTOL, atol=1e-12,
+                                       equal_nan=True, err_msg=f'{ticker} {name}')
+    # Dates before the listing are not invented for the late ticker
+    assert result.xs('LATE', level='Ticker')['Close'].notna().sum() == len(frames['LATE'])
@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+import pytest
+from xgboost import DMatrix, XGBClassifier
+
+from src import registry
+
+FEATURES = ['a', 'b', 'c']
+
+
+def _model(n_estimators=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(200, len(FEATURES)))
+    y = (X[:, 0] + rng.normal(size=200) > 0).astype(int)
+    return XGBClassifier(n_estimators=n_estimators, max_depth=2).fit(X, y), X
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    registry.clear_loaded()
+    yield
+    registry.clear_loaded()
+
+
+def test_round_trip(tmp_path):
+    model, X = _model()
+    manifest = registry.save_model(model, FEATURES, target='Target', root=str(tmp_path),
+                                   params={'max_depth': 2}, metrics={'auc': 0.6})
+    loaded = registry.get_model(root=str(tmp_path))
+    assert (loaded.version, loaded.features) == (1, FEATURES)
+    assert registry.load_manifest(root=str(tmp_path)) == manifest
+    margin = loaded.booster.predict(DMatrix(X), output_margin=True)
+    np.testing.assert_array_equal(margin, model.get_booster().predict(DMatrix(X), output_margin=True))
+    # Loaded once per process
+    assert registry.get_model(root=str(tmp_path)) is loaded
+
+
+def test_concurrent_saves_get_distinct_versions(tmp_path):
+    barrier = threading.Barrier(6)
+    models = [_model(n_estimators=k + 1, seed=k)[0] for k in range(6)]
+
+    def save(k):
+        barrier.wait()
+        registry.save_model(models[k], FEATURES, root=str(tmp_path), writer=k)
+
+    threads = [threading.Thread(target=save, args=(k,)) for k in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.versions(root=str(tmp_path)) == [1, 2, 3, 4, 5, 6]
+    writers = set()
+    for version in range(1, 7):
+        loaded = registry.get_model(version=version, root=str(tmp_path))
+        writers.add(loaded.manifest['writer'])
+        # Each version holds the booster of the writer named in its manifest
+        assert loaded.booster.num_boosted_rounds() == loaded.manifest['writer'] + 1
+    assert writers == set(range(6))
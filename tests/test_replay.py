@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from legacy import INDICATOR_COLUMNS
+from src import replay
+from src.intraday import BarAggregator, resample_bars
+from src.processor import calculate_indicators
+
+
+def _macro():
+    days = pd.bdate_range('2020-03-02', periods=10)
+    return pd.DataFrame({'VIX': np.arange(10.0), 'TNX': np.arange(10.0) + 100}, index=days)
+
+
+def test_intraday_bars_see_the_previous_session():
+    lookup = replay._macro_lookup(_macro(), ['VIX', 'TNX'])
+    # Tuesday 10:30: Tuesday's close is not known yet
+    assert lookup(pd.Timestamp('2020-03-03 10:30')) == {'VIX': 0.0, 'TNX': 100.0}
+    # A daily bar is joined on its own session, as in training
+    assert lookup(pd.Timestamp('2020-03-03')) == {'VIX': 1.0, 'TNX': 101.0}
+    # Monday morning sees Friday
+    assert lookup(pd.Timestamp('2020-03-09 09:35'))['VIX'] == 4.0
+
+
+def test_stale_macro_is_missing():
+    lookup = replay._macro_lookup(_macro(), ['VIX'], timestamps=pd.DatetimeIndex(['2020-03-20', '2020-04-30']))
+    assert lookup(pd.Timestamp('2020-03-20'))['VIX'] == 9.0
+    assert np.isnan(lookup(pd.Timestamp('2020-04-30'))['VIX'])
+    # Nothing published before the first session
+    assert np.isnan(lookup(pd.Timestamp('2020-03-02 09:30'))['VIX'])
+
+
+def test_align_without_a_complete_row_is_empty():
+    days = pd.bdate_range('2020-03-02', periods=5)
+    frames = {'AAPL': pd.DataFrame({'Close': np.arange(5.0)}, index=days),
+              'HALT': pd.DataFrame({'Close': np.full(5, np.nan)}, index=days)}
+    timestamps, _, arrays = replay.align(frames)
+    assert len(timestamps) == 0 and arrays['Close'].shape == (0, 2)
+    with pytest.raises(ValueError):
+        replay.replay(frames)
+
+
+def _minute_frames():
+    frames = replay.synthetic_frames(2, 400, seed=4)
+    # A 12-minute halt leaves whole 5-minute buckets empty
+    halt = frames['T000'].index[100:112]
+    return {t: f.drop(halt) for t, f in frames.items()}
+
+
+def test_aggregator_matches_resample_bars():
+    frames = _minute_frames()
+    timestamps, tickers, arrays = replay.align(frames)
+    aggregator = BarAggregator('5m', n_series=len(tickers))
+    bars = []
+    for i, ts in enumerate(timestamps):
+        bars += aggregator.update(ts, arrays['Open'][i], arrays['High'][i], arrays['Low'][i],
+                                  arrays['Close'][i], arrays['Volume'][i])
+    bars += aggregator.flush()
+    for j, ticker in enumerate(tickers):
+        expected = resample_bars(frames[ticker], '5m')
+        assert [t for t, _ in bars] == list(expected.index)
+        for column in expected.columns:
+            np.testing.assert_array_equal([bar[column][j] for _, bar in bars], expected[column], err_msg=column)
+
+
+class _Model:
+    """Stands in for a booster: replay only reads the feature names."""
+    features = INDICATOR_COLUMNS
+
+
+@pytest.mark.parametrize('interval', [None, '5m'])
+def test_replay_matches_calculate_indicators(monkeypatch, interval):
+    frames = _minute_frames()
+    scored = []
+
+    def predict_proba(model, matrix):
+        scored.append(matrix.copy())
+        return np.zeros(len(matrix))
+
+    monkeypatch.setattr(replay, 'predict_proba', predict_proba)
+    replay.replay(frames, model=_Model(), interval=interval)
+    for j, ticker in enumerate(sorted(frames)):
+        bars = resample_bars(frames[ticker], interval) if interval else frames[ticker]
+        expected = calculate_indicators(bars)[INDICATOR_COLUMNS]
+        values = np.stack([matrix[j] for matrix in scored])
+        assert values.shape == expected.shape
+        # The scoring matrix is float32, like calculate_indicators' columns
+        np.testing.assert_allclose(values, expected.to_numpy(np.float64), rtol=1e-6, atol=1e-6, equal_nan=True)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import risk
+
+
+def _returns(n=1260, invested=0.9, seed=1):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(3e-4, 0.012, n)
+    strategy = market * (rng.random(n) < invested) - 1e-4
+    return pd.Series(strategy, index=pd.bdate_range('2020-01-01', periods=n)), pd.Series(market)
+
+
+@pytest.mark.parametrize('method', risk.METHODS)
+def test_simulated_correlation_matches_sample(method):
+    strategy, market = _returns()
+    sample = np.corrcoef(strategy, market)[0, 1]
+    result = risk.simulate(strategy, market.to_numpy(), n_paths=4_000, method=method, block_size=5)
+    simulated = np.corrcoef(np.log1p(result['strategy_total']), np.log1p(result['market_total']))[0, 1]
+    assert simulated == pytest.approx(sample, abs=0.05)
+
+
+def test_normal_paths_have_sample_moments():
+    strategy, market = _returns(invested=0.5)
+    returns = np.column_stack([strategy, market])
+    s, m = risk._paths(returns, 2_000, 'normal', 1, len(returns), np.random.default_rng(0))
+    assert np.corrcoef(s.ravel(), m.ravel())[0, 1] == pytest.approx(np.corrcoef(returns.T)[0, 1], abs=0.01)
+    assert s.std() == pytest.approx(returns[:, 0].std(), rel=0.01)
+
+
+def test_bands_and_tail_risk():
+    strategy, market = _returns()
+    result = risk.simulate(strategy, market.to_numpy(), n_paths=1_000)
+    bands = result['bands']['strategy']
+    assert (bands.index == strategy.index[np.unique(np.linspace(0, len(strategy) - 1, 200).round().astype(int))]).all()
+    assert (bands.diff(axis=1).iloc[:, 1:] >= 0).all().all()
+    var, cvar = risk.tail_risk(result['strategy_total'], 0.95)
+    assert cvar >= var
+    assert (result['strategy_drawdown'] <= 0).all()
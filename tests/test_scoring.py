@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import indicators, scoring
+from src.downloader import Downloader, RecordedSource
+from src.store import MarketStore
+
+
+def _bars(index, seed):
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, len(index))))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': 1_000}, index=index.rename('Date'))
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    days = pd.bdate_range('2020-01-01', '2020-12-31')
+    frames = {'AAPL': _bars(days, 1), 'MSFT': _bars(days, 2),
+              # A ticker with its own calendar: every fifth session missing
+              'HALT': _bars(days[days.dayofyear % 5 != 0], 3),
+              '^VIX': _bars(days, 4), '^TNX': _bars(days, 5)}
+    for symbol, frame in frames.items():
+        frame.to_csv(tmp_path / f'{symbol}.csv')
+    source = RecordedSource(str(tmp_path))
+    return Downloader(MarketStore(str(tmp_path / 'store')), source, retries=0), frames
+
+
+def test_each_ticker_uses_its_own_calendar(downloader):
+    downloader, frames = downloader
+    rows = scoring.latest_features(['AAPL', 'HALT', 'MSFT'], period='max', downloader=downloader)
+    for ticker in ('AAPL', 'HALT'):
+        bars = frames[ticker]
+        alone = indicators.compute_indicators(bars['Close'], bars['High'], bars['Low'])
+        assert rows.loc[ticker, 'RSI'] == pytest.approx(alone['RSI'].iloc[-1])
+        assert rows.loc[ticker, 'MACD'] == pytest.approx(alone['MACD'].iloc[-1])
+
+
+def test_requests_are_scored_from_the_cache(downloader):
+    downloader, _ = downloader
+    scoring.latest_features(['AAPL'], period='max', downloader=downloader)
+    requests = len(downloader.source.requests)
+    rows = scoring.latest_features(['AAPL'], period='max', downloader=downloader)
+    assert len(downloader.source.requests) == requests
+    assert list(rows.index) == ['AAPL']
+    # A ticker not cached yet is fetched once
+    scoring.latest_features(['AAPL', 'MSFT'], period='max', downloader=downloader)
+    assert [r[0] for r in downloader.source.requests[requests:]] == ['MSFT']
+
+
+def test_batch_counter_is_recorded():
+    metrics = scoring.ScoringMetrics()
+    for _ in range(3):
+        metrics.record_batch()
+    metrics.record(0.001, 10, batches=1)
+    assert metrics.summary()['batches'] == 4
+
+
+def test_macro_is_joined_once_for_all_tickers(downloader, monkeypatch):
+    from src import exogenous
+
+    downloader, frames = downloader
+    # The macro frame is hashed (and aligned) once, not once per ticker
+    calls = []
+    key = exogenous._key
+    monkeypatch.setattr(exogenous, '_key', lambda *a, **k: calls.append(1) or key(*a, **k))
+    rows = scoring.latest_features(['AAPL', 'HALT', 'MSFT'], period='max', downloader=downloader)
+    assert len(calls) == 1
+    last = frames['HALT'].index[-1]
+    assert rows.loc['HALT', 'VIX'] == pytest.approx(frames['^VIX'].loc[last, 'Close'])
+
+
+@pytest.mark.parametrize('approximate', [False, True])
+def test_contributions_sum_to_the_margin(approximate):
+    import xgboost
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 4)), columns=['a', 'b', 'c', 'd'])
+    y = (X['a'] - X['b'] + rng.normal(size=300) > 0).astype(int)
+    model = xgboost.XGBClassifier(n_estimators=20, max_depth=3).fit(X, y)
+    contributions = scoring.predict_contributions(model, X, approximate=approximate)
+    assert list(contributions.columns) == ['a', 'b', 'c', 'd', 'Bias']
+    margin = model.get_booster().predict(xgboost.DMatrix(X), output_margin=True)
+    np.testing.assert_allclose(contributions.sum(axis=1), margin, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(1 / (1 + np.exp(-contributions.sum(axis=1))), scoring.predict_proba(model, X),
+                               rtol=1e-5)
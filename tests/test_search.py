@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from src import search
+from src.train_model import FEATURES, TARGET
+
+
+def _dataset(n_dates=300, tickers=2, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2020-01-01', periods=n_dates).repeat(tickers)
+    df = pd.DataFrame(rng.normal(size=(len(index), len(FEATURES))), index=index, columns=FEATURES)
+    df[TARGET] = (df[FEATURES[0]] + rng.normal(size=len(df)) > 0).astype(int)
+    return df
+
+
+def test_early_stopping_never_sees_the_scored_fold():
+    df = _dataset()
+    searcher = search.Searcher(df, n_splits=3, n_jobs=1, cache_path=None)
+    X, y, splits = searcher.data
+    dates, calendar = df.index, df.index.unique()
+    for fit, stop, valid in splits:
+        assert fit.any() and stop.any() and valid.any()
+        assert not (stop & valid).any() and not (fit & stop).any()
+        # fit < purge gap < stop < purge gap < valid, in time
+        assert dates[fit].max() < dates[stop].min() and dates[stop].max() < dates[valid].min()
+        # One purged date between the fit and early-stopping slices
+        assert calendar.get_loc(dates[stop].min()) - calendar.get_loc(dates[fit].max()) == 2
+
+
+def test_cv_score_runs_on_the_inner_split():
+    df = _dataset()
+    searcher = search.Searcher(df, n_splits=2, n_jobs=1, cache_path=None)
+    search._init_worker(searcher.data)
+    score, rounds = search._cv_score(({'max_depth': 2, 'learning_rate': 0.1}, 30))
+    assert 0.5 < score <= 1.0 and 1 <= rounds <= 30
+
+
+def test_best_is_ranked_at_the_final_budget():
+    searcher = search.Searcher(_dataset(), n_splits=2, n_jobs=1, cache_path=None)
+    config = {name: values[0] for name, values in search.SEARCH_SPACE.items()}
+    # A lucky short rung scores above the finalist trained at full budget
+    searcher.history = [{**config, 'max_depth': 7, 'n_rounds': 25, 'score': 0.9, 'rounds': 25},
+                        {**config, 'max_depth': 3, 'n_rounds': 400, 'score': 0.6, 'rounds': 180}]
+    params, score = searcher.best()
+    assert (params['max_depth'], params['n_estimators'], score) == (3, 180, 0.6)
+
+
+def test_fitness_cache_is_written_atomically(tmp_path, monkeypatch):
+    path = tmp_path / 'cache.json'
+    cache = search.FitnessCache(str(path))
+    cache.scores['a'] = {'score': 0.6, 'rounds': 10}
+    cache.save()
+    # An interrupted write leaves the previous cache intact
+    cache.scores['b'] = {'score': 0.7, 'rounds': 20}
+    monkeypatch.setattr(search.json, 'dump', lambda *a, **k: (_ for _ in ()).throw(KeyboardInterrupt))
+    try:
+        cache.save()
+    except KeyboardInterrupt:
+        pass
+    assert search.FitnessCache(str(path)).scores == {'a': {'score': 0.6, 'rounds': 10}}
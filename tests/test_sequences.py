@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from src.sequences import SequenceDataset, write_matrix
+from src.train_model import FEATURES, TARGET
+
+LOOKBACK = 10
+
+
+def _frame():
+    """Two tickers of different lengths, rows shuffled; the first feature encodes (ticker, date)."""
+    frames = []
+    for code, (ticker, n) in enumerate((('AAPL', 60), ('MSFT', 45))):
+        dates = pd.bdate_range('2020-01-01', periods=n)
+        df = pd.DataFrame(np.zeros((n, len(FEATURES))), index=dates, columns=FEATURES)
+        df[FEATURES[0]] = code * 1000 + np.arange(n)
+        df[TARGET] = np.arange(n) % 2
+        frames.append(df.assign(Ticker=ticker))
+    return pd.concat(frames).sample(frac=1, random_state=0)
+
+
+def test_windows_never_cross_tickers(tmp_path):
+    dataset = SequenceDataset.open(LOOKBACK, write_matrix(_frame(), str(tmp_path)))
+    assert len(dataset) == (60 - LOOKBACK + 1) + (45 - LOOKBACK + 1)
+    X, y = dataset.get(np.arange(len(dataset)))
+    assert X.shape == (len(dataset), LOOKBACK, len(FEATURES))
+    ticker, step = np.divmod(X[:, :, 0].astype(int), 1000)
+    # One ticker per window, consecutive dates, labelled with the last row
+    assert (ticker == ticker[:, :1]).all()
+    assert (np.diff(step, axis=1) == 1).all()
+    assert (y == step[:, -1] % 2).all()
+    # Memory-mapped and in-memory datasets agree
+    memory = SequenceDataset.from_frame(_frame(), LOOKBACK)
+    np.testing.assert_array_equal(memory.get(np.arange(len(memory)))[0], X)
+
+
+def test_split_is_purged():
+    dataset = SequenceDataset.from_frame(_frame(), LOOKBACK)
+    calendar = pd.bdate_range('2020-01-01', periods=60)
+    test_start, test_end = calendar[40], calendar[50]
+    train, test = dataset.split(test_start, test_end, purge=3)
+    train_dates, test_dates = dataset.sample_dates(train), dataset.sample_dates(test)
+    assert not set(train) & set(test)
+    assert test_dates.min() == test_start and test_dates.max() < test_end
+    # Three purged dates between the last training window and the test range
+    assert train_dates.max() == calendar[36]
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import snapshots
+from src.store import period_start
+
+
+@pytest.mark.parametrize('now, session', [
+    ('2026-10-14 19:00', '2026-10-13'),  # Wednesday 15:00 in New York, before the close
+    ('2026-10-14 20:30', '2026-10-14'),  # after the close
+    ('2026-10-18 12:00', '2026-10-16'),  # Sunday
+    ('2026-07-03 22:00', '2026-07-02'),  # Independence Day (observed)
+])
+def test_last_session(now, session):
+    assert snapshots.last_session(pd.Timestamp(now, tz='UTC')) == pd.Timestamp(session)
+
+
+def _snapshot(last_date, version=3):
+    return snapshots.Snapshot({'ticker': 'AAPL', 'period': '1y', 'created': f'{last_date}T21:00:00+00:00',
+                               'last_date': f'{last_date}T00:00:00', 'model': {'version': version}}, None)
+
+
+def test_freshness_follows_the_sessions():
+    wednesday = _snapshot('2026-10-14')
+    assert wednesday.is_fresh(3, now=pd.Timestamp('2026-10-15 19:00', tz='UTC'))
+    assert not wednesday.is_fresh(3, now=pd.Timestamp('2026-10-15 21:00', tz='UTC'))
+    assert not wednesday.is_fresh(4, now=pd.Timestamp('2026-10-15 19:00', tz='UTC'))
+    # Friday's snapshot stays fresh over the weekend, until Monday's close
+    friday = _snapshot('2026-10-16')
+    assert friday.is_fresh(3, now=pd.Timestamp('2026-10-19 19:00', tz='UTC'))
+    assert not friday.is_fresh(3, now=pd.Timestamp('2026-10-19 21:00', tz='UTC'))
+
+
+def test_period_bars_match_a_period_fetch():
+    index = pd.bdate_range('2015-01-01', '2020-12-31', name='Date')
+    history = pd.DataFrame({'Close': np.arange(len(index), dtype=float)}, index=index)
+    for period in snapshots.PERIODS:
+        start = period_start(index[-1], period)
+        expected = history if start is None else history[history.index >= start]
+        pd.testing.assert_frame_equal(snapshots.period_bars(history, period), expected)
+    # A live bar after the last stored one does not move the period start
+    live = pd.concat([history, history.iloc[-1:].set_axis([pd.Timestamp('2021-01-04')])])
+    assert snapshots.period_bars(live, '1y', last=index[-1]).index[0] == period_start(index[-1], '1y')
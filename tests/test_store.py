@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.store import MACRO_TICKER, MarketStore
+
+
+def _long_frame(scale=1.0, days=300):
+    index = pd.bdate_range('2019-06-03', periods=days, name='Date')
+    rng = np.random.default_rng(0)
+    frames = []
+    for ticker in ('AAPL', 'MSFT'):
+        close = (100 + np.cumsum(rng.normal(0, 1, days))) * scale
+        frames.append(pd.DataFrame({'Ticker': ticker, 'Close': close, 'RSI': rng.uniform(0, 100, days),
+                                    'VIX': np.linspace(15, 25, days), 'TNX': 2.0}, index=index))
+    return pd.concat(frames)
+
+
+def test_revised_csv_is_reingested(tmp_path):
+    path = tmp_path / 'features.csv'
+    store = MarketStore(str(tmp_path / 'store'))
+    _long_frame().to_csv(path)
+    store.sync_csv(str(path))
+    assert store.sync_csv(str(path)) == 0
+    # Same dates, every past price revised
+    revised = _long_frame(scale=0.5)
+    revised.to_csv(path)
+    os.utime(path, (0, 1e9))
+    store.sync_csv(str(path))
+    expected = revised[revised['Ticker'] == 'AAPL']['Close']
+    pd.testing.assert_series_equal(store.read('AAPL')['Close'], expected, check_freq=False)
+    assert store.read(MACRO_TICKER)['VIX'].iloc[-1] == revised['VIX'].iloc[-1]
+
+
+def test_local_store_is_shared(tmp_path, monkeypatch):
+    from src import data_loader
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_loader, '_stores', {})
+    os.makedirs(os.path.dirname(data_loader.LOCAL_CSV))
+    _long_frame().to_csv(data_loader.LOCAL_CSV)
+    store = data_loader.get_local_store()
+    assert data_loader.get_local_store() is store
+    # Its cached last timestamps are reused across reads
+    assert 'AAPL' in store._last
+    last = store._last['AAPL']
+    assert data_loader.read_local('AAPL', '1mo').index[0] == last - pd.DateOffset(months=1)
+
+
+def test_read_pushes_down_ticker_years_and_columns(tmp_path, monkeypatch):
+    from src import store as store_module
+
+    store = MarketStore(str(tmp_path))
+    frame = _long_frame()
+    store.ingest_frame(frame)
+    opened = []
+    dataset = store_module.ds.dataset
+    monkeypatch.setattr(store_module.ds, 'dataset', lambda files, **kw: opened.extend(files) or dataset(files, **kw))
+
+    result = store.read('MSFT', start='2020-02-03', end='2020-03-31', columns=['RSI'])
+    expected = frame[frame['Ticker'] == 'MSFT'].loc['2020-02-03':'2020-03-31', ['RSI']]
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+    # Only the 2020 partition of MSFT was opened
+    assert opened and all(os.sep.join(['MSFT', '2020']) in path for path in opened)
+    assert list(store.read('AAPL', columns=['Close', 'Missing']).columns) == ['Close']
@@ -0,0 +1,60 @@
+import threading
+
+from src import telemetry
+
+
+def test_thread_flag_does_not_leak_to_other_sessions():
+    telemetry.reset()
+    names = {}
+
+    def session(name, debug):
+        telemetry.enable_thread(debug)
+        names[name] = threading.get_ident()
+        with telemetry.span(name):
+            pass
+
+    threads = [threading.Thread(target=session, args=(name, debug))
+               for name, debug in (('on', True), ('off', False))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [s['name'] for s in telemetry.records()] == ['on']
+    assert not telemetry.is_enabled()
+
+
+def test_thread_flag_can_follow_the_process_flag_again():
+    telemetry.enable_thread(True)
+    assert telemetry.is_enabled()
+    telemetry.enable_thread(None)
+    assert not telemetry.is_enabled()
+
+
+def test_counters_can_be_selected_with_their_spans():
+    telemetry.reset()
+    idents = {}
+
+    def session(name, rows):
+        telemetry.enable_thread(True)
+        idents[name] = threading.get_ident()
+        with telemetry.span(name):
+            telemetry.count('rows_processed', rows)
+
+    barrier = threading.Barrier(2)
+
+    def session_alive(*args):
+        session(*args)
+        # Both threads alive at once, so their idents differ
+        barrier.wait()
+
+    threads = [threading.Thread(target=session_alive, args=args) for args in (('a', 10), ('b', 7))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert telemetry.counters() == {'rows_processed': 17}
+    assert telemetry.counters(thread=idents['b']) == {'rows_processed': 7}
+    spans = telemetry.records(thread=idents['b'])
+    text = telemetry.prometheus_text(spans, telemetry.counters(thread=idents['b']))
+    assert 'stock_predictor_rows_processed_total 7\n' in text
+    assert 'stage="a"' not in text
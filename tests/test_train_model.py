@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from xgboost import DMatrix
+
+from src import registry, train_model
+from src.train_model import FEATURES, TARGET
+
+
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    # Relative model and registry paths resolve under tmp_path
+    monkeypatch.chdir(tmp_path)
+    registry.clear_loaded()
+    yield
+    registry.clear_loaded()
+
+
+def _features(path, n=3_000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n, len(FEATURES))).astype(np.float32), columns=FEATURES,
+                      index=pd.Index(pd.date_range('2015-01-01', periods=n, freq='h'), name='Date'))
+    df[TARGET] = (df['RSI'] + df['Log_Return_lag_1'] + rng.normal(size=n) > 0).astype(float)
+    if str(path).endswith('.parquet'):
+        df.to_parquet(path, row_group_size=700)
+    else:
+        df.to_csv(path)
+    return df
+
+
+def _margin(X):
+    return registry.get_model().booster.predict(DMatrix(X, feature_names=FEATURES), output_margin=True)
+
+
+@pytest.mark.parametrize('name', ['features.parquet', 'features.csv'])
+def test_streaming_matches_in_memory_training(name):
+    df = _features(name)
+    X = df[FEATURES].iloc[:100]
+
+    in_memory = train_model.train_and_save_model(data_path=name)
+    expected = _margin(X)
+    registry.clear_loaded()
+    streamed = train_model.train_streaming(data_path=name, batch_rows=500, nthread=1)
+
+    assert streamed['version'] == in_memory['version'] + 1
+    assert streamed['train_window']['rows'] == len(df)
+    np.testing.assert_array_equal(_margin(X), expected)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.train_model import FEATURES, TARGET
+from src.walk_forward import make_folds, walk_forward
+
+
+@pytest.mark.parametrize('window', ['expanding', 'rolling'])
+@pytest.mark.parametrize('purge', [0, 1, 5])
+def test_folds_are_purged_and_disjoint(window, purge):
+    n_dates = 1000
+    folds = make_folds(n_dates, n_folds=5, window=window, purge=purge)
+    assert len(folds) == 5
+    for k, (a, b, c, d) in enumerate(folds):
+        assert 0 <= a < b and b + purge == c < d <= n_dates
+        # No test date is ever trained on, in this fold or an earlier one
+        assert not set(range(a, b)) & set(range(c, d))
+        if k:
+            assert c == folds[k - 1][3]
+        if window == 'rolling':
+            assert b - a == folds[0][1] - folds[0][0]
+    assert folds[-1][3] == n_dates
+
+
+def test_walk_forward_rows_respect_the_folds():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2020-01-01', periods=120)
+    index = dates.repeat(2)
+    df = pd.DataFrame(rng.normal(size=(len(index), len(FEATURES))), index=index, columns=FEATURES)
+    df[TARGET] = rng.integers(0, 2, len(df))
+    df['Ticker'] = np.tile(['A', 'B'], len(dates))
+    params = {'n_estimators': 5, 'max_depth': 2}
+    predictions, metrics = walk_forward(df, params=params, n_folds=3, purge=2, n_jobs=1)
+    for row in metrics.itertuples():
+        # Two purged dates between the last training date and the first test date
+        assert dates.get_loc(row.test_start) - dates.get_loc(row.train_end) == 3
+        fold = predictions[predictions['fold'] == row.fold]
+        assert fold.index.min() == row.test_start and len(fold) == row.n_test
+        # Both tickers of a date fall in the same fold
+        assert (fold.groupby(level=0).size() == 2).all()
+    # Every test row is predicted exactly once
+    assert predictions.set_index('Ticker', append=True).index.is_unique